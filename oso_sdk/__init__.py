@@ -1,14 +1,71 @@
-from typing import Any, Optional
+import asyncio
+import contextvars
+import functools
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import oso_cloud  # type: ignore
 
+from .batching import Batcher
+from .breaker import CircuitBreaker, CircuitState
+from .cache import (
+    ActionSetCache,
+    BaseDecisionCache,
+    CacheKey,
+    DecisionCache,
+    Entity,
+    fact_entities,
+    key_entities,
+    to_cache_key,
+    to_typed_id,
+)
 from .constants import OSO_URL
+from .deadline import deadline_scope
+from .exceptions import OsoSdkCircuitOpenError, OsoSdkOverloadedError
+from .executor import BoundedExecutor
+from .hedging import Hedger
 from .integrations import Integration
+from .jwt import JwtVerifier
+from .local import LocalEvaluator
+from .prefetch import Prefetch, Prefetcher
+from .single_flight import SingleFlight
+from .snapshot import FactSnapshot, write_snapshot
+from .transport import DeadlineAdapter, HttpPool
+
+if TYPE_CHECKING:
+    from .aio import AsyncApi
 
 __version__ = "0.3.2"
 
 _shared = None
 
+T = TypeVar("T")
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
 
 class OsoSdk(oso_cloud.Oso, Integration):
     def __init__(self, api_key: str, optin: bool, exception: Optional[Exception]):
@@ -19,6 +76,23 @@ class OsoSdk(oso_cloud.Oso, Integration):
         )
         oso_cloud.Oso.__init__(self, OSO_URL, api_key, user_agent)
         Integration.__init__(self, optin, exception)
+        for prefix in ("https://", "http://"):
+            self.api.session.mount(prefix, DeadlineAdapter())
+        self.cache: Optional[BaseDecisionCache] = None
+        self.action_sets: Optional[ActionSetCache] = None
+        self.http_pool: Optional[HttpPool] = None
+        self.single_flight = SingleFlight()
+        self.batcher: Optional[Batcher] = None
+        self.executor: Optional[BoundedExecutor] = None
+        self.breaker: Optional[CircuitBreaker] = None
+        self.hedger: Optional[Hedger] = None
+        self.prefetcher = Prefetcher()
+        self.local: Optional[LocalEvaluator] = None
+        self._refreshing: Set[CacheKey] = set()
+        self._refresh_lock = threading.Lock()
+        self._background: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._aio: Optional["AsyncApi"] = None
 
     """A handle to Oso Cloud.
 
@@ -35,6 +109,774 @@ class OsoSdk(oso_cloud.Oso, Integration):
         """
         raise NotImplementedError  # pragma: no cover
 
+    def authorize(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+    ) -> bool:
+        """Check a permission.
+
+        Decisions are memoized for the rest of the current request and, if a
+        decision cache is configured, cached across requests. Concurrent
+        identical checks share a single request to Oso Cloud. Checks with
+        `context_facts` always go to Oso Cloud.
+        """
+        return self._authorize(actor, action, resource, context_facts)
+
+    async def authorize_async(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+    ) -> bool:
+        """Check a permission without blocking the event loop.
+
+        Behaves like `authorize`. Requests are sent with a non-blocking HTTP
+        client if `oso_sdk.init` was called with `async_client=True`, and from
+        the SDK's executor, or the event loop's default one, otherwise.
+        """
+        return await self._authorize_async(actor, action, resource, context_facts)
+
+    def filter_authorized(
+        self,
+        actor: Any,
+        action: str,
+        items: Sequence[T],
+        key: Optional[Callable[[T], Any]] = None,
+        chunk_size: int = 1000,
+    ) -> List[T]:
+        """Filter `items` down to those `actor` can perform `action` on.
+
+        Decisions are answered from the memo and the caches first. The
+        remaining distinct resources are sent in `authorize_resources` requests
+        of at most `chunk_size`, and their decisions cached. The allowed items
+        are returned in their original order.
+
+        Args:
+            key (Optional[Callable[[T], Any]], optional): The resource of an
+                item, e.g. `lambda post: {"type": "Post", "id": post.id}`.
+                Defaults to the item itself.
+
+        Raises:
+            ValueError: If `chunk_size` is less than 1.
+        """
+        decisions, chunks = self._filter_checks(actor, action, items, key, chunk_size)
+        generation = self._cache_generation(None)
+        for chunk in chunks:
+            results = self._fetch_decisions(actor, action, [r for _, r, _ in chunk])
+            self._filtered(decisions, chunk, results, generation)
+        return [item for i, item in enumerate(items) if decisions[i]]
+
+    async def filter_authorized_async(
+        self,
+        actor: Any,
+        action: str,
+        items: Sequence[T],
+        key: Optional[Callable[[T], Any]] = None,
+        chunk_size: int = 1000,
+        max_concurrency: int = 4,
+    ) -> List[T]:
+        """Like `filter_authorized`, sending the requests of at most
+        `max_concurrency` chunks concurrently without blocking the event loop.
+
+        Raises:
+            ValueError: If `chunk_size` or `max_concurrency` is less than 1.
+        """
+        if max_concurrency < 1:
+            raise ValueError("`max_concurrency` must be at least 1")
+
+        decisions, chunks = self._filter_checks(actor, action, items, key, chunk_size)
+        generation = self._cache_generation(None)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(
+            chunk: List[Tuple[Optional[CacheKey], Any, List[int]]]
+        ) -> List[bool]:
+            async with semaphore:
+                return await self._fetch_decisions_async(
+                    actor, action, [r for _, r, _ in chunk]
+                )
+
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        for i, chunk in enumerate(chunks):
+            self._filtered(decisions, chunk, results[i], generation)
+        return [item for i, item in enumerate(items) if decisions[i]]
+
+    def _filter_checks(
+        self,
+        actor: Any,
+        action: str,
+        items: Sequence[T],
+        key: Optional[Callable[[T], Any]],
+        chunk_size: int,
+    ) -> Tuple[
+        List[Optional[bool]], List[List[Tuple[Optional[CacheKey], Any, List[int]]]]
+    ]:
+        """Answer the checks of `items` from the memo and the caches.
+
+        Returns the decision of each item, `None` if it must be fetched, and the
+        chunks of distinct resources to fetch, as (cache key, resource, indexes
+        of its items).
+        """
+        if chunk_size < 1:
+            raise ValueError("`chunk_size` must be at least 1")
+
+        decisions: List[Optional[bool]] = []
+        pending: Dict[Any, Tuple[Optional[CacheKey], Any, List[int]]] = {}
+        for i, item in enumerate(items):
+            resource = item if key is None else key(item)
+            cache_key = to_cache_key(actor, action, resource)
+            allowed = None
+            if cache_key is not None:
+                allowed = self._cached_decision(
+                    cache_key, actor, action, resource, None
+                )
+            decisions.append(allowed)
+            if allowed is None:
+                # Items of the same resource share its check
+                check = pending.setdefault(
+                    i if cache_key is None else cache_key, (cache_key, resource, [])
+                )
+                check[2].append(i)
+
+        checks = list(pending.values())
+        return decisions, [
+            checks[start : start + chunk_size]
+            for start in range(0, len(checks), chunk_size)
+        ]
+
+    def _filtered(
+        self,
+        decisions: List[Optional[bool]],
+        chunk: List[Tuple[Optional[CacheKey], Any, List[int]]],
+        results: List[bool],
+        generation: Optional[int],
+    ):
+        """Record the fetched decisions of a chunk of `_filter_checks`."""
+        for i, (key, _, indexes) in enumerate(chunk):
+            if key is not None:
+                self._cache_decision(key, results[i], None, generation)
+            for index in indexes:
+                decisions[index] = results[i]
+
+    def prefetch(
+        self,
+        actor: Any,
+        resources: Sequence[Any],
+        actions: Sequence[str],
+        cache_ttl: Optional[float] = None,
+    ) -> Prefetch:
+        """Fill the decision cache with the decisions of `actor` on `resources`.
+
+        Returns at once: decisions that aren't cached yet are fetched in the
+        background, with an `authorize_resources` request per action and chunk
+        of resources, at the rate the `Prefetcher` allows. Cancel the returned
+        `Prefetch` to stop before the next request. Without a decision cache,
+        nothing is fetched.
+        """
+        cache = self.cache
+        if cache is None or cache_ttl == 0:
+            prefetch = Prefetch()
+            prefetch._finish()
+            return prefetch
+
+        chunk_size = self.prefetcher.chunk_size
+
+        def requests(cache: BaseDecisionCache) -> Iterator[Callable[[], None]]:
+            for action in actions:
+                pending = []
+                for resource in resources:
+                    key = to_cache_key(actor, action, resource)
+                    if key is not None and cache.get(key) is None:
+                        pending.append((key, resource))
+                for start in range(0, len(pending), chunk_size):
+                    yield functools.partial(
+                        self._prefetch,
+                        cache,
+                        actor,
+                        action,
+                        pending[start : start + chunk_size],
+                        cache_ttl,
+                    )
+
+        return self.prefetcher.submit(requests(cache))
+
+    def _prefetch(
+        self,
+        cache: BaseDecisionCache,
+        actor: Any,
+        action: str,
+        pending: List[Tuple[CacheKey, Any]],
+        cache_ttl: Optional[float],
+    ):
+        generation = cache.generation
+        results = self._fetch_decisions(actor, action, [r for _, r in pending])
+        for i, (key, _) in enumerate(pending):
+            cache.set(key, results[i], cache_ttl, generation)
+
+    def _authorize(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+        cache_ttl: Optional[float] = None,
+    ) -> bool:
+        key = None if context_facts else to_cache_key(actor, action, resource)
+        if key is None:
+            return self._fetch_decision(actor, action, resource, context_facts)
+
+        allowed = self._cached_decision(key, actor, action, resource, cache_ttl)
+        if allowed is None:
+            generation = self._cache_generation(cache_ttl)
+            # Keyed by generation so checks made after a write don't join a
+            # request sent before it
+            allowed = self.single_flight.do(
+                (key, generation),
+                lambda: self._fetch_decision(actor, action, resource),
+            )
+            self._cache_decision(key, allowed, cache_ttl, generation)
+        return allowed
+
+    async def _authorize_async(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+        cache_ttl: Optional[float] = None,
+    ) -> bool:
+        key = None if context_facts else to_cache_key(actor, action, resource)
+        if key is None:
+            return await self._fetch_decision_async(
+                actor, action, resource, context_facts
+            )
+
+        allowed = self._cached_decision(key, actor, action, resource, cache_ttl)
+        if allowed is None:
+            generation = self._cache_generation(cache_ttl)
+            allowed = await self.single_flight.do_async(
+                (key, generation),
+                lambda: self._fetch_decision_async(actor, action, resource),
+            )
+            self._cache_decision(key, allowed, cache_ttl, generation)
+        return allowed
+
+    def _authorize_checks(
+        self,
+        actor: Any,
+        checks: List[Tuple[str, Any]],
+        require_all: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> bool:
+        """Check several (action, resource) pairs, all or any of which must pass.
+
+        Checks are answered from the memo and the cache first. The rest are
+        sent in one `authorize_resources` request per action, stopping at the
+        first result that settles the outcome.
+        """
+        if len(checks) == 1:
+            ((action, resource),) = checks
+            return self._authorize(actor, action, resource, cache_ttl=cache_ttl)
+
+        groups = self._pending_checks(actor, checks, require_all, cache_ttl)
+        if groups is None:
+            return not require_all
+
+        generation = self._cache_generation(cache_ttl)
+        for action, pending in groups.items():
+            results = self._fetch_decisions(actor, action, [r for _, r in pending])
+            if self._settles(pending, results, require_all, cache_ttl, generation):
+                return not require_all
+        return require_all
+
+    async def _authorize_checks_async(
+        self,
+        actor: Any,
+        checks: List[Tuple[str, Any]],
+        require_all: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> bool:
+        """Like `_authorize_checks`, sending each action's request concurrently."""
+        if len(checks) == 1:
+            ((action, resource),) = checks
+            return await self._authorize_async(
+                actor, action, resource, cache_ttl=cache_ttl
+            )
+
+        groups = self._pending_checks(actor, checks, require_all, cache_ttl)
+        if groups is None:
+            return not require_all
+
+        generation = self._cache_generation(cache_ttl)
+        tasks = {
+            asyncio.ensure_future(
+                self._fetch_decisions_async(actor, action, [r for _, r in pending])
+            ): pending
+            for action, pending in groups.items()
+        }
+        try:
+            remaining: Set[asyncio.Future] = set(tasks)
+            while remaining:
+                done, remaining = await asyncio.wait(
+                    remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    pending = tasks[task]
+                    if self._settles(
+                        pending, task.result(), require_all, cache_ttl, generation
+                    ):
+                        return not require_all
+            return require_all
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _pending_checks(
+        self,
+        actor: Any,
+        checks: List[Tuple[str, Any]],
+        require_all: bool,
+        cache_ttl: Optional[float],
+    ) -> Optional[Dict[str, List[Tuple[Optional[CacheKey], Any]]]]:
+        """Group the checks that need a request by action.
+
+        Returns:
+            Optional[Dict[str, List[Tuple[Optional[CacheKey], Any]]]]: `None` if
+                a memoized or cached decision already settles the outcome.
+        """
+        groups: Dict[str, List[Tuple[Optional[CacheKey], Any]]] = {}
+        for action, resource in checks:
+            key = to_cache_key(actor, action, resource)
+            allowed = None
+            if key is not None:
+                allowed = self._cached_decision(key, actor, action, resource, cache_ttl)
+            if allowed is None:
+                groups.setdefault(action, []).append((key, resource))
+            elif allowed != require_all:
+                return None
+        return groups
+
+    def _settles(
+        self,
+        pending: List[Tuple[Optional[CacheKey], Any]],
+        results: List[bool],
+        require_all: bool,
+        cache_ttl: Optional[float],
+        generation: Optional[int],
+    ) -> bool:
+        """Cache fetched decisions, returning whether one settles the outcome."""
+        for i, (key, _) in enumerate(pending):
+            if key is not None:
+                self._cache_decision(key, results[i], cache_ttl, generation)
+        return any(allowed != require_all for allowed in results)
+
+    def _cached_decision(
+        self,
+        key: CacheKey,
+        actor: Any,
+        action: str,
+        resource: Any,
+        cache_ttl: Optional[float],
+    ) -> Optional[bool]:
+        """Find a decision in the request memo, the decision cache or the
+        action set cache."""
+        memo = self._request_memo()
+        if memo is not None and key in memo:
+            return memo[key]
+        if cache_ttl == 0:
+            return None
+
+        allowed = None
+        if self.cache is not None:
+            allowed, refresh = self.cache.lookup(key)
+            if refresh:
+                self._refresh(self.cache, key, actor, action, resource, cache_ttl)
+        if allowed is None and self.action_sets is not None:
+            actions = self.action_sets.get(key_entities(key))
+            allowed = None if actions is None else key[2] in actions
+        if allowed is not None and memo is not None:
+            memo[key] = allowed
+        return allowed
+
+    def _cache_generation(self, cache_ttl: Optional[float]) -> Optional[int]:
+        if self.cache is None or cache_ttl == 0:
+            return None
+        return self.cache.generation
+
+    def _cache_decision(
+        self,
+        key: CacheKey,
+        allowed: bool,
+        cache_ttl: Optional[float],
+        generation: Optional[int],
+    ):
+        memo = self._request_memo()
+        if memo is not None:
+            memo[key] = allowed
+        if self.cache is not None and cache_ttl != 0:
+            self.cache.set(key, allowed, cache_ttl, generation)
+
+    def _refresh(
+        self,
+        cache: BaseDecisionCache,
+        key: CacheKey,
+        actor: Any,
+        action: str,
+        resource: Any,
+        cache_ttl: Optional[float],
+    ):
+        """Refetch a cached decision in the background, at most once at a time.
+
+        With an async client, the refresh runs on the running event loop.
+        """
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        generation = cache.generation
+
+        def done():
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+        def refresh():
+            try:
+                # Not bound by the deadline of the request that triggered it
+                with deadline_scope(None):
+                    allowed = self._fetch_decision(actor, action, resource)
+                cache.set(key, allowed, cache_ttl, generation)
+            except OsoSdkCircuitOpenError:
+                pass
+            except Exception:
+                traceback.print_exc()
+            finally:
+                done()
+
+        async def refresh_async():
+            try:
+                with deadline_scope(None):
+                    allowed = await self._fetch_decision_async(actor, action, resource)
+                cache.set(key, allowed, cache_ttl, generation)
+            except OsoSdkCircuitOpenError:
+                pass
+            except Exception:
+                traceback.print_exc()
+            finally:
+                done()
+
+        try:
+            loop = _running_loop()
+            if self._aio is not None and loop is not None:
+                task = loop.create_task(refresh_async())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            else:
+                self._run_in_background(refresh)
+        except OsoSdkOverloadedError:
+            # Keep serving the cached decision, the next hit retries
+            done()
+        except Exception:
+            done()
+            raise
+
+    def _run_in_background(self, func: Callable[[], None]):
+        """Run `func` without blocking the caller.
+
+        Integrations may override this to use their framework's scheduler.
+        """
+        if self.executor is not None:
+            self.executor.submit(func)
+            return
+
+        with self._refresh_lock:
+            if self._background is None:
+                self._background = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="oso-sdk"
+                )
+        self._background.submit(func)
+
+    def _fetch_decision(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+    ) -> bool:
+        if context_facts:
+            return self._guarded(
+                functools.partial(
+                    super().authorize,
+                    actor=actor,
+                    action=action,
+                    resource=resource,
+                    context_facts=context_facts,
+                )
+            )
+
+        allowed = self._local_decision(actor, action, resource)
+        if allowed is not None:
+            return allowed
+
+        key = to_cache_key(actor, action, resource)
+        if self.action_sets is not None and key is not None:
+            return action in self._fetch_actions(actor, resource, key_entities(key))
+
+        # Checks of the same actor and action are sent together
+        if self.batcher is not None and key is not None:
+            return self.batcher.check(
+                key[:3],
+                resource,
+                functools.partial(self._fetch_decisions, actor, action),
+            )
+
+        return self._guarded(
+            functools.partial(
+                super().authorize, actor=actor, action=action, resource=resource
+            )
+        )
+
+    def _fetch_decisions(
+        self, actor: Any, action: str, resources: List[Any]
+    ) -> List[bool]:
+        """Check a batch of resources in a single request."""
+        decisions = [self._local_decision(actor, action, r) for r in resources]
+        pending = [r for i, r in enumerate(resources) if decisions[i] is None]
+        if not pending:
+            return [bool(allowed) for allowed in decisions]
+
+        allowed = self._guarded(
+            functools.partial(
+                super().authorize_resources,
+                actor=actor,
+                action=action,
+                resources=pending,
+            )
+        )
+        return _merge_decisions(decisions, resources, allowed)
+
+    async def _fetch_decision_async(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List] = None,
+    ) -> bool:
+        if not context_facts:
+            allowed = self._local_decision(actor, action, resource)
+            if allowed is not None:
+                return allowed
+
+        key = None if context_facts else to_cache_key(actor, action, resource)
+        if self._aio is not None and self.action_sets is not None and key is not None:
+            return action in await self._fetch_actions_async(
+                actor, resource, key_entities(key)
+            )
+
+        if self._aio is not None and self.batcher is not None and key is not None:
+            return await self.batcher.check_async(
+                key[:3],
+                resource,
+                functools.partial(self._fetch_decisions_async, actor, action),
+            )
+
+        if self._aio is not None:
+            return await self._guarded_async(
+                functools.partial(
+                    self._aio.authorize, actor, action, resource, context_facts
+                )
+            )
+
+        return await self._run_blocking(
+            self._fetch_decision, actor, action, resource, context_facts
+        )
+
+    def _fetch_actions(
+        self, actor: Any, resource: Any, entities: Tuple[Entity, Entity]
+    ) -> FrozenSet[str]:
+        """Fetch and cache every action `actor` has on `resource`."""
+        assert self.action_sets is not None
+        action_sets = self.action_sets
+        generation = action_sets.generation
+
+        def fetch() -> FrozenSet[str]:
+            actions = frozenset(
+                self._guarded(
+                    functools.partial(
+                        super(OsoSdk, self).actions, actor=actor, resource=resource
+                    )
+                )
+            )
+            action_sets.set(entities, actions, generation)
+            return actions
+
+        # Checks of any action on the resource share the request
+        return self.single_flight.do(("actions", entities, generation), fetch)
+
+    async def _fetch_actions_async(
+        self, actor: Any, resource: Any, entities: Tuple[Entity, Entity]
+    ) -> FrozenSet[str]:
+        assert self.action_sets is not None and self._aio is not None
+        action_sets, aio = self.action_sets, self._aio
+        generation = action_sets.generation
+
+        async def fetch() -> FrozenSet[str]:
+            actions = frozenset(
+                await self._guarded_async(
+                    functools.partial(aio.actions, actor, resource)
+                )
+            )
+            action_sets.set(entities, actions, generation)
+            return actions
+
+        return await self.single_flight.do_async(
+            ("actions", entities, generation), fetch
+        )
+
+    def _guarded(self, func: Callable[[], T]) -> T:
+        """Call Oso Cloud through the hedger and the circuit breaker, if any."""
+        if self.hedger is not None:
+            func = functools.partial(self.hedger.call, func)
+        if self.breaker is None:
+            return func()
+        return self.breaker.call(func)
+
+    async def _guarded_async(self, func: Callable[[], Awaitable[T]]) -> T:
+        if self.hedger is not None:
+            func = functools.partial(self.hedger.call_async, func)
+        if self.breaker is None:
+            return await func()
+        return await self.breaker.call_async(func)
+
+    async def _run_blocking(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a blocking `func` without blocking the event loop.
+
+        Raises:
+            OsoSdkOverloadedError: If the SDK's executor is full.
+        """
+        if self.executor is not None:
+            return await asyncio.wrap_future(self.executor.submit(func, *args))
+
+        # Unlike `asyncio.to_thread`, `run_in_executor` doesn't carry the
+        # context, which holds the deadline
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: context.run(func, *args)
+        )
+
+    async def _fetch_decisions_async(
+        self, actor: Any, action: str, resources: List[Any]
+    ) -> List[bool]:
+        if self._aio is None:
+            return await self._run_blocking(
+                self._fetch_decisions, actor, action, resources
+            )
+
+        decisions = [self._local_decision(actor, action, r) for r in resources]
+        pending = [r for i, r in enumerate(resources) if decisions[i] is None]
+        if not pending:
+            return [bool(allowed) for allowed in decisions]
+
+        allowed = await self._guarded_async(
+            functools.partial(self._aio.authorize_resources, actor, action, pending)
+        )
+        return _merge_decisions(decisions, resources, allowed)
+
+    def _local_decision(self, actor: Any, action: str, resource: Any) -> Optional[bool]:
+        """The decision of the local evaluator, None if Oso Cloud must decide."""
+        if self.local is None:
+            return None
+        return self.local.authorize(actor, action, resource)
+
+    def tell(self, fact: Any) -> Any:
+        with self._writing(tell=[fact]):
+            return super().tell(fact)
+
+    def bulk_tell(self, facts: List[Any]):
+        with self._writing(tell=facts):
+            super().bulk_tell(facts)
+
+    def delete(self, fact: Any):
+        with self._writing(delete=[fact]):
+            super().delete(fact)
+
+    def bulk_delete(self, facts: List[Any]):
+        with self._writing(delete=facts):
+            super().bulk_delete(facts)
+
+    def bulk(
+        self, delete: Optional[List[Any]] = None, tell: Optional[List[Any]] = None
+    ):
+        with self._writing(delete=delete or [], tell=tell or []):
+            super().bulk(delete=delete or [], tell=tell or [])
+
+    @contextmanager
+    def _writing(
+        self, delete: Sequence[Any] = (), tell: Sequence[Any] = ()
+    ) -> Iterator[None]:
+        """Keep cached decisions and the local evaluator in sync with a write."""
+        try:
+            yield
+        except BaseException:
+            # The write may have been applied or not
+            if self.local is not None:
+                self.local.invalidate()
+            raise
+        else:
+            if self.local is not None:
+                self.local.apply(delete, tell)
+        finally:
+            self._invalidate([*delete, *tell])
+
+    def _invalidate(self, facts: List[Any]):
+        """Drop cached decisions that the written `facts` can affect.
+
+        A decision is affected if its actor or resource appears in a fact.
+        Facts with wildcard arguments drop every decision.
+        """
+        memo = self._request_memo()
+        entities: Set[Entity] = set()
+        for fact in facts:
+            affected = fact_entities(fact)
+            if affected is None:
+                if self.cache is not None:
+                    self.cache.clear()
+                if self.action_sets is not None:
+                    self.action_sets.clear()
+                if memo is not None:
+                    memo.clear()
+                return
+            entities |= affected
+
+        if self.cache is not None:
+            self.cache.invalidate(entities)
+        if self.action_sets is not None:
+            self.action_sets.invalidate(entities)
+        if memo is not None:
+            for key in [k for k in memo if not entities.isdisjoint(key_entities(k))]:
+                del memo[key]
+
+    def _request_memo(self) -> Optional[Dict[CacheKey, bool]]:
+        """The decisions already made while handling the current request.
+
+        Integrations override this to scope memoized decisions to a request.
+        """
+        return None
+
+
+def _merge_decisions(
+    decisions: List[Optional[bool]], resources: List[Any], allowed: List[Any]
+) -> List[bool]:
+    """Fill the decisions left to Oso Cloud with the resources it allowed."""
+    allowed_ids = {to_typed_id(r) for r in allowed}
+    return [
+        to_typed_id(resources[i]) in allowed_ids if decision is None else decision
+        for i, decision in enumerate(decisions)
+    ]
+
 
 class IntegrationConfig:
     """TODO
@@ -61,6 +903,19 @@ def init(
     shared: bool = True,
     optin: bool = False,
     exception: Optional[Exception] = None,
+    cache: Optional[BaseDecisionCache] = None,
+    action_sets: Optional[ActionSetCache] = None,
+    async_client: bool = False,
+    http_pool: Optional[HttpPool] = None,
+    batcher: Optional[Batcher] = None,
+    executor: Optional[BoundedExecutor] = None,
+    deadline: Optional[float] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    hedger: Optional[Hedger] = None,
+    exempt: Optional[Sequence[Union[str, Callable]]] = None,
+    jwt: Optional[JwtVerifier] = None,
+    prefetcher: Optional[Prefetcher] = None,
+    local: Optional[LocalEvaluator] = None,
 ) -> OsoSdk:
     """Create an instance of the Oso SDK.
 
@@ -74,20 +929,75 @@ def init(
             Defaults to False.
         exception (Optional[Exception], optional): raise a custom exception on
             authorization failure. Defaults to None.
+        cache (Optional[BaseDecisionCache], optional): cache authorization
+            decisions, e.g. `DecisionCache`. Defaults to None.
+        action_sets (Optional[ActionSetCache], optional): fetch and cache every
+            action an actor has on a resource on the first check, to answer
+            checks of the other actions from it. Defaults to None.
+        async_client (bool, optional): send `authorize_async` requests, and those
+            of async integrations, with a non-blocking HTTP client. Requires the
+            `async` extra. Defaults to False.
+        http_pool (Optional[HttpPool], optional): configure the pool of HTTP
+            connections to Oso Cloud. Defaults to None.
+        batcher (Optional[Batcher], optional): send concurrent checks to Oso
+            Cloud in batches. Defaults to None.
+        executor (Optional[BoundedExecutor], optional): run blocking calls made
+            from an event loop on a dedicated thread pool that rejects work
+            when full. Defaults to None.
+        deadline (Optional[float], optional): seconds each request has to
+            identify the user and action and get a decision before failing as
+            unauthorized. Defaults to None.
+        breaker (Optional[CircuitBreaker], optional): stop calling Oso Cloud
+            while it is failing. Defaults to None.
+        hedger (Optional[Hedger], optional): send a second request to Oso Cloud
+            when the first one is unusually slow. Defaults to None.
+        exempt (Optional[Sequence[Union[str, Callable]]], optional): never
+            authorize requests to these paths or endpoints. Strings starting
+            with "/" are path prefixes, except "/" which only matches the root,
+            other strings endpoint names, and callables view functions.
+            Defaults to None.
+        jwt (Optional[JwtVerifier], optional): identify users from the verified
+            JWT bearer token of their requests, when no function is passed to
+            `identify_user_from_request`. Defaults to None.
+        prefetcher (Optional[Prefetcher], optional): bound the rate and
+            concurrency of `OsoSdk.prefetch`. Defaults to None.
+        local (Optional[LocalEvaluator], optional): answer the checks it
+            supports in process, from a snapshot of the policy and facts.
+            Defaults to None.
 
     Raises:
         RuntimeError: If called multiple times when shared=True
     """
+    global _shared
+    if shared and _shared is not None:
+        raise RuntimeError(
+            "`oso_sdk.init` cannot be called multiple times when shared=True"
+        )
+
+    rv = type(integration).init(api_key, optin, exception)
+    rv.cache = cache
+    rv.action_sets = action_sets
+    rv.batcher = batcher
+    rv.executor = executor
+    rv.deadline = deadline
+    rv.breaker = breaker
+    rv.hedger = hedger
+    rv.jwt = jwt
+    rv.local = local
+    if prefetcher is not None:
+        rv.prefetcher = prefetcher
+    if exempt:
+        rv._set_exempt(exempt)
+    if http_pool is not None:
+        http_pool.mount(rv.api.session)
+        rv.http_pool = http_pool
+    if async_client:
+        from .aio import AsyncApi, to_limits
+
+        rv._aio = AsyncApi(rv.api, to_limits(http_pool) if http_pool else None)
     if shared:
-        global _shared
-        if _shared is not None:
-            raise RuntimeError(
-                "`oso_sdk.init` cannot be called multiple times when shared=True"
-            )
-        _shared = type(integration).init(api_key, optin, exception)
-        return _shared
-    else:
-        return type(integration).init(api_key, optin, exception)
+        _shared = rv
+    return rv
 
 
 def global_oso() -> OsoSdk:
@@ -103,4 +1013,20 @@ def global_oso() -> OsoSdk:
     return _shared
 
 
-__all__ = ("init", "global_oso")
+__all__ = (
+    "init",
+    "global_oso",
+    "write_snapshot",
+    "ActionSetCache",
+    "Batcher",
+    "BoundedExecutor",
+    "CircuitBreaker",
+    "CircuitState",
+    "DecisionCache",
+    "FactSnapshot",
+    "Hedger",
+    "HttpPool",
+    "JwtVerifier",
+    "LocalEvaluator",
+    "Prefetcher",
+)
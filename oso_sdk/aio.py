@@ -0,0 +1,168 @@
+import asyncio
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from . import deadline
+from .cache import to_typed_id
+from .transport import HttpPool
+
+# Matches `oso_cloud.api.TIMEOUT_INTERVALS`
+_CONNECT_TIMEOUT = 1.0
+_TIMEOUT = 5.0
+
+
+def _to_api_value(value: Any) -> Dict[str, str]:
+    typed_id = to_typed_id(value)
+    if typed_id is None:
+        raise TypeError(f"Oso: expected a value with a type and an id, got {value!r}")
+    return {"type": typed_id[0], "id": typed_id[1]}
+
+
+def _to_api_facts(facts: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"predicate": fact["name"], "args": [_to_api_value(a) for a in fact["args"]]}
+        for fact in facts or []
+    ]
+
+
+def to_limits(pool: HttpPool) -> httpx.Limits:
+    """The closest `httpx.Limits` to a synchronous `HttpPool`."""
+    connections = pool.size * pool.hosts
+    return httpx.Limits(
+        max_connections=connections if pool.block else None,
+        max_keepalive_connections=connections if pool.keep_alive else 0,
+        keepalive_expiry=pool.max_idle if pool.max_idle is not None else 5.0,
+    )
+
+
+class AsyncApi:
+    """Non-blocking requests to the Oso Cloud API.
+
+    Requests reuse the URL and headers of the `oso_cloud` client. Each event
+    loop gets its own `httpx.AsyncClient`, so its connection pool is shared by
+    every request served on that loop.
+
+    Args:
+        api (oso_cloud.api.API): The synchronous API client to mirror.
+        limits (Optional[httpx.Limits], optional): Connection pool limits.
+            Defaults to httpx's defaults.
+        transport (Optional[httpx.AsyncBaseTransport], optional): Override the
+            transport, e.g. for testing. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        api: Any,
+        limits: Optional[httpx.Limits] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._api = api
+        self._url = f"{api.url.rstrip('/')}/{api.api_base}"
+        self._limits = limits or httpx.Limits()
+        self._transport = transport
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits, transport=self._transport)
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the connection pool of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def post(self, path: str, json: Dict[str, Any]) -> Any:
+        # Shortened to the deadline of the current check, if any
+        left = deadline.remaining() or _TIMEOUT
+        result = await self._client().post(
+            f"{self._url}{path}",
+            json=json,
+            headers=self._api.session.headers,
+            timeout=httpx.Timeout(
+                min(_TIMEOUT, left), connect=min(_CONNECT_TIMEOUT, left)
+            ),
+        )
+        if not result.is_success:
+            raise Exception(
+                f"Got unexpected error from Oso Service: {result.status_code}\n{result.text}"
+            )
+        return result.json()
+
+    async def authorize(
+        self,
+        actor: Any,
+        action: str,
+        resource: Any,
+        context_facts: Optional[List[Any]] = None,
+    ) -> bool:
+        actor_value = _to_api_value(actor)
+        resource_value = _to_api_value(resource)
+        result = await self.post(
+            "/authorize",
+            {
+                "actor_type": actor_value["type"],
+                "actor_id": actor_value["id"],
+                "action": action,
+                "resource_type": resource_value["type"],
+                "resource_id": resource_value["id"],
+                "context_facts": _to_api_facts(context_facts),
+            },
+        )
+        return result["allowed"]
+
+    async def authorize_resources(
+        self,
+        actor: Any,
+        action: str,
+        resources: List[Any],
+        context_facts: Optional[List[Any]] = None,
+    ) -> List[Any]:
+        """The subset of `resources` that `actor` can perform `action` on.
+
+        Ordering and duplicates are preserved, like `oso_cloud.Oso.authorize_resources`.
+        """
+        if not resources:
+            return []
+
+        actor_value = _to_api_value(actor)
+        result = await self.post(
+            "/authorize_resources",
+            {
+                "actor_type": actor_value["type"],
+                "actor_id": actor_value["id"],
+                "action": action,
+                "resources": [_to_api_value(r) for r in resources],
+                "context_facts": _to_api_facts(context_facts),
+            },
+        )
+        allowed = {to_typed_id(r) for r in result["results"]}
+        return [r for r in resources if to_typed_id(r) in allowed]
+
+    async def actions(
+        self,
+        actor: Any,
+        resource: Any,
+        context_facts: Optional[List[Any]] = None,
+    ) -> List[str]:
+        actor_value = _to_api_value(actor)
+        resource_value = _to_api_value(resource)
+        result = await self.post(
+            "/actions",
+            {
+                "actor_type": actor_value["type"],
+                "actor_id": actor_value["id"],
+                "resource_type": resource_value["type"],
+                "resource_id": resource_value["id"],
+                "context_facts": _to_api_facts(context_facts),
+            },
+        )
+        return result["results"]
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+from .deadline import remaining
+from .exceptions import OsoSdkTimeoutError
+
+
+@dataclass
+class BatchStats:
+    # Checks sent to Oso Cloud in a batch
+    checks: int = 0
+    # Requests sent to Oso Cloud
+    batches: int = 0
+    # Batches sent before the end of the window because they reached `max_size`
+    full: int = 0
+
+
+class _Batch:
+    __slots__ = ("fetch", "items", "full", "done", "results", "error")
+
+    def __init__(self, fetch: Callable[[List[Any]], List[bool]]) -> None:
+        self.fetch = fetch
+        self.items: List[Any] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: List[bool] = []
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncBatch:
+    __slots__ = ("fetch", "items", "futures", "timer")
+
+    def __init__(self, fetch: Callable[[List[Any]], Awaitable[List[bool]]]) -> None:
+        self.fetch = fetch
+        self.items: List[Any] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class Batcher:
+    """Send concurrent authorization checks to Oso Cloud in batches.
+
+    Pass an instance to `oso_sdk.init` to gather the checks of concurrent
+    requests that share an actor and an action, and send them as a single
+    `authorize_resources` request. A batch is sent `window` seconds after its
+    first check, or as soon as it holds `max_size` checks, whichever comes
+    first, so no check waits longer than `window` to be sent.
+
+    Synchronous checks are batched across threads and asynchronous checks
+    across the tasks of an event loop.
+
+    Args:
+        window (float, optional): Seconds to wait for more checks after the
+            first one. Defaults to 0.002.
+        max_size (int, optional): Checks sent in a single request.
+            Defaults to 64.
+
+    Raises:
+        ValueError: If `window` is negative or `max_size` is less than 1.
+    """
+
+    def __init__(self, window: float = 0.002, max_size: int = 64):
+        if window < 0 or max_size < 1:
+            raise ValueError(
+                "`window` can't be negative and `max_size` must be at least 1"
+            )
+
+        self.window = window
+        self.max_size = max_size
+        self.stats = BatchStats()
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, _Batch] = {}
+        self._async_pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _AsyncBatch]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks: Set[asyncio.Task] = set()
+
+    def check(
+        self,
+        group: Hashable,
+        item: Any,
+        fetch: Callable[[List[Any]], List[bool]],
+    ) -> bool:
+        """Add `item` to the pending batch of `group` and wait for its result.
+
+        The first check of a batch sends it, with its `fetch`, which returns a
+        decision for each item of the batch.
+        """
+        with self._lock:
+            batch = self._pending.get(group)
+            leader = batch is None
+            if batch is None:
+                batch = self._pending[group] = _Batch(fetch)
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                del self._pending[group]
+                batch.full.set()
+
+        if leader:
+            full = batch.full.wait(self.window)
+            with self._lock:
+                if full:
+                    self.stats.full += 1
+                elif self._pending.get(group) is batch:
+                    del self._pending[group]
+            self._send(batch)
+        # The leader may have a later deadline, or none
+        elif not batch.done.wait(remaining()):
+            raise OsoSdkTimeoutError("authorization deadline exceeded")
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _send(self, batch: _Batch):
+        try:
+            batch.results = batch.fetch(batch.items)
+            self._count(batch.items)
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+
+    async def check_async(
+        self,
+        group: Hashable,
+        item: Any,
+        fetch: Callable[[List[Any]], Awaitable[List[bool]]],
+    ) -> bool:
+        """Like `check`, for checks made on an event loop."""
+        loop = asyncio.get_running_loop()
+        pending = self._async_pending.setdefault(loop, {})
+        batch = pending.get(group)
+        if batch is None:
+            batch = pending[group] = _AsyncBatch(fetch)
+            batch.timer = loop.call_later(
+                self.window, self._flush_async, pending, group, batch
+            )
+
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_size:
+            self.stats.full += 1
+            self._flush_async(pending, group, batch)
+        return await future
+
+    def _flush_async(
+        self, pending: Dict[Hashable, _AsyncBatch], group: Hashable, batch: _AsyncBatch
+    ):
+        if pending.get(group) is not batch:
+            return
+
+        del pending[group]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._send_async(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_async(self, batch: _AsyncBatch):
+        try:
+            results = await batch.fetch(batch.items)
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._count(batch.items)
+        for i, future in enumerate(batch.futures):
+            # The caller was cancelled
+            if not future.done():
+                future.set_result(results[i])
+
+    def _count(self, items: List[Any]):
+        with self._lock:
+            self.stats.checks += len(items)
+            self.stats.batches += 1
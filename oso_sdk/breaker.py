@@ -0,0 +1,199 @@
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from .exceptions import OsoSdkCircuitOpenError, OsoSdkInternalError
+
+
+class CircuitState(Enum):
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+@dataclass
+class BreakerStats:
+    # Calls rejected without a request to Oso Cloud
+    rejected: int = 0
+    # Times the circuit opened
+    opened: int = 0
+
+
+class CircuitBreaker:
+    """Stop calling Oso Cloud while it is failing.
+
+    Pass an instance to `oso_sdk.init` to count the requests to Oso Cloud that
+    fail. Once at least `min_calls` calls were made within `window` seconds and
+    the fraction of them that failed reaches `threshold`, the circuit opens:
+    checks that aren't answered from a cache fail right away for `open_for`
+    seconds. The circuit is then half-open and lets `probes` calls through.
+    It closes if they succeed, and opens again otherwise.
+
+    Errors raised by the SDK itself, e.g. a full executor, are not failures.
+
+    Args:
+        threshold (float, optional): Fraction of failed calls that opens the
+            circuit. Defaults to 0.5.
+        min_calls (int, optional): Calls within `window` before the circuit
+            may open. Defaults to 20.
+        window (float, optional): Seconds over which failures are counted.
+            Defaults to 10.
+        open_for (float, optional): Seconds the circuit stays open.
+            Defaults to 30.
+        probes (int, optional): Concurrent calls let through while half-open.
+            Defaults to 1.
+        on_state_change (Optional[Callable[[CircuitState, CircuitState], Any]], optional):
+            Called with the previous and the new state on every transition.
+            Defaults to None.
+
+    Raises:
+        ValueError: If `threshold` isn't in (0, 1], or `min_calls` or `probes`
+            is less than 1.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        min_calls: int = 20,
+        window: float = 10.0,
+        open_for: float = 30.0,
+        probes: int = 1,
+        on_state_change: Optional[Callable[[CircuitState, CircuitState], Any]] = None,
+    ):
+        if not 0 < threshold <= 1 or min_calls < 1 or probes < 1:
+            raise ValueError(
+                "`threshold` must be in (0, 1], `min_calls` and `probes` at least 1"
+            )
+
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.probes = probes
+        self.on_state_change = on_state_change
+        self.stats = BreakerStats()
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._window_start = time.monotonic()
+        self._calls = 0
+        self._failures = 0
+        self._probing = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            # An expired open state is reported as half-open
+            if self._state == CircuitState.OPEN and self._open_expired():
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Call `func` if the circuit allows it.
+
+        Raises:
+            OsoSdkCircuitOpenError: If the circuit is open.
+        """
+        probe = self._acquire()
+        try:
+            result = func()
+        except OsoSdkInternalError:
+            self._release(probe)
+            raise
+        except Exception:
+            self._record(probe, failed=True)
+            raise
+        except BaseException:
+            self._release(probe)
+            raise
+
+        self._record(probe, failed=False)
+        return result
+
+    async def call_async(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Like `call`, for a coroutine function."""
+        probe = self._acquire()
+        try:
+            result = await func()
+        except OsoSdkInternalError:
+            self._release(probe)
+            raise
+        except Exception:
+            self._record(probe, failed=True)
+            raise
+        except BaseException:
+            self._release(probe)
+            raise
+
+        self._record(probe, failed=False)
+        return result
+
+    def _open_expired(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_for
+
+    def _acquire(self) -> bool:
+        """Let a call through, returning whether it is a half-open probe."""
+        with self._lock:
+            transition = None
+            if self._state == CircuitState.OPEN and self._open_expired():
+                transition = self._transition(CircuitState.HALF_OPEN)
+
+            if self._state == CircuitState.CLOSED:
+                probe = False
+            elif self._state == CircuitState.HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                probe = True
+            else:
+                self.stats.rejected += 1
+                probe = None
+
+        self._notify(transition)
+        if probe is None:
+            raise OsoSdkCircuitOpenError("circuit breaker is open")
+        return probe
+
+    def _release(self, probe: bool):
+        if probe:
+            with self._lock:
+                self._probing -= 1
+
+    def _record(self, probe: bool, failed: bool):
+        with self._lock:
+            transition = None
+            if probe:
+                self._probing -= 1
+                if self._state == CircuitState.HALF_OPEN:
+                    transition = self._transition(
+                        CircuitState.OPEN if failed else CircuitState.CLOSED
+                    )
+            elif self._state == CircuitState.CLOSED:
+                now = time.monotonic()
+                if now - self._window_start >= self.window:
+                    self._window_start = now
+                    self._calls = self._failures = 0
+                self._calls += 1
+                self._failures += failed
+                if (
+                    self._calls >= self.min_calls
+                    and self._failures >= self.threshold * self._calls
+                ):
+                    transition = self._transition(CircuitState.OPEN)
+
+        self._notify(transition)
+
+    def _transition(self, state: CircuitState):
+        """Change state, holding the lock. Returns the transition to notify."""
+        previous, self._state = self._state, state
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            self.stats.opened += 1
+        elif state == CircuitState.CLOSED:
+            self._window_start = time.monotonic()
+            self._calls = self._failures = 0
+        return (previous, state)
+
+    def _notify(self, transition):
+        if transition is not None and self.on_state_change is not None:
+            self.on_state_change(*transition)
@@ -0,0 +1,423 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+# (actor type, actor id, action, resource type, resource id)
+CacheKey = Tuple[str, str, str, str, str]
+# (type, id)
+Entity = Tuple[str, str]
+
+
+def to_typed_id(value: Any) -> Optional[Tuple[str, str]]:
+    """Normalize an Oso value into a `(type, id)` pair.
+
+    Returns:
+        Optional[Tuple[str, str]]: `None` if the value can't be used as a cache key.
+    """
+    if isinstance(value, str):
+        return ("String", value)
+    if isinstance(value, dict):
+        value_type, value_id = value.get("type"), value.get("id")
+        if value_type is not None and value_id is not None:
+            return (str(value_type), str(value_id))
+    return None
+
+
+def to_cache_key(actor: Any, action: str, resource: Any) -> Optional[CacheKey]:
+    actor_id = to_typed_id(actor)
+    resource_id = to_typed_id(resource)
+    if actor_id is None or resource_id is None:
+        return None
+
+    return (actor_id[0], actor_id[1], str(action), resource_id[0], resource_id[1])
+
+
+def key_entities(key: CacheKey) -> Tuple[Entity, Entity]:
+    return ((key[0], key[1]), (key[3], key[4]))
+
+
+def fact_entities(fact: Any) -> Optional[Set[Entity]]:
+    """Collect the entities a fact refers to.
+
+    Returns:
+        Optional[Set[Entity]]: `None` if the fact has wildcard arguments, so any
+            entity may be affected.
+    """
+    entities = set()
+    for arg in fact.get("args", []):
+        entity = to_typed_id(arg)
+        if entity is None:
+            return None
+        entities.add(entity)
+
+    return entities
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    # Hits on decisions due for a refresh, see `refresh_ahead` and `max_stale`
+    stale_hits: int = 0
+
+
+class BaseDecisionCache:
+    """The interface `OsoSdk` uses to cache authorization decisions.
+
+    A decision that is close to or past its TTL can still be served while
+    `OsoSdk` refreshes it in the background (stale-while-revalidate).
+
+    Args:
+        allow_ttl (float): Seconds an allowed decision is kept.
+        deny_ttl (float): Seconds a denied decision is kept.
+        refresh_ahead (float, optional): Fraction of the TTL, counted back from
+            its end, during which a hit triggers a background refresh.
+            Defaults to 0.
+        max_stale (float, optional): Seconds past the TTL during which a
+            decision is still served while it is refreshed. After that, the
+            check waits for Oso Cloud. Defaults to 0.
+
+    Raises:
+        ValueError: If `refresh_ahead` is not in [0, 1) or `max_stale` is negative.
+    """
+
+    def __init__(
+        self,
+        allow_ttl: float,
+        deny_ttl: float,
+        refresh_ahead: float = 0.0,
+        max_stale: float = 0.0,
+    ):
+        if not 0 <= refresh_ahead < 1:
+            raise ValueError("`refresh_ahead` must be in [0, 1)")
+        if max_stale < 0:
+            raise ValueError("`max_stale` cannot be negative")
+
+        self.allow_ttl = allow_ttl
+        self.deny_ttl = deny_ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.stats = CacheStats()
+
+    @property
+    def generation(self) -> int:
+        """A counter incremented by every invalidation, see `set`."""
+        raise NotImplementedError  # pragma: no cover
+
+    def get(self, key: CacheKey) -> Optional[bool]:
+        """Look up a decision.
+
+        Returns:
+            Optional[bool]: The cached decision, or `None` on a miss.
+        """
+        return self.lookup(key)[0]
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[bool], bool]:
+        """Look up a decision, and whether it is due for a refresh.
+
+        Returns:
+            Tuple[Optional[bool], bool]: The cached decision, or `None` on a miss,
+                and `True` if the decision should be refreshed.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def set(
+        self,
+        key: CacheKey,
+        allowed: bool,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        """Store a decision.
+
+        Args:
+            ttl (Optional[float], optional): Override the allow/deny TTL for this
+                decision. A TTL of 0 or less is not stored. Defaults to None.
+            generation (Optional[int], optional): The `generation` read before the
+                decision was fetched. If the cache was invalidated since, the
+                decision may predate a write and is not stored. Defaults to None.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def invalidate(self, entities: Iterable[Entity]) -> int:
+        """Drop every decision whose actor or resource is one of `entities`.
+
+        Returns:
+            int: The number of decisions dropped.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def clear(self):
+        raise NotImplementedError  # pragma: no cover
+
+    def _ttl(self, allowed: bool, ttl: Optional[float]) -> float:
+        if ttl is None:
+            return self.allow_ttl if allowed else self.deny_ttl
+        return ttl
+
+    def _deadlines(self, now: float, ttl: float) -> Tuple[float, float]:
+        """When a decision stored at `now` is due for a refresh, and when it expires."""
+        return (now + ttl * (1 - self.refresh_ahead), now + ttl + self.max_stale)
+
+
+class DecisionCache(BaseDecisionCache):
+    """A size-bounded, TTL-expiring cache of authorization decisions.
+
+    Pass an instance to `oso_sdk.init` to answer repeated checks of the same
+    (actor, action, resource) without a round trip to Oso Cloud. The cache is
+    safe to share between threads.
+
+    Decisions are indexed by actor and by resource so that fact writes made
+    through `OsoSdk` only drop the decisions they can affect.
+
+    Args:
+        maxsize (int, optional): Maximum number of decisions to keep. The least
+            recently used decision is evicted first. Defaults to 1024.
+        allow_ttl (float, optional): Seconds an allowed decision is kept.
+            Defaults to 30.
+        deny_ttl (float, optional): Seconds a denied decision is kept.
+            Defaults to 5.
+        refresh_ahead (float, optional): See `BaseDecisionCache`. Defaults to 0.
+        max_stale (float, optional): See `BaseDecisionCache`. Defaults to 0.
+
+    Raises:
+        ValueError: If `maxsize` is less than 1.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        allow_ttl: float = 30.0,
+        deny_ttl: float = 5.0,
+        refresh_ahead: float = 0.0,
+        max_stale: float = 0.0,
+    ):
+        if maxsize < 1:
+            raise ValueError("`maxsize` must be at least 1")
+
+        super().__init__(allow_ttl, deny_ttl, refresh_ahead, max_stale)
+        self.maxsize = maxsize
+        self._generation = 0
+        # key -> (allowed, refresh at, expires at)
+        self._entries: "OrderedDict[CacheKey, Tuple[bool, float, float]]" = (
+            OrderedDict()
+        )
+        self._index: Dict[Entity, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[bool], bool]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return (None, False)
+
+            allowed, refresh_at, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.stats.misses += 1
+                return (None, False)
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            if refresh_at <= now:
+                self.stats.stale_hits += 1
+                return (allowed, True)
+            return (allowed, False)
+
+    def set(
+        self,
+        key: CacheKey,
+        allowed: bool,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        ttl = self._ttl(allowed, ttl)
+        if ttl <= 0:
+            return
+
+        refresh_at, expires_at = self._deadlines(time.monotonic(), ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if key not in self._entries:
+                for entity in key_entities(key):
+                    self._index.setdefault(entity, set()).add(key)
+            self._entries[key] = (allowed, refresh_at, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, entities: Iterable[Entity]) -> int:
+        count = 0
+        with self._lock:
+            self._generation += 1
+            for entity in entities:
+                for key in list(self._index.get(entity, ())):
+                    self._remove(key)
+                    count += 1
+            self.stats.invalidations += count
+
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._index.clear()
+
+    def _remove(self, key: CacheKey):
+        del self._entries[key]
+        for entity in key_entities(key):
+            # The actor and the resource may be the same entity
+            keys = self._index.get(entity)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[entity]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass
+class ActionSetStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class ActionSetCache:
+    """A size-bounded, TTL-expiring cache of the actions actors have on resources.
+
+    Pass an instance to `oso_sdk.init` to answer checks of any action on a
+    resource from a single `actions` request: a check that isn't memoized or
+    in the decision cache fetches every action the actor has on the resource,
+    and later checks of other actions on it are answered from that set. The
+    cache is safe to share between threads.
+
+    Args:
+        maxsize (int, optional): Maximum number of action sets to keep. The
+            least recently used set is evicted first. Defaults to 1024.
+        ttl (float, optional): Seconds an action set is kept. Defaults to 30.
+
+    Raises:
+        ValueError: If `maxsize` is less than 1.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        if maxsize < 1:
+            raise ValueError("`maxsize` must be at least 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = ActionSetStats()
+        self._generation = 0
+        # (actor, resource) -> (actions, expires at)
+        self._entries: "OrderedDict[Tuple[Entity, Entity], Tuple[FrozenSet[str], float]]" = (
+            OrderedDict()
+        )
+        self._index: Dict[Entity, Set[Tuple[Entity, Entity]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """A counter incremented by every invalidation, see `set`."""
+        return self._generation
+
+    def get(self, key: Tuple[Entity, Entity]) -> Optional[FrozenSet[str]]:
+        """Look up the actions of an (actor, resource) pair.
+
+        Returns:
+            Optional[FrozenSet[str]]: The cached actions, or `None` on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(
+        self,
+        key: Tuple[Entity, Entity],
+        actions: FrozenSet[str],
+        generation: Optional[int] = None,
+    ):
+        """Store the actions of an (actor, resource) pair.
+
+        Args:
+            generation (Optional[int], optional): The `generation` read before
+                the actions were fetched. If the cache was invalidated since,
+                they may predate a write and are not stored. Defaults to None.
+        """
+        if self.ttl <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if key not in self._entries:
+                for entity in key:
+                    self._index.setdefault(entity, set()).add(key)
+            self._entries[key] = (actions, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, entities: Iterable[Entity]) -> int:
+        """Drop every action set whose actor or resource is one of `entities`.
+
+        Returns:
+            int: The number of action sets dropped.
+        """
+        count = 0
+        with self._lock:
+            self._generation += 1
+            for entity in entities:
+                for key in list(self._index.get(entity, ())):
+                    self._remove(key)
+                    count += 1
+            self.stats.invalidations += count
+
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._index.clear()
+
+    def _remove(self, key: Tuple[Entity, Entity]):
+        del self._entries[key]
+        for entity in key:
+            # The actor and the resource may be the same entity
+            keys = self._index.get(entity)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[entity]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, Tuple, Union
+
+from .exceptions import OsoSdkTimeoutError
+
+# When the current authorization check must be done by, in `time.monotonic()`
+_deadline: ContextVar[Optional[float]] = ContextVar("oso_sdk_deadline", default=None)
+
+Timeout = Union[None, float, Tuple[Optional[float], Optional[float]]]
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Bound the requests to Oso Cloud made in this context to `seconds`.
+
+    Use None to lift the deadline, e.g. for background work started from a
+    request.
+    """
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def expired() -> bool:
+    at = _deadline.get()
+    return at is not None and time.monotonic() >= at
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, if any.
+
+    Raises:
+        OsoSdkTimeoutError: If the deadline has passed.
+    """
+    at = _deadline.get()
+    if at is None:
+        return None
+
+    left = at - time.monotonic()
+    if left <= 0:
+        raise OsoSdkTimeoutError("authorization deadline exceeded")
+    return left
+
+
+def cap_timeout(timeout: Timeout) -> Timeout:
+    """Shorten a `requests` timeout so it ends by the deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return (
+            left if connect is None else min(connect, left),
+            left if read is None else min(read, left),
+        )
+    return left if timeout is None else min(timeout, left)
@@ -1,2 +1,14 @@
 class OsoSdkInternalError(Exception):
     pass
+
+
+class OsoSdkOverloadedError(OsoSdkInternalError):
+    """The executor for blocking calls to Oso Cloud has no room for more work."""
+
+
+class OsoSdkTimeoutError(OsoSdkInternalError):
+    """The deadline of the current authorization check has passed."""
+
+
+class OsoSdkCircuitOpenError(OsoSdkInternalError):
+    """Oso Cloud is failing, and the circuit breaker rejected the call."""
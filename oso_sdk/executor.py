@@ -0,0 +1,85 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .exceptions import OsoSdkOverloadedError
+
+
+@dataclass
+class ExecutorStats:
+    submitted: int = 0
+    # Calls rejected because every worker was busy and the queue was full
+    rejected: int = 0
+
+
+class BoundedExecutor:
+    """A dedicated thread pool for blocking calls to Oso Cloud.
+
+    Pass an instance to `oso_sdk.init` so that blocking requests made from an
+    event loop don't compete with the application for the framework's
+    threadpool. At most `max_queue` calls wait for one of the `max_workers`
+    threads; past that, calls fail immediately with `OsoSdkOverloadedError`,
+    which integrations turn into an authorization failure.
+
+    Calls run in a copy of the caller's context, so context variables set
+    while handling a request are visible to them.
+
+    Args:
+        max_workers (int, optional): Threads making blocking calls.
+            Defaults to 8.
+        max_queue (int, optional): Calls that may wait for a free thread.
+            Defaults to 32.
+
+    Raises:
+        ValueError: If `max_workers` is less than 1 or `max_queue` is negative.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 32):
+        if max_workers < 1 or max_queue < 0:
+            raise ValueError(
+                "`max_workers` must be at least 1 and `max_queue` can't be negative"
+            )
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.stats = ExecutorStats()
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Schedule `func(*args, **kwargs)`.
+
+        Raises:
+            OsoSdkOverloadedError: If `max_queue` calls are already waiting.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats.rejected += 1
+            raise OsoSdkOverloadedError(
+                f"{self.max_workers} workers busy and {self.max_queue} calls queued"
+            )
+
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="oso-sdk"
+                    )
+                self.stats.submitted += 1
+            context = contextvars.copy_context()
+            future = self._executor.submit(lambda: context.run(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        # Also called when the future is cancelled while queued
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,229 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Optional, Set
+
+# Hedges that may be sent in a burst, after a quiet period
+_MAX_TOKENS = 10.0
+# Recompute the hedge delay after this many new samples
+_RECOMPUTE_EVERY = 16
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    # Second requests sent because the first one was slow
+    hedged: int = 0
+    # Hedged calls answered by the second request
+    hedge_wins: int = 0
+    # Slow calls that weren't hedged because the budget was spent
+    over_budget: int = 0
+    # Synchronous calls or hedges not made on the thread pool because every
+    # thread was busy
+    saturated: int = 0
+
+
+class Hedger:
+    """Send a second request when the first one is slower than usual.
+
+    Pass an instance to `oso_sdk.init` to cut the tail latency of requests to
+    Oso Cloud. When a request hasn't answered after the `percentile`-th
+    latency of recent requests, an identical request is sent, and whichever
+    answers first wins.
+
+    Hedges are paid for by a budget: every call earns `budget` hedges, up to a
+    burst of 10, so at most a `budget` fraction of extra requests is sent over
+    time, even while Oso Cloud is slow.
+
+    Synchronous calls are made from a dedicated thread pool, so the caller
+    can stop waiting on a slow request. Calls are never queued: while all
+    `max_workers` threads are busy, calls are made on the caller's thread
+    without a hedge, and slow calls aren't hedged. The hedge delay runs from
+    the moment the first request is sent.
+
+    Args:
+        percentile (float, optional): Latency percentile after which a request
+            is hedged. Defaults to 95.
+        budget (float, optional): Extra requests allowed, as a fraction of all
+            requests. Defaults to 0.05.
+        min_delay (float, optional): Seconds to wait before hedging, whatever
+            the percentile. Defaults to 0.005.
+        samples (int, optional): Recent latencies the percentile is computed
+            from. Defaults to 512.
+        min_samples (int, optional): Latencies recorded before any request is
+            hedged. Defaults to 32.
+        max_workers (int, optional): Threads making synchronous requests,
+            first requests and hedges alike. Defaults to 16.
+
+    Raises:
+        ValueError: If `percentile` isn't in (0, 100) or `budget` isn't in [0, 1].
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        min_delay: float = 0.005,
+        samples: int = 512,
+        min_samples: int = 32,
+        max_workers: int = 16,
+    ):
+        if not 0 < percentile < 100 or not 0 <= budget <= 1:
+            raise ValueError("`percentile` must be in (0, 100) and `budget` in [0, 1]")
+
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.stats = HedgeStats()
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=samples)
+        self._new_samples = 0
+        self._delay: Optional[float] = None
+        self._tokens = 0.0
+        self._running = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Seconds after which a request is hedged, None until enough samples."""
+        with self._lock:
+            return self._delay
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Call `func`, calling it again if the first call is slow."""
+        delay = self._start()
+        if delay is None:
+            return self._timed(func)
+
+        if not self._reserve():
+            return self._timed(func)
+
+        futures = [self._submit(func)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._reserve():
+            if self._spend():
+                futures.append(self._submit(func))
+            else:
+                self._release()
+
+        pending: Set[Future] = set(futures)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [f for f in done if f.exception() is None]
+            if succeeded or not pending:
+                future = (succeeded or list(done))[0]
+                self._won(future is not futures[0])
+                return future.result()
+
+    async def call_async(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Like `call`, for a coroutine function."""
+        delay = self._start()
+        if delay is None:
+            return await self._timed_async(func)
+
+        tasks = [asyncio.ensure_future(self._timed_async(func))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._spend():
+                tasks.append(asyncio.ensure_future(self._timed_async(func)))
+
+            pending: Set[asyncio.Future] = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [t for t in done if t.exception() is None]
+                if succeeded or not pending:
+                    task = (succeeded or list(done))[0]
+                    self._won(task is not tasks[0])
+                    return task.result()
+        finally:
+            # Cancel the losing request, and both if the caller was cancelled
+            for task in tasks:
+                task.cancel()
+
+    def _start(self) -> Optional[float]:
+        with self._lock:
+            self.stats.calls += 1
+            self._tokens = min(_MAX_TOKENS, self._tokens + self.budget)
+            return self._delay
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self.stats.over_budget += 1
+                return False
+            self._tokens -= 1
+            self.stats.hedged += 1
+            return True
+
+    def _won(self, hedge: bool):
+        if hedge:
+            with self._lock:
+                self.stats.hedge_wins += 1
+
+    def _record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            self._new_samples += 1
+            if (
+                self._new_samples < _RECOMPUTE_EVERY and self._delay is not None
+            ) or len(self._latencies) < self.min_samples:
+                return
+
+            self._new_samples = 0
+            latencies = sorted(self._latencies)
+            index = int(self.percentile / 100 * (len(latencies) - 1))
+            self._delay = max(self.min_delay, latencies[index])
+
+    def _timed(self, func: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        result = func()
+        self._record(time.monotonic() - start)
+        return result
+
+    async def _timed_async(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await func()
+        self._record(time.monotonic() - start)
+        return result
+
+    def _reserve(self) -> bool:
+        """Reserve an idle thread of the pool, False if every thread is busy."""
+        with self._lock:
+            if self._running >= self.max_workers:
+                self.stats.saturated += 1
+                return False
+            self._running += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="oso-sdk-hedge"
+                )
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._running -= 1
+
+    def _submit(self, func: Callable[[], Any]) -> Future:
+        """Call `func` on a reserved thread, returning once it has started."""
+        assert self._executor is not None
+        context = contextvars.copy_context()
+        started = threading.Event()
+
+        def run() -> Any:
+            started.set()
+            try:
+                return context.run(self._timed, func)
+            finally:
+                self._release()
+
+        future = self._executor.submit(run)
+        started.wait()
+        return future
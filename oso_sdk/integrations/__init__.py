@@ -1,9 +1,30 @@
 import inspect
+import re
 import string
+import traceback
 from dataclasses import dataclass
 from enum import Enum
 from functools import wraps
-from typing import Dict, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from ..constants import RESOURCE_ID_DEFAULT
+from ..deadline import expired as deadline_expired
+from ..exceptions import OsoSdkCircuitOpenError, OsoSdkInternalError
+from ..jwt import JwtVerifier
+from .utils import default_get_action_from_method
 
 
 class ResourceIdKind(Enum):
@@ -11,12 +32,116 @@ class ResourceIdKind(Enum):
     PARAM = 2
 
 
-@dataclass
-class Route:
-    action: Optional[str]
-    resource_type: Optional[str]
+@dataclass(frozen=True)
+class Resource:
+    """One of several resources to authorize on a route, see `Integration.enforce`.
+
+    Args:
+        resource_id (str): The resource id to authorize. Usually a route parameter.
+        resource_type (Optional[str], optional): The resource type. Defaults to the
+            `resource_type` of the route.
+        action (Optional[str], optional): The action to authorize on this resource.
+            Defaults to the action of the route.
+    """
+
     resource_id: str
-    resource_id_kind: ResourceIdKind
+    resource_type: Optional[str] = None
+    action: Optional[str] = None
+
+
+# An action (None for the action of the request), a resource type, and a
+# literal resource id or the name of the path parameter holding it
+PlanCheck = Tuple[Optional[str], str, str, bool]
+
+
+class Plan:
+    """How requests to an endpoint are enforced, compiled once per endpoint.
+
+    Plans are immutable, so a request only reads their attributes.
+    """
+
+    __slots__ = (
+        "action",
+        "checks",
+        "cache_ttl",
+        "deadline",
+        "fallback",
+        "require_all",
+    )
+
+    action: Optional[str]
+    checks: Tuple[PlanCheck, ...]
+    cache_ttl: Optional[float]
+    deadline: Optional[float]
+    fallback: Optional[bool]
+    require_all: bool
+
+    def __init__(
+        self,
+        action: Optional[str],
+        checks: Tuple[PlanCheck, ...],
+        cache_ttl: Optional[float] = None,
+        deadline: Optional[float] = None,
+        fallback: Optional[bool] = None,
+        require_all: bool = True,
+    ) -> None:
+        for name, value in (
+            ("action", action),
+            ("checks", checks),
+            ("cache_ttl", cache_ttl),
+            ("deadline", deadline),
+            ("fallback", fallback),
+            ("require_all", require_all),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("`Plan` is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("`Plan` is immutable")
+
+    def resources(
+        self, action: str, params: Mapping[str, Any]
+    ) -> List[Tuple[str, Dict[str, str]]]:
+        """The (action, resource) pairs to authorize for a request."""
+        return [
+            (
+                check_action or action,
+                {
+                    "type": resource_type,
+                    "id": str(params[resource_id]) if param else resource_id,
+                },
+            )
+            for check_action, resource_type, resource_id, param in self.checks
+        ]
+
+
+@dataclass
+class RouteReport:
+    """How requests to a route are enforced, see `Integration.analyze_routes`."""
+
+    path: str
+    method: str
+    endpoint: str
+    # Whether requests are authorized
+    enforced: bool
+    # Whether the resource type is made from the endpoint name, without `enforce`
+    default: bool
+    # The (action, resource type) pairs authorized. The action is None when
+    # it's identified by a custom function, or the method has no default action.
+    checks: Tuple[Tuple[Optional[str], str], ...]
+
+
+@dataclass
+class _AppRoute:
+    path: str
+    methods: Collection[str]
+    endpoint: Callable
+    name: str
+    params: Collection[str]
+    # Whether the SDK authorizes requests to the route
+    attached: bool
 
 
 def to_resource_type(resource_type: str) -> str:
@@ -27,11 +152,22 @@ class Integration:
     """_summary_"""
 
     def __init__(self, optin: bool, exception: Optional[Exception]):
-        self.routes: Dict[str, Route] = {}
+        # Plans of the endpoints returned by `enforce`
+        self.routes: Dict[Callable, Plan] = {}
+        # Plans of every endpoint that was requested, None if it isn't enforced
+        self._plans: Dict[Callable, Optional[Plan]] = {}
         self._identify_action_from_method = None
         self._identify_user_from_request = None
         self._optin = optin
         self._custom_exception: Optional[Exception] = exception
+        self.deadline: Optional[float] = None
+        # Identifies users from their bearer token, without a custom function
+        self.jwt: Optional[JwtVerifier] = None
+        # Matches the paths of requests that are never authorized
+        self._exempt_path: Optional[Callable[[str], Any]] = None
+        self._exempt_endpoints: Set[Union[str, Callable]] = set()
+        # Checks that failed closed because their deadline passed
+        self.timeouts = 0
 
     def identify_user_from_request(self, f):
         """Override the default function used to identify the "actor" to authorize.
@@ -57,36 +193,265 @@ class Integration:
         """
         self._identify_action_from_method = f
 
+    def analyze_routes(self, app: Any) -> List[RouteReport]:
+        """Compile the plan of every route of an app and report how it's enforced.
+
+        Call it once the routes are declared, e.g. at startup, so requests don't
+        compile plans and misconfigured routes fail at boot instead of on their
+        first request.
+
+        Args:
+            app (Any): The app whose routes are analyzed.
+
+        Raises:
+            ValueError: If a route enforces a path parameter its path doesn't have.
+        """
+        declared = {id(plan) for plan in self.routes.values()}
+        report: List[RouteReport] = []
+        errors = []
+        for route in self._app_routes(app):
+            plan = (
+                self._plan(route.endpoint, route.name)
+                if route.attached
+                and (self._exempt_path is None or not self._exempt_path(route.path))
+                else None
+            )
+            if plan is None:
+                report.extend(
+                    RouteReport(route.path, method, route.name, False, False, ())
+                    for method in sorted(route.methods)
+                )
+                continue
+
+            missing = [
+                resource_id
+                for _, _, resource_id, param in plan.checks
+                if param and resource_id not in route.params
+            ]
+            if missing:
+                errors.append(f"{route.path} has no `{'`, `'.join(missing)}`")
+
+            for method in sorted(route.methods):
+                action = plan.action or self._default_action(method)
+                report.append(
+                    RouteReport(
+                        route.path,
+                        method,
+                        route.name,
+                        True,
+                        id(plan) not in declared,
+                        tuple(
+                            dict.fromkeys(
+                                (check_action or action, resource_type)
+                                for check_action, resource_type, _, _ in plan.checks
+                            )
+                        ),
+                    )
+                )
+
+        if errors:
+            raise ValueError(f"Path parameters not found: {'; '.join(errors)}")
+        return report
+
+    def _app_routes(self, app: Any) -> Iterator[_AppRoute]:
+        raise NotImplementedError  # pragma: no cover
+
+    def _default_action(self, method: str) -> Optional[str]:
+        """The action of a method known before a request, if any."""
+        if self._identify_action_from_method:
+            return None
+
+        try:
+            return default_get_action_from_method(method)
+        except OsoSdkInternalError:
+            return None
+
     def _parse_resource_id(self, resource_id: str) -> Tuple[ResourceIdKind, str]:
         raise NotImplementedError  # pragma: no cover
 
+    def _unauthorized(self):
+        raise NotImplementedError  # pragma: no cover
+
+    def _timed_out(self):
+        """Fail closed on a check whose deadline has passed."""
+        self.timeouts += 1
+        self._unauthorized()
+
+    def _authorize_checks(
+        self,
+        actor: Any,
+        checks: List[Tuple[str, Any]],
+        require_all: bool = True,
+        cache_ttl: Optional[float] = None,
+    ) -> bool:
+        raise NotImplementedError  # pragma: no cover
+
+    def _check(
+        self,
+        plan: Plan,
+        identify: Callable[[], Any],
+        action: Callable[[], str],
+        params: Mapping[str, Any],
+    ):
+        """Authorize a request of a synchronous integration, failing closed.
+
+        Args:
+            plan (Plan): The plan of the endpoint serving the request.
+            identify (Callable[[], Any]): Identifies the user of the request.
+            action (Callable[[], str]): Identifies the action of the request's
+                method, unless the plan has one.
+            params (Mapping[str, Any]): The path parameters of the request.
+        """
+        try:
+            user_id = identify()
+            request_action = plan.action or action()
+        except OsoSdkInternalError:
+            traceback.print_exc()
+            self._unauthorized()
+        if deadline_expired():
+            self._timed_out()
+
+        checks = plan.resources(str(request_action), params)
+
+        try:
+            allowed = self._authorize_checks(
+                actor={"type": "User", "id": str(user_id)},
+                checks=checks,
+                require_all=plan.require_all,
+                cache_ttl=plan.cache_ttl,
+            )
+        except OsoSdkCircuitOpenError:
+            allowed = bool(plan.fallback)
+        except Exception:
+            if deadline_expired():
+                self._timed_out()
+            traceback.print_exc()
+            self._unauthorized()
+        # Decisions shared with a slower check can arrive past the deadline
+        if deadline_expired():
+            self._timed_out()
+
+        if not allowed:
+            self._unauthorized()
+
+    def _set_exempt(self, exempt: Sequence[Union[str, Callable]]):
+        """Never authorize requests to some paths or endpoints.
+
+        Strings starting with "/" are path prefixes, matching the path and
+        everything under it, except "/" which only matches the root. Other
+        strings are endpoint names, and callables view functions.
+        """
+        prefixes = [
+            f"{re.escape(prefix)}(?:/|$)" if prefix else "/$"
+            for prefix in (
+                e.rstrip("/")
+                for e in exempt
+                if isinstance(e, str) and e.startswith("/")
+            )
+        ]
+        self._exempt_path = re.compile("|".join(prefixes)).match if prefixes else None
+        self._exempt_endpoints = {
+            e for e in exempt if not isinstance(e, str) or not e.startswith("/")
+        }
+        self._plans.clear()
+
+    def _plan_deadline(self, plan: Optional[Plan]) -> Optional[float]:
+        return plan.deadline if plan and plan.deadline is not None else self.deadline
+
+    def _plan(self, endpoint: Callable, name: str) -> Optional[Plan]:
+        """The plan of an endpoint, None if it isn't enforced.
+
+        Args:
+            endpoint (Callable): The view function serving the request.
+            name (str): The endpoint name the default resource type is made from.
+        """
+        try:
+            return self._plans[endpoint]
+        except KeyError:
+            pass
+
+        # Decorators applied on top of `enforce` wrap the function it returned
+        plan = None
+        exempt = name in self._exempt_endpoints
+        f: Optional[Callable] = endpoint
+        while f is not None and not exempt:
+            plan = plan or self.routes.get(f)
+            exempt = f in self._exempt_endpoints
+            f = getattr(f, "__wrapped__", None)
+        if exempt:
+            plan = None
+        elif plan is None and not self._optin:
+            plan = Plan(
+                None, ((None, to_resource_type(name), RESOURCE_ID_DEFAULT, False),)
+            )
+
+        self._plans[endpoint] = plan
+        return plan
+
     def enforce(
         self,
-        resource_id: str,
+        resource_id: Union[str, Sequence[Resource]],
         action: Optional[str] = None,
         resource_type: Optional[str] = None,
+        cache_ttl: Optional[float] = None,
+        deadline: Optional[float] = None,
+        fallback: Optional[bool] = None,
+        require_all: bool = True,
     ):
         """Add or modify enforcement to an endpoint.
 
         Args:
-            resource_id (str): The resource id to authorize. Usually a route parameter.
+            resource_id (Union[str, Sequence[Resource]]): The resource id to authorize. Usually a route
+                parameter. Pass several `Resource`s to authorize more than one resource, e.g. on nested routes.
             action (Optional[str], optional): Hardcode an action for this route. Defaults to None.
             resource_type (Optional[str], optional): Hardcode a resource_type for this route. Defaults to None.
+            cache_ttl (Optional[float], optional): Seconds to cache decisions for this route, overriding the
+                `DecisionCache` TTLs. Use 0 to never cache. Defaults to None.
+            deadline (Optional[float], optional): Seconds this route has to authorize a request, overriding
+                the `deadline` passed to `oso_sdk.init`. Defaults to None.
+            fallback (Optional[bool], optional): Allow (True) or deny (False) requests to this route while the
+                circuit breaker is open, without calling Oso Cloud. Denied by default.
+            require_all (bool, optional): With several resources, authorize the request if every resource is
+                authorized (True) or if any of them is (False). Defaults to True.
 
         Raises:
-            ValueError: If `resource_id` is an empty string
+            ValueError: If `resource_id` is an empty string or sequence
         """
         if len(resource_id) == 0:
             raise ValueError("`resource_id` cannot be an empty string")
 
-        resource_id_kind, resource_id = self._parse_resource_id(resource_id)
+        specs: List[Tuple[Optional[str], Optional[str], ResourceIdKind, str]]
+        if isinstance(resource_id, str):
+            specs = [(None, resource_type, *self._parse_resource_id(resource_id))]
+        else:
+            if any(len(res.resource_id) == 0 for res in resource_id):
+                raise ValueError("`resource_id` cannot be an empty string")
+            specs = [
+                (
+                    res.action,
+                    res.resource_type or resource_type,
+                    *self._parse_resource_id(res.resource_id),
+                )
+                for res in resource_id
+            ]
 
         def decorator(f):
-            self.routes[f.__name__] = Route(
+            default_resource_type = to_resource_type(f.__name__)
+            plan = Plan(
                 action,
-                resource_type or to_resource_type(f.__name__),
-                resource_id,
-                resource_id_kind,
+                tuple(
+                    (
+                        spec_action,
+                        spec_resource_type or default_resource_type,
+                        spec_resource_id,
+                        kind == ResourceIdKind.PARAM,
+                    )
+                    for spec_action, spec_resource_type, kind, spec_resource_id in specs
+                ),
+                cache_ttl,
+                deadline,
+                fallback,
+                require_all,
             )
 
             @wraps(f)
@@ -97,9 +462,14 @@ class Integration:
             def decorated_view_sync(*args, **kwargs):
                 return f(*args, **kwargs)
 
-            if inspect.iscoroutinefunction(f):
-                return decorated_view_async
-            else:
-                return decorated_view_sync
+            decorated_view = (
+                decorated_view_async
+                if inspect.iscoroutinefunction(f)
+                else decorated_view_sync
+            )
+            # Route decorators applied below `enforce` register `f` itself
+            self.routes[f] = self.routes[decorated_view] = plan
+            self._plans.clear()
+            return decorated_view
 
         return decorator
@@ -1,15 +1,31 @@
+import asyncio
+import functools
 import inspect
 import re
 import traceback
-from typing import Optional, Tuple
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
 
 from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
 from oso_sdk import IntegrationConfig, OsoSdk
+from starlette.applications import Starlette
 from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Host, Match, Mount, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from ..constants import RESOURCE_ID_DEFAULT, USER_ID_DEFAULT
-from ..exceptions import OsoSdkInternalError
-from . import ResourceIdKind, to_resource_type, utils
+from ..cache import CacheKey
+from ..constants import USER_ID_DEFAULT
+from ..deadline import deadline_scope
+from ..deadline import expired as deadline_expired
+from ..exceptions import (
+    OsoSdkCircuitOpenError,
+    OsoSdkInternalError,
+    OsoSdkOverloadedError,
+)
+from . import Plan, ResourceIdKind, _AppRoute, utils
 
 # from starlette.routing import PARAM_REGEX
 # Copy instead of import as a safeguard against future changes to the pattern
@@ -24,60 +40,102 @@ _PARAM_REGEX = re.compile(
     re.VERBOSE,
 )
 
+# Decisions made while handling the current request
+_request_memo: ContextVar[Optional[Dict[CacheKey, bool]]] = ContextVar(
+    "oso_sdk_request_memo", default=None
+)
+# The event loop serving the current request, for background work started
+# from the threadpool
+_event_loop: ContextVar[Optional[asyncio.AbstractEventLoop]] = ContextVar(
+    "oso_sdk_event_loop", default=None
+)
+
 
 class _FastApiIntegration(OsoSdk):
     async def __call__(self, request: Request):
+        if self._exempt_path is not None and self._exempt_path(request["path"]):
+            return
         if not request["endpoint"]:
             return  # pragma: no cover
 
-        r = self.routes.get(request["endpoint"].__name__)
-        if self._optin and not r:
+        memo: Dict[CacheKey, bool] = {}
+        _request_memo.set(memo)
+        _event_loop.set(asyncio.get_running_loop())
+
+        endpoint = request["endpoint"]
+        plan = self._plan(endpoint, endpoint.__name__)
+        if plan is None:
             return
 
+        deadline = self._plan_deadline(plan)
+        if deadline is None:
+            return await self._check_async(request, plan)
+
+        # The deadline also shortens the timeouts of requests to Oso Cloud,
+        # which keep running in the threadpool after `wait_for` gives up
+        with deadline_scope(deadline):
+            try:
+                await asyncio.wait_for(self._check_async(request, plan), deadline)
+            except asyncio.TimeoutError:
+                self._timed_out()
+
+    async def _check_async(self, request: Request, plan: Plan):
         try:
             user_id = await self._get_user_from_request(request)
-            action = (r and r.action) or await self._get_action_from_method(
-                request.method
-            )
+            action = plan.action or await self._get_action_from_method(request.method)
         except OsoSdkInternalError:
             traceback.print_exc()
             self._unauthorized()
 
-        resource_type = (r and r.resource_type) or to_resource_type(
-            request["endpoint"].__name__
-        )
-        if r and r.resource_id:
-            if r.resource_id_kind == ResourceIdKind.LITERAL:
-                resource_id = r.resource_id
-            else:
-                resource_id = request.path_params.get(r.resource_id)  # type: ignore
-                if resource_id is None:
-                    raise KeyError(
-                        f"`{r.resource_id} param not found"
-                    )  # pragma: no cover
-        else:
-            resource_id = RESOURCE_ID_DEFAULT
+        checks = plan.resources(str(action), request.path_params)
 
+        # Without an async client, the blocking requests run in the SDK's
+        # executor or the threadpool
+        authorize = (
+            self._authorize_checks_async
+            if self._aio is not None
+            else self._authorize_checks
+        )
         try:
-            if not await _FastApiIntegration._run(
-                self.authorize,
+            allowed = await self._run(
+                authorize,
                 actor={"type": "User", "id": str(user_id)},
-                action=str(action),
-                resource={"type": resource_type, "id": str(resource_id)},
-            ):
-                self._unauthorized()
+                checks=checks,
+                require_all=plan.require_all,
+                cache_ttl=plan.cache_ttl,
+            )
+        except OsoSdkCircuitOpenError:
+            allowed = bool(plan.fallback)
+        except OsoSdkOverloadedError:
+            # Counted in `executor.stats`, a traceback per request would only
+            # add to the load
+            self._unauthorized()
         except Exception:
+            if deadline_expired():
+                self._timed_out()
             traceback.print_exc()
             self._unauthorized()
 
+        if not allowed:
+            self._unauthorized()
+
     def _unauthorized(self):
         if self._custom_exception:
             raise self._custom_exception
 
         raise HTTPException(status_code=404)
 
-    @staticmethod
-    async def _run(func, *args, **kwargs):
+    def _request_memo(self) -> Optional[Dict[CacheKey, bool]]:
+        return _request_memo.get()
+
+    def _run_in_background(self, func: Callable[[], None]):
+        loop = _event_loop.get()
+        if self.executor is not None or loop is None or not loop.is_running():
+            return super()._run_in_background(func)
+
+        asyncio.run_coroutine_threadsafe(run_in_threadpool(func), loop)
+
+    async def _run(self, func, *args, **kwargs):
         """TODO
         support for sync and async (documenting bc this is the most
         FastAPI specific function on this class)
@@ -89,25 +147,56 @@ class _FastApiIntegration(OsoSdk):
         """
         if inspect.iscoroutinefunction(func):
             return await func(*args, **kwargs)
+        elif self.executor is not None:
+            return await self._run_blocking(functools.partial(func, *args, **kwargs))
         else:
             return await run_in_threadpool(func, *args, **kwargs)
 
     async def _get_user_from_request(self, request: Request) -> str:
         if self._identify_user_from_request:
-            return await _FastApiIntegration._run(
+            return await self._run(
                 self._identify_user_from_request, {"request": request}
             )
+        if self.jwt is not None:
+            return self.jwt.subject(request.headers.get("authorization"))
 
         return USER_ID_DEFAULT
 
     async def _get_action_from_method(self, method: str) -> str:
         if self._identify_action_from_method:
-            return await _FastApiIntegration._run(
+            return await self._run(
                 self._identify_action_from_method, {"method": method}
             )
 
         return utils.default_get_action_from_method(method)
 
+    def _app_routes(self, app: Starlette) -> Iterator[_AppRoute]:
+        middleware = any(
+            m.cls is OsoMiddleware
+            and (getattr(m, "kwargs", None) or getattr(m, "options", {})).get("oso")
+            is self
+            for m in app.user_middleware
+        )
+        for route in app.routes:
+            if isinstance(route, APIRoute):
+                attached = middleware or any(
+                    d.dependency is self for d in route.dependencies
+                )
+            elif isinstance(route, Route) and middleware:
+                attached = True
+            else:
+                # Other routes, e.g. the docs, don't run dependencies
+                continue
+
+            yield _AppRoute(
+                route.path,
+                route.methods or (),
+                route.endpoint,
+                route.endpoint.__name__,
+                route.param_convertors.keys(),
+                attached,
+            )
+
     def _parse_resource_id(self, resource_id: str) -> Tuple[ResourceIdKind, str]:
         matches = _PARAM_REGEX.findall(resource_id)
         if not matches:
@@ -118,6 +207,63 @@ class _FastApiIntegration(OsoSdk):
             return (ResourceIdKind.PARAM, matches[0][0])
 
 
+def _match(scope: Scope, routes: Sequence[BaseRoute]) -> Optional[Scope]:
+    """The scope the router hands to the endpoint serving a request, if any."""
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            scope = {**scope, **child_scope}
+            if isinstance(route, (Mount, Host)):
+                return _match(scope, route.routes)
+            return scope
+
+    # Requests with no route, or the wrong method, don't reach an endpoint
+    return None
+
+
+class OsoMiddleware:
+    """Authorize requests as ASGI middleware, instead of a FastAPI dependency.
+
+    The middleware resolves the route of a request and rejects it before its
+    body is read, and without the overhead of dependency injection. It works
+    with FastAPI and Starlette apps. Use it instead of `Depends(oso)`:
+
+        app.add_middleware(OsoMiddleware, oso=oso)
+
+    Middleware runs outside of the app's exception handlers, so the 404, or a
+    custom `exception` that is an `HTTPException`, is sent as a JSON response.
+    Other custom exceptions are raised to the server.
+
+    Args:
+        app (ASGIApp): The app the middleware wraps.
+        oso (_FastApiIntegration): The `OsoSdk` returned by `oso_sdk.init`.
+    """
+
+    def __init__(self, app: ASGIApp, oso: _FastApiIntegration):
+        self.app = app
+        self.oso = oso
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        routes: Any = getattr(scope.get("app"), "routes", ())
+        route_scope = _match(scope, routes)
+        if route_scope is not None:
+            try:
+                # Without `receive`, the request body can't be read
+                await self.oso(Request(route_scope))
+            except StarletteHTTPException as e:
+                response = JSONResponse(
+                    {"detail": e.detail},
+                    status_code=e.status_code,
+                    headers=getattr(e, "headers", None),
+                )
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+
 class FastApiIntegration(IntegrationConfig):
     @staticmethod
     def init(
@@ -1,76 +1,41 @@
 import functools
-import re
-import traceback
-from typing import Optional, Tuple
+from typing import Dict, Iterator, Optional, Tuple
 
-from flask import Blueprint, abort, current_app, request
+from flask import Blueprint, Flask, abort, current_app, g, has_request_context, request
 from oso_sdk import IntegrationConfig, OsoSdk
 
-from ..constants import RESOURCE_ID_DEFAULT, USER_ID_DEFAULT
-from ..exceptions import OsoSdkInternalError
-from . import ResourceIdKind, to_resource_type, utils
-
-# from werkzeug.routing.rules import _part_re
-# Extract parameter regex and copy instead of import as a safeguard against
-# future changes to the pattern
-_PARAM_REGEX = re.compile(
-    r"""
-        <
-            (?:
-                (?P<converter>[a-zA-Z_][a-zA-Z0-9_]*)   # converter name
-                (?:\((?P<arguments>.*?)\))?             # converter arguments
-                \:                                      # variable delimiter
-            )?
-            (?P<variable>[a-zA-Z_][a-zA-Z0-9_]*)        # variable name
-        >
-    """,
-    re.VERBOSE,
-)
+from ..cache import CacheKey
+from ..constants import USER_ID_DEFAULT
+from ..deadline import deadline_scope
+from . import ResourceIdKind, _AppRoute, utils
 
 
 class _FlaskIntegration(OsoSdk):
     def __call__(self):
+        # Reset explicitly, `g` outlives the request if an app context was
+        # pushed, and handlers of skipped requests may still check decisions
+        g._oso_sdk_memo = {}
+
         # Route is not declared
         if request.endpoint is None:
             return
-
-        r = self.routes.get(request.endpoint)
-        if self._optin and not r:
+        if self._exempt_path is not None and self._exempt_path(request.path):
             return
 
-        try:
-            user_id = self._get_user_from_request()
-            action = (r and r.action) or self._get_action_from_method()
-        except OsoSdkInternalError:
-            traceback.print_exc()
-            self._unauthorized()
-
-        resource_type = (r and r.resource_type) or to_resource_type(request.endpoint)
-        if r and r.resource_id:
-            if r.resource_id_kind == ResourceIdKind.LITERAL:
-                resource_id = r.resource_id
-            elif request.view_args:
-                resource_id = request.view_args.get(r.resource_id)
-                if resource_id is None:
-                    raise KeyError(
-                        f"`{r.resource_id} param not found"
-                    )  # pragma: no cover
-            else:
-                raise KeyError(f"`{r.resource_id}` param not found")  # pragma: no cover
+        view = current_app.view_functions.get(request.endpoint)
+        plan = view and self._plan(view, request.endpoint)
+        if plan is None:
+            return
 
-        else:
-            resource_id = RESOURCE_ID_DEFAULT
-
-        try:
-            if not self.authorize(
-                actor={"type": "User", "id": str(user_id)},
-                action=str(action),
-                resource={"type": resource_type, "id": str(resource_id)},
-            ):
-                self._unauthorized()
-        except Exception:
-            traceback.print_exc()
-            self._unauthorized()
+        # Identification can't be interrupted, so the deadline is checked once
+        # it returns. It also shortens the timeouts of requests to Oso Cloud.
+        with deadline_scope(self._plan_deadline(plan)):
+            self._check(
+                plan,
+                self._get_user_from_request,
+                self._get_action_from_method,
+                request.view_args or {},
+            )
 
     def _unauthorized(self):
         if self._custom_exception:
@@ -79,9 +44,17 @@ class _FlaskIntegration(OsoSdk):
         else:
             abort(404)
 
+    def _request_memo(self) -> Optional[Dict[CacheKey, bool]]:
+        if not has_request_context():
+            return None
+
+        return g.get("_oso_sdk_memo")
+
     def _get_user_from_request(self) -> str:
         if self._identify_user_from_request:
             return current_app.ensure_sync(self._identify_user_from_request)()
+        if self.jwt is not None:
+            return self.jwt.subject(request.headers.get("Authorization"))
 
         return USER_ID_DEFAULT
 
@@ -93,14 +66,25 @@ class _FlaskIntegration(OsoSdk):
 
         return utils.default_get_action_from_method(request.method)
 
+    def _app_routes(self, app: Flask) -> Iterator[_AppRoute]:
+        attached = "oso" in app.blueprints
+        for rule in app.url_map.iter_rules():
+            view = app.view_functions.get(rule.endpoint)
+            if view is not None:
+                yield _AppRoute(
+                    rule.rule,
+                    rule.methods or (),
+                    view,
+                    rule.endpoint,
+                    rule.arguments,
+                    attached,
+                )
+
     def _parse_resource_id(self, resource_id: str) -> Tuple[ResourceIdKind, str]:
-        matches = _PARAM_REGEX.findall(resource_id)
-        if not matches:
+        param = utils.werkzeug_path_param(resource_id)
+        if param is None:
             return (ResourceIdKind.LITERAL, resource_id)
-        if len(matches) > 1:
-            raise ValueError("Only one path parameter may be used")
-        else:
-            return (ResourceIdKind.PARAM, matches[0][2])
+        return (ResourceIdKind.PARAM, param)
 
 
 def _before_request(**kwargs):
@@ -1,8 +1,26 @@
-import base64
 import json
+import re
 from typing import Optional
 
 from ..exceptions import OsoSdkInternalError
+from ..jwt import b64decode
+
+# from werkzeug.routing.rules import _part_re
+# Extract parameter regex and copy instead of import as a safeguard against
+# future changes to the pattern
+_WERKZEUG_PARAM_REGEX = re.compile(
+    r"""
+        <
+            (?:
+                (?P<converter>[a-zA-Z_][a-zA-Z0-9_]*)   # converter name
+                (?:\((?P<arguments>.*?)\))?             # converter arguments
+                \:                                      # variable delimiter
+            )?
+            (?P<variable>[a-zA-Z_][a-zA-Z0-9_]*)        # variable name
+        >
+    """,
+    re.VERBOSE,
+)
 
 
 def default_get_action_from_method(method: Optional[str]):
@@ -49,12 +67,9 @@ def get_sub_from_jwt(authorization: Optional[str]):
     if len(parts) != 3:
         raise OsoSdkInternalError("JWT token is malformed")
 
-    # Pad payload before decoding; '=' is stripped because it's not URL-safe
-    encoding = parts[1] + "=" * (len(parts[1]) % 4)
     try:
-        payload = base64.urlsafe_b64decode(encoding)
-        data = json.loads(payload.decode("utf-8"))
-    except UnicodeDecodeError as e:
+        data = json.loads(b64decode(parts[1]).decode("utf-8"))
+    except ValueError as e:
         raise OsoSdkInternalError("JWT payload can't be decoded") from e
 
     sub = data.get("sub")
@@ -62,3 +77,21 @@ def get_sub_from_jwt(authorization: Optional[str]):
         raise OsoSdkInternalError("JWT payload missing `sub` field")
 
     return sub
+
+
+def werkzeug_path_param(resource_id: str) -> Optional[str]:
+    """Extracts the path parameter of a werkzeug rule, e.g. `<int:id>`.
+
+    Returns:
+        Optional[str]: The name of the parameter, None for a literal id.
+
+    Raises:
+        ValueError: If more than one parameter is used.
+    """
+    matches = _WERKZEUG_PARAM_REGEX.findall(resource_id)
+    if not matches:
+        return None
+    if len(matches) > 1:
+        raise ValueError("Only one path parameter may be used")
+
+    return matches[0][2]
@@ -0,0 +1,197 @@
+import asyncio
+import functools
+import inspect
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from oso_sdk import IntegrationConfig, OsoSdk
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, MapAdapter
+
+from ..cache import CacheKey
+from ..constants import USER_ID_DEFAULT
+from ..deadline import deadline_scope
+from . import ResourceIdKind, _AppRoute, utils
+
+if TYPE_CHECKING:
+    from _typeshed.wsgi import StartResponse, WSGIApplication, WSGIEnvironment
+
+# Decisions made while handling the current request
+_request_memo: ContextVar[Optional[Dict[CacheKey, bool]]] = ContextVar(
+    "oso_sdk_wsgi_request_memo", default=None
+)
+
+_NOT_FOUND_STATUS = "404 NOT FOUND"
+_NOT_FOUND_BODY = b"Not Found"
+_NOT_FOUND_HEADERS = (
+    ("Content-Type", "text/plain; charset=utf-8"),
+    ("Content-Length", str(len(_NOT_FOUND_BODY))),
+)
+
+
+class _Unauthorized(Exception):
+    """Raised to send the default 404 response."""
+
+
+class _WsgiIntegration(OsoSdk):
+    def _unauthorized(self):
+        if self._custom_exception:
+            raise self._custom_exception
+
+        raise _Unauthorized()
+
+    def _request_memo(self) -> Optional[Dict[CacheKey, bool]]:
+        return _request_memo.get()
+
+    def _get_user_from_request(self, environ: "WSGIEnvironment") -> str:
+        if self._identify_user_from_request:
+            return _call(self._identify_user_from_request, environ)
+        if self.jwt is not None:
+            return self.jwt.subject(environ.get("HTTP_AUTHORIZATION"))
+
+        return USER_ID_DEFAULT
+
+    def _get_action_from_method(self, method: str) -> str:
+        if self._identify_action_from_method:
+            return _call(self._identify_action_from_method, method)
+
+        return utils.default_get_action_from_method(method)
+
+    def _app_routes(self, app: "OsoMiddleware") -> Iterator[_AppRoute]:
+        for rule in app.url_map.iter_rules():
+            view = app.view_functions.get(rule.endpoint, rule.endpoint)
+            yield _AppRoute(
+                rule.rule,
+                # Rules without methods match any method
+                rule.methods or ("*",),
+                view,
+                rule.endpoint if isinstance(rule.endpoint, str) else view.__name__,
+                rule.arguments,
+                True,
+            )
+
+    def _parse_resource_id(self, resource_id: str) -> Tuple[ResourceIdKind, str]:
+        param = utils.werkzeug_path_param(resource_id)
+        if param is None:
+            return (ResourceIdKind.LITERAL, resource_id)
+        return (ResourceIdKind.PARAM, param)
+
+
+def _call(f: Callable, arg: Any) -> Any:
+    if inspect.iscoroutinefunction(f):
+        return asyncio.run(f(arg))
+
+    return f(arg)
+
+
+class OsoMiddleware:
+    """Authorize requests as WSGI middleware, before the app sees them.
+
+    The middleware matches the `environ` of a request against a werkzeug URL
+    map, so it works with Flask and any other WSGI app. Requests that match no
+    rule are passed to the app. Unauthorized requests are rejected with a
+    prebuilt 404 response, or the custom `exception` when it's a werkzeug
+    `HTTPException`. Other custom exceptions are raised to the server.
+
+    With a Flask app, pass its URL map and view functions, and create the SDK
+    with `WsgiIntegration` instead of `FlaskIntegration`:
+
+        app.wsgi_app = OsoMiddleware(
+            app.wsgi_app, oso, app.url_map, app.view_functions
+        )
+
+    Functions passed to `identify_user_from_request` take the WSGI `environ`.
+
+    Args:
+        app (WSGIApplication): The app the middleware wraps.
+        oso (_WsgiIntegration): The `OsoSdk` returned by `oso_sdk.init`.
+        url_map (Map): The URL map of the app.
+        view_functions (Optional[Mapping[Any, Callable]], optional): The view
+            function of each endpoint of `url_map`, for endpoints that aren't
+            view functions themselves. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        app: "WSGIApplication",
+        oso: _WsgiIntegration,
+        url_map: Map,
+        view_functions: Optional[Mapping[Any, Callable]] = None,
+    ):
+        self.app = app
+        self.oso = oso
+        self.url_map = url_map
+        self.view_functions = view_functions or {}
+        # Without host or subdomain matching, every request can share an adapter
+        self._adapter: Optional[MapAdapter] = (
+            None
+            if url_map.host_matching
+            or any(rule.subdomain for rule in url_map.iter_rules())
+            else url_map.bind("localhost")
+        )
+
+    def __call__(
+        self, environ: "WSGIEnvironment", start_response: "StartResponse"
+    ) -> Iterable[bytes]:
+        oso = self.oso
+        path = environ.get("PATH_INFO") or "/"
+        if oso._exempt_path is not None and oso._exempt_path(path):
+            return self.app(environ, start_response)
+
+        try:
+            if self._adapter is None:
+                endpoint, params = self.url_map.bind_to_environ(environ).match()
+            else:
+                # PATH_INFO is decoded as latin-1 by the server
+                endpoint, params = self._adapter.match(
+                    path.encode("latin-1").decode("utf-8", "replace"),
+                    environ["REQUEST_METHOD"],
+                )
+        except HTTPException:
+            # Not found, method not allowed or redirected, left to the app
+            return self.app(environ, start_response)
+
+        view = self.view_functions.get(endpoint, endpoint)
+        plan = oso._plan(view, endpoint if isinstance(endpoint, str) else view.__name__)
+        if plan is None:
+            return self.app(environ, start_response)
+
+        token = _request_memo.set({})
+        try:
+            try:
+                with deadline_scope(oso._plan_deadline(plan)):
+                    oso._check(
+                        plan,
+                        functools.partial(oso._get_user_from_request, environ),
+                        functools.partial(
+                            oso._get_action_from_method, environ["REQUEST_METHOD"]
+                        ),
+                        params,
+                    )
+            except _Unauthorized:
+                start_response(_NOT_FOUND_STATUS, list(_NOT_FOUND_HEADERS))
+                return [_NOT_FOUND_BODY]
+            except HTTPException as e:
+                return e(environ, start_response)
+
+            return self.app(environ, start_response)
+        finally:
+            _request_memo.reset(token)
+
+
+class WsgiIntegration(IntegrationConfig):
+    @staticmethod
+    def init(
+        api_key: str, optin: bool, exception: Optional[Exception]
+    ) -> _WsgiIntegration:
+        return _WsgiIntegration(api_key, optin, exception)
@@ -0,0 +1,322 @@
+import base64
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from .exceptions import OsoSdkInternalError
+
+# JWS algorithms by family, with their hash function
+_HMAC = {"HS256": "sha256", "HS384": "sha384", "HS512": "sha512"}
+_RSA = {"RS256": "SHA256", "RS384": "SHA384", "RS512": "SHA512"}
+_RSA_PSS = {"PS256": "SHA256", "PS384": "SHA384", "PS512": "SHA512"}
+_EC = {"ES256": "SHA256", "ES384": "SHA384", "ES512": "SHA512"}
+_EC_CURVES = {"P-256": "SECP256R1", "P-384": "SECP384R1", "P-521": "SECP521R1"}
+
+
+@dataclass
+class JwtStats:
+    # Tokens answered from the claims cache
+    hits: int = 0
+    # Tokens whose signature and claims were verified
+    verified: int = 0
+    # Tokens rejected
+    rejected: int = 0
+    # Times the key file was loaded
+    key_loads: int = 0
+
+
+def b64decode(data: str) -> bytes:
+    """Decode unpadded base64url, as used by JWTs."""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class JwtVerifier:
+    """Identify users from the verified JWT bearer token of a request.
+
+    Pass an instance to `oso_sdk.init` to identify the actor of a request from
+    the `sub` claim of the token in its `Authorization` header, instead of
+    `identify_user_from_request`. Tokens are verified against a key: an HMAC
+    `secret`, a PEM public key file, or a JWKS file whose keys are picked by
+    the `kid` of the token. Parsed keys are cached, and the JWKS file is
+    loaded again when a token names an unknown key and the file changed.
+
+    Verified claims are cached by token until the token expires, so repeated
+    requests with the same token aren't decoded or verified again. Tokens
+    without an `exp` claim are verified on every request.
+
+    RSA and EC keys require the `jwt` extra.
+
+    Args:
+        secret (Optional[Union[str, bytes]], optional): The HMAC secret.
+            Defaults to None.
+        pem (Optional[str], optional): Path of a PEM public key.
+            Defaults to None.
+        jwks (Optional[str], optional): Path of a JWKS file. Defaults to None.
+        algorithms (Optional[Sequence[str]], optional): Accepted algorithms.
+            Defaults to ("HS256", "HS384", "HS512") with a `secret`, and
+            ("RS256", "ES256") otherwise.
+        audience (Optional[str], optional): Required `aud` claim.
+            Defaults to None.
+        issuer (Optional[str], optional): Required `iss` claim. Defaults to None.
+        leeway (float, optional): Seconds of clock skew allowed when checking
+            `exp` and `nbf`. Defaults to 0.
+        max_tokens (int, optional): Verified tokens cached. Defaults to 4096.
+
+    Raises:
+        ValueError: If not exactly one of `secret`, `pem` and `jwks` is given,
+            or none of `algorithms` can be verified with a `secret` or `pem`.
+    """
+
+    def __init__(
+        self,
+        secret: Optional[Union[str, bytes]] = None,
+        pem: Optional[str] = None,
+        jwks: Optional[str] = None,
+        algorithms: Optional[Sequence[str]] = None,
+        audience: Optional[str] = None,
+        issuer: Optional[str] = None,
+        leeway: float = 0.0,
+        max_tokens: int = 4096,
+    ):
+        if sum(key is not None for key in (secret, pem, jwks)) != 1:
+            raise ValueError("Pass exactly one of `secret`, `pem` and `jwks`")
+        if algorithms is None:
+            algorithms = tuple(_HMAC) if secret is not None else ("RS256", "ES256")
+        if secret is not None and not _HMAC.keys() & set(algorithms):
+            raise ValueError("A `secret` only verifies HS256, HS384 and HS512")
+        if pem is not None and not set(algorithms) - _HMAC.keys():
+            raise ValueError("A `pem` key doesn't verify HS256, HS384 or HS512")
+
+        self.algorithms = frozenset(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.max_tokens = max_tokens
+        self.stats = JwtStats()
+        self._lock = threading.Lock()
+        self._claims: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._path = pem or jwks
+        self._mtime: Optional[float] = None
+        # Keys by `kid`, None for the key of a secret or a PEM file
+        self._keys: Dict[Optional[str], Any] = {}
+        if secret is not None:
+            self._keys[None] = secret.encode() if isinstance(secret, str) else secret
+        else:
+            self._load_keys()
+
+    def subject(self, authorization: Optional[str]) -> str:
+        """The `sub` claim of the bearer token of an `Authorization` header.
+
+        Raises:
+            OsoSdkInternalError: If the token is missing or invalid.
+        """
+        if authorization is None:
+            raise OsoSdkInternalError("authorization cannot be None")
+
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise OsoSdkInternalError("authorization isn't a bearer token")
+
+        sub = self.claims(token).get("sub")
+        if sub is None:
+            raise OsoSdkInternalError("JWT payload missing `sub` field")
+        return str(sub)
+
+    def claims(self, token: str) -> Dict[str, Any]:
+        """The claims of a token, once verified.
+
+        Raises:
+            OsoSdkInternalError: If the token is invalid.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._claims.get(token)
+            if cached is not None and now < cached[1]:
+                self._claims.move_to_end(token)
+                self.stats.hits += 1
+                return cached[0]
+
+        try:
+            claims = self._verify(token, now)
+        except OsoSdkInternalError:
+            with self._lock:
+                self.stats.rejected += 1
+            raise
+
+        with self._lock:
+            self.stats.verified += 1
+            exp = claims.get("exp")
+            if isinstance(exp, (int, float)):
+                self._claims[token] = (claims, exp + self.leeway)
+                self._claims.move_to_end(token)
+                while len(self._claims) > self.max_tokens:
+                    self._claims.popitem(last=False)
+        return claims
+
+    def _verify(self, token: str, now: float) -> Dict[str, Any]:
+        parts = token.split(".")
+        if len(parts) != 3:
+            raise OsoSdkInternalError("JWT token is malformed")
+
+        try:
+            header = json.loads(b64decode(parts[0]))
+            claims = json.loads(b64decode(parts[1]))
+            signature = b64decode(parts[2])
+        except ValueError as e:
+            raise OsoSdkInternalError("JWT token can't be decoded") from e
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise OsoSdkInternalError("JWT token is malformed")
+
+        alg = header.get("alg")
+        if not isinstance(alg, str) or alg not in self.algorithms:
+            raise OsoSdkInternalError(f"JWT algorithm {alg} isn't accepted")
+        kid = header.get("kid")
+        if kid is not None and not isinstance(kid, str):
+            raise OsoSdkInternalError("JWT key id is malformed")
+
+        key = self._key(kid)
+        message = f"{parts[0]}.{parts[1]}".encode("ascii")
+        if not _verify_signature(alg, key, message, signature):
+            raise OsoSdkInternalError("JWT signature is invalid")
+
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and now >= exp + self.leeway:
+            raise OsoSdkInternalError("JWT token expired")
+        nbf = claims.get("nbf")
+        if isinstance(nbf, (int, float)) and now < nbf - self.leeway:
+            raise OsoSdkInternalError("JWT token isn't valid yet")
+        if self.issuer is not None and claims.get("iss") != self.issuer:
+            raise OsoSdkInternalError("JWT issuer is invalid")
+        if self.audience is not None:
+            aud = claims.get("aud")
+            if self.audience not in (aud if isinstance(aud, list) else [aud]):
+                raise OsoSdkInternalError("JWT audience is invalid")
+
+        return claims
+
+    def _key(self, kid: Optional[str]) -> Any:
+        with self._lock:
+            if None in self._keys:
+                return self._keys[None]
+            key = self._keys.get(kid)
+            # An unknown key may have been rotated in
+            if key is None and self._load_keys():
+                key = self._keys.get(kid)
+        if key is None:
+            raise OsoSdkInternalError(f"JWT key {kid} not found")
+        return key
+
+    def _load_keys(self) -> bool:
+        """Load the key file if it changed, returning whether it was loaded."""
+        assert self._path is not None
+        try:
+            mtime = os.stat(self._path).st_mtime
+            if mtime == self._mtime:
+                return False
+            with open(self._path, "rb") as f:
+                keys = _parse_keys(f.read())
+        except (OSError, ValueError, KeyError):
+            # Keep the previous keys if the file is being replaced
+            if self._mtime is None:
+                raise
+            return False
+
+        self._keys = keys
+        self._mtime = mtime
+        self.stats.key_loads += 1
+        return True
+
+
+def _parse_keys(data: bytes) -> Dict[Optional[str], Any]:
+    if data.lstrip().startswith(b"-----BEGIN"):
+        from cryptography.hazmat.primitives.serialization import (  # type: ignore
+            load_pem_public_key,
+        )
+
+        return {None: load_pem_public_key(data)}
+
+    return {
+        jwk.get("kid"): key
+        for jwk in json.loads(data).get("keys", ())
+        for key in (_load_jwk(jwk),)
+        if key is not None
+    }
+
+
+def _load_jwk(jwk: Dict[str, Any]) -> Any:
+    """The key of a JWK, None if its type isn't supported."""
+    kty = jwk.get("kty")
+    if kty == "oct":
+        return b64decode(jwk["k"])
+
+    if kty == "RSA":
+        from cryptography.hazmat.primitives.asymmetric import rsa  # type: ignore
+
+        return rsa.RSAPublicNumbers(_b64_int(jwk["e"]), _b64_int(jwk["n"])).public_key()
+
+    if kty == "EC" and jwk.get("crv") in _EC_CURVES:
+        from cryptography.hazmat.primitives.asymmetric import ec  # type: ignore
+
+        curve = getattr(ec, _EC_CURVES[jwk["crv"]])()
+        return ec.EllipticCurvePublicNumbers(
+            _b64_int(jwk["x"]), _b64_int(jwk["y"]), curve
+        ).public_key()
+
+    return None
+
+
+def _b64_int(data: str) -> int:
+    return int.from_bytes(b64decode(data), "big")
+
+
+def _verify_signature(alg: str, key: Any, message: bytes, signature: bytes) -> bool:
+    if alg in _HMAC:
+        if not isinstance(key, bytes):
+            return False
+        digest = hmac.new(key, message, _HMAC[alg]).digest()
+        return hmac.compare_digest(digest, signature)
+
+    # A secret can't verify an asymmetric signature
+    if isinstance(key, bytes):
+        return False
+
+    from cryptography.exceptions import InvalidSignature  # type: ignore
+    from cryptography.hazmat.primitives import hashes  # type: ignore
+    from cryptography.hazmat.primitives.asymmetric import (  # type: ignore
+        ec,
+        padding,
+        rsa,
+        utils,
+    )
+
+    try:
+        if alg in _RSA and isinstance(key, rsa.RSAPublicKey):
+            key.verify(
+                signature, message, padding.PKCS1v15(), getattr(hashes, _RSA[alg])()
+            )
+        elif alg in _RSA_PSS and isinstance(key, rsa.RSAPublicKey):
+            algorithm = getattr(hashes, _RSA_PSS[alg])()
+            key.verify(
+                signature,
+                message,
+                padding.PSS(padding.MGF1(algorithm), algorithm.digest_size),
+                algorithm,
+            )
+        elif alg in _EC and isinstance(key, ec.EllipticCurvePublicKey):
+            # JWS signatures are the raw r and s values, not DER
+            size = len(signature) // 2
+            der = utils.encode_dss_signature(
+                int.from_bytes(signature[:size], "big"),
+                int.from_bytes(signature[size:], "big"),
+            )
+            key.verify(der, message, ec.ECDSA(getattr(hashes, _EC[alg])()))
+        else:
+            return False
+    except InvalidSignature:
+        return False
+    return True
@@ -0,0 +1,343 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .cache import Entity, to_typed_id
+from .snapshot import FactSnapshot, parse_fact
+
+_COMMENT = re.compile(r"#[^\n]*")
+_BLOCK = re.compile(r"(actor|resource)\s+([A-Za-z_]\w*)\s*\{")
+_STRINGS = re.compile(r'"([^"]*)"')
+_ROLES = re.compile(r"roles\s*=\s*\[([^\]]*)\]")
+_PERMISSIONS = re.compile(r"permissions\s*=\s*\[([^\]]*)\]")
+_RELATIONS = re.compile(r"relations\s*=\s*\{([^}]*)\}")
+_RELATION = re.compile(r"\s*([A-Za-z_]\w*)\s*:\s*([A-Za-z_]\w*)\s*")
+_RULE = re.compile(r'"([^"]+)"\s+if\s+"([^"]+)"(?:\s+on\s+"([^"]+)")?')
+# The default rule, which the evaluator implements
+_ALLOW = re.compile(
+    r"allow\s*\(\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*\)\s*if\s*"
+    r"has_permission\s*\(\s*\1\s*,\s*\2\s*,\s*\3\s*\)\s*;"
+)
+
+
+@dataclass
+class LocalStats:
+    # Checks answered by the evaluator
+    hits: int = 0
+    # Checks left to Oso Cloud
+    fallbacks: int = 0
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _ResourcePolicy:
+    __slots__ = ("roles", "permissions", "relations", "rules")
+
+    def __init__(self) -> None:
+        self.roles: Set[str] = set()
+        self.permissions: Set[str] = set()
+        self.relations: Dict[str, str] = {}
+        # The roles and permissions each role or permission is implied by,
+        # on the resource or on a related one
+        self.rules: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+
+
+class LocalEvaluator:
+    """Answer authorization checks in process, from a snapshot of facts.
+
+    Pass an instance to `oso_sdk.init` to evaluate checks against a local copy
+    of the policy and of the `has_role`, `has_permission` and `has_relation`
+    facts, without a request to Oso Cloud.
+
+    Only a subset of Polar is supported: `actor` blocks, and `resource` blocks
+    declaring `roles`, `permissions` and `relations`, with shorthand rules such
+    as `"view" if "viewer";` and `"view" if "owner" on "parent";`. Checks on
+    resources of another type, or on any type if the policy has other rules,
+    fall back to Oso Cloud.
+
+    Facts written with the SDK update the snapshot. Facts written elsewhere
+    aren't seen until `load` is called with a new snapshot.
+
+    Args:
+        policy (str): The Polar policy.
+        facts (Union[Iterable[Any], FactSnapshot], optional): The facts, in the
+            format of `Oso.get`, or a memory-mapped `FactSnapshot` to query
+            in place. Defaults to ().
+    """
+
+    def __init__(self, policy: str, facts: Union[Iterable[Any], FactSnapshot] = ()):
+        self.stats = LocalStats()
+        self._lock = threading.Lock()
+        self._policies, self._unsupported = _compile(policy)
+        # Roles and permissions granted by facts, by actor and resource
+        self._grants: Dict[Tuple[Entity, Entity], FrozenSet[str]] = {}
+        # Related resources, by resource and relation
+        self._relations: Dict[Tuple[Entity, str], FrozenSet[Entity]] = {}
+        # With a snapshot, the indexes only hold the entries changed since
+        self._snapshot: Optional[FactSnapshot] = None
+        self._stale = False
+        self.load(facts)
+
+    @property
+    def supported(self) -> FrozenSet[str]:
+        """The resource types checks are evaluated locally for."""
+        return frozenset(self._policies)
+
+    def load(self, facts: Union[Iterable[Any], FactSnapshot]):
+        """Replace the snapshot of facts."""
+        if isinstance(facts, FactSnapshot):
+            with self._lock:
+                self._grants, self._relations = {}, {}
+                self._snapshot = facts
+                self._stale = False
+            return
+
+        grants: Dict[Tuple[Entity, Entity], Set[str]] = {}
+        relations: Dict[Tuple[Entity, str], Set[Entity]] = {}
+        for fact in facts:
+            parsed = parse_fact(fact)
+            if parsed is None:
+                continue
+            name, (subject, value, target) = parsed
+            if name == "has_relation":
+                relations.setdefault((subject, value), set()).add(target)
+            else:
+                grants.setdefault((subject, target), set()).add(value)
+
+        with self._lock:
+            self._grants = {k: frozenset(v) for k, v in grants.items()}
+            self._relations = {k: frozenset(v) for k, v in relations.items()}
+            self._snapshot = None
+            self._stale = False
+
+    def apply(self, delete: Sequence[Any] = (), tell: Sequence[Any] = ()):
+        """Apply facts written to Oso Cloud to the snapshot.
+
+        Facts with wildcard arguments can't be applied, and leave every check
+        to Oso Cloud until the next `load`.
+        """
+        with self._lock:
+            for fact, add in [
+                *((f, False) for f in delete),
+                *((f, True) for f in tell),
+            ]:
+                if fact.get("name") not in (
+                    "has_role",
+                    "has_permission",
+                    "has_relation",
+                ):
+                    continue
+                parsed = parse_fact(fact)
+                if parsed is None:
+                    self._stale = True
+                    return
+                # Sets are replaced rather than changed, for concurrent readers
+                name, (subject, value, target) = parsed
+                if name == "has_relation":
+                    related = self._related((subject, value))
+                    self._relations[(subject, value)] = (
+                        related | {target} if add else related - {target}
+                    )
+                else:
+                    granted = self._granted((subject, target))
+                    self._grants[(subject, target)] = (
+                        granted | {value} if add else granted - {value}
+                    )
+
+    def invalidate(self):
+        """Leave every check to Oso Cloud until the next `load`."""
+        with self._lock:
+            self._stale = True
+
+    def authorize(self, actor: Any, action: str, resource: Any) -> Optional[bool]:
+        """The decision of a check, None if it must be sent to Oso Cloud."""
+        actor_id = to_typed_id(actor)
+        resource_id = to_typed_id(resource)
+        policy = resource_id and self._policies.get(resource_id[0])
+        if self._stale or actor_id is None or resource_id is None or not policy:
+            self.stats.fallbacks += 1
+            return None
+
+        try:
+            allowed = action in policy.permissions and self._has(
+                actor_id, action, resource_id, set(), {}
+            )
+        except _Unsupported:
+            self.stats.fallbacks += 1
+            return None
+        self.stats.hits += 1
+        return allowed
+
+    def _has(
+        self,
+        actor: Entity,
+        name: str,
+        resource: Entity,
+        seen: Set[Tuple[str, Entity]],
+        grants: Dict[Entity, FrozenSet[str]],
+    ) -> bool:
+        """Whether `actor` has a role or permission on `resource`.
+
+        `grants` holds the roles and permissions of `actor` looked up so far.
+        """
+        if (name, resource) in seen:
+            return False
+        seen.add((name, resource))
+
+        granted = grants.get(resource)
+        if granted is None:
+            granted = grants[resource] = self._granted((actor, resource))
+        if name in granted:
+            return True
+        if resource[0] in self._unsupported:
+            raise _Unsupported()
+        policy = self._policies.get(resource[0])
+        if policy is None:
+            return False
+
+        for implied_by, relation in policy.rules.get(name, ()):
+            if relation is None:
+                if self._has(actor, implied_by, resource, seen, grants):
+                    return True
+                continue
+
+            related_type = policy.relations[relation]
+            for related in self._related((resource, relation)):
+                if related[0] == related_type and self._has(
+                    actor, implied_by, related, seen, grants
+                ):
+                    return True
+        return False
+
+    def _granted(self, key: Tuple[Entity, Entity]) -> FrozenSet[str]:
+        granted = self._grants.get(key)
+        if granted is None:
+            snapshot = self._snapshot
+            return frozenset() if snapshot is None else snapshot.grants(*key)
+        return granted
+
+    def _related(self, key: Tuple[Entity, str]) -> FrozenSet[Entity]:
+        related = self._relations.get(key)
+        if related is None:
+            snapshot = self._snapshot
+            return frozenset(() if snapshot is None else snapshot.related(*key))
+        return related
+
+
+def _compile(policy: str) -> Tuple[Dict[str, _ResourcePolicy], Set[str]]:
+    """Compile the resource blocks of a policy.
+
+    Returns:
+        Tuple[Dict[str, _ResourcePolicy], Set[str]]: The supported resource
+            blocks by type, and the types of the unsupported ones. No type is
+            supported if the policy has anything but blocks and the default
+            `allow` rule.
+    """
+    source = _COMMENT.sub("", policy)
+    policies: Dict[str, _ResourcePolicy] = {}
+    unsupported: Set[str] = set()
+    rest = []
+    position = 0
+    for match in _BLOCK.finditer(source):
+        if match.start() < position:
+            continue
+        rest.append(source[position : match.start()])
+        end = _closing_brace(source, match.end())
+        if end is None:
+            return {}, set()
+        position = end + 1
+
+        kind, name, body = match.group(1), match.group(2), source[match.end() : end]
+        if kind == "actor":
+            if body.strip():
+                unsupported.add(name)
+            continue
+        compiled = _compile_resource(body)
+        if compiled is None:
+            unsupported.add(name)
+        else:
+            policies[name] = compiled
+    rest.append(source[position:])
+
+    # Rules on a related resource need its block to declare the role
+    for name, compiled in list(policies.items()):
+        for implied_by, relation in (
+            rule for rules in compiled.rules.values() for rule in rules
+        ):
+            if relation is None:
+                continue
+            related = policies.get(compiled.relations[relation])
+            if related is None or implied_by not in related.roles | related.permissions:
+                del policies[name]
+                unsupported.add(name)
+                break
+
+    if _ALLOW.sub("", "".join(rest)).strip():
+        return {}, set()
+    return policies, unsupported
+
+
+def _closing_brace(source: str, start: int) -> Optional[int]:
+    depth = 1
+    for i in range(start, len(source)):
+        if source[i] == "{":
+            depth += 1
+        elif source[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def _compile_resource(body: str) -> Optional[_ResourcePolicy]:
+    policy = _ResourcePolicy()
+    rules = []
+    for statement in (s.strip() for s in body.split(";")):
+        if not statement:
+            continue
+        match = _ROLES.fullmatch(statement)
+        if match:
+            policy.roles.update(_STRINGS.findall(match.group(1)))
+            continue
+        match = _PERMISSIONS.fullmatch(statement)
+        if match:
+            policy.permissions.update(_STRINGS.findall(match.group(1)))
+            continue
+        match = _RELATIONS.fullmatch(statement)
+        if match:
+            for relation in filter(str.strip, match.group(1).split(",")):
+                pair = _RELATION.fullmatch(relation)
+                if pair is None:
+                    return None
+                policy.relations[pair.group(1)] = pair.group(2)
+            continue
+        match = _RULE.fullmatch(statement)
+        if match is None:
+            return None
+        rules.append(match.groups())
+
+    names = policy.roles | policy.permissions
+    for name, implied_by, relation in rules:
+        if name not in names:
+            return None
+        # Rules such as `"delete" if "creator";` on a relation to the actor
+        if relation is None and implied_by not in names:
+            return None
+        if relation is not None and relation not in policy.relations:
+            return None
+        policy.rules.setdefault(name, []).append((implied_by, relation))
+    return policy
@@ -0,0 +1,155 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from .exceptions import OsoSdkCircuitOpenError
+
+
+@dataclass
+class PrefetchStats:
+    started: int = 0
+    # Prefetches dropped because too many were pending
+    dropped: int = 0
+    # Prefetches stopped by `Prefetch.cancel`
+    cancelled: int = 0
+    # Requests made to Oso Cloud
+    requests: int = 0
+
+
+class Prefetch:
+    """A prefetch running in the background, returned by `OsoSdk.prefetch`."""
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop the prefetch before its next request."""
+        self._cancelled.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the prefetch to finish or stop, returning whether it did."""
+        return self._done.wait(timeout)
+
+    def _finish(self):
+        self._done.set()
+
+
+class Prefetcher:
+    """Run prefetches in the background, at a bounded rate of requests.
+
+    Pass an instance to `oso_sdk.init` to configure `OsoSdk.prefetch`, which
+    otherwise uses the defaults. Prefetches run on a dedicated thread pool,
+    one request at a time each, and every request spends a token of a bucket
+    shared by all prefetches: `rate` tokens are added per second, up to
+    `burst`. Prefetches submitted while `max_pending` are queued or running
+    are dropped.
+
+    Args:
+        rate (float, optional): Requests per second. Defaults to 10.
+        burst (int, optional): Requests that may be sent in a burst, after a
+            quiet period. Defaults to 10.
+        chunk_size (int, optional): Resources checked per request.
+            Defaults to 100.
+        max_pending (int, optional): Prefetches queued or running.
+            Defaults to 64.
+        max_workers (int, optional): Prefetches running at once. Defaults to 2.
+
+    Raises:
+        ValueError: If `rate` isn't positive, or `burst`, `chunk_size`,
+            `max_pending` or `max_workers` is less than 1.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 10,
+        chunk_size: int = 100,
+        max_pending: int = 64,
+        max_workers: int = 2,
+    ):
+        if rate <= 0 or min(burst, chunk_size, max_pending, max_workers) < 1:
+            raise ValueError(
+                "`rate` must be positive, `burst`, `chunk_size`, `max_pending` "
+                "and `max_workers` at least 1"
+            )
+
+        self.rate = rate
+        self.burst = burst
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.max_workers = max_workers
+        self.stats = PrefetchStats()
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, requests: Iterable[Callable[[], Any]]) -> Prefetch:
+        """Make `requests` one at a time in the background, at the allowed rate.
+
+        The iterable is consumed in the background too.
+        """
+        prefetch = Prefetch()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats.dropped += 1
+                prefetch.cancel()
+                prefetch._finish()
+                return prefetch
+
+            self._pending += 1
+            self.stats.started += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="oso-sdk-prefetch"
+                )
+
+        self._executor.submit(self._run, prefetch, requests)
+        return prefetch
+
+    def _run(self, prefetch: Prefetch, requests: Iterable[Callable[[], Any]]):
+        try:
+            for request in requests:
+                if not self._acquire(prefetch):
+                    break
+                request()
+        except OsoSdkCircuitOpenError:
+            pass
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if prefetch.cancelled:
+                    self.stats.cancelled += 1
+            prefetch._finish()
+
+    def _acquire(self, prefetch: Prefetch) -> bool:
+        """Wait for a token, returning False if the prefetch was cancelled."""
+        while not prefetch.cancelled:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats.requests += 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            prefetch._cancelled.wait(wait)
+        return False
@@ -0,0 +1,318 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .cache import BaseDecisionCache, CacheKey, Entity, key_entities
+
+# magic, version, slots, ways, epochs, generation, clear epoch
+_HEADER = struct.Struct("<8sIIIIQI28x")
+_MAGIC = b"OSOSDKDC"
+_VERSION = 1
+# seq, allowed, key digest, clear epoch, actor epoch, resource epoch, refresh at,
+# expires at
+_SLOT = struct.Struct("<IB3x16sIII4xdd")
+_SEQ = struct.Struct("<I")
+_EPOCH = struct.Struct("<I")
+_GENERATION_OFFSET = 24
+_CLEAR_EPOCH_OFFSET = 32
+_READ_RETRIES = 8
+_U32 = 0xFFFFFFFF
+
+
+def _digest(*parts: str, size: int) -> bytes:
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=size).digest()
+
+
+class SharedDecisionCache(BaseDecisionCache):
+    """A decision cache shared by every process that opens the same file.
+
+    Use it instead of `DecisionCache` when running several worker processes on
+    one host (e.g. gunicorn or uvicorn workers), so a decision fetched by one
+    worker is served to all of them. The file is memory-mapped and its pages
+    are shared through the page cache. It is created on first use.
+
+    Decisions live in fixed-size slots, grouped into buckets of `ways` slots.
+    Reads are lock-free: every slot carries a sequence number that writers make
+    odd while they update it. Writers serialize on striped byte-range locks.
+
+    Invalidation bumps per-entity epochs that cached decisions are checked
+    against, so a write made by any process drops the affected decisions in
+    all of them. Hit and miss counters are per-process.
+
+    Only available on POSIX platforms.
+
+    Args:
+        path (str): The file backing the cache. Every process must use the
+            same path and the same `slots`.
+        slots (int, optional): Number of decisions the file can hold. Rounded
+            up to a multiple of `ways`. Defaults to 65536.
+        allow_ttl (float, optional): Seconds an allowed decision is kept.
+            Defaults to 30.
+        deny_ttl (float, optional): Seconds a denied decision is kept.
+            Defaults to 5.
+        refresh_ahead (float, optional): See `BaseDecisionCache`. Defaults to 0.
+        max_stale (float, optional): See `BaseDecisionCache`. Defaults to 0.
+        ways (int, optional): Slots per bucket. When a bucket is full, the
+            decision closest to expiry is evicted. Defaults to 4.
+        stripes (int, optional): Number of write locks. Defaults to 64.
+
+    Raises:
+        ValueError: If the file exists and isn't empty, with a different
+            layout or another format.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 65536,
+        allow_ttl: float = 30.0,
+        deny_ttl: float = 5.0,
+        refresh_ahead: float = 0.0,
+        max_stale: float = 0.0,
+        ways: int = 4,
+        stripes: int = 64,
+    ):
+        if slots < 1 or ways < 1 or stripes < 1:
+            raise ValueError("`slots`, `ways` and `stripes` must be at least 1")
+
+        super().__init__(allow_ttl, deny_ttl, refresh_ahead, max_stale)
+        self.path = path
+        self.ways = ways
+        self._buckets = -(-slots // ways)
+        self.slots = self._buckets * ways
+        self._epochs = self.slots
+        self._epochs_offset = _HEADER.size
+        self._slots_offset = self._epochs_offset + self._epochs * _EPOCH.size
+        self._size = self._slots_offset + self.slots * _SLOT.size
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        # Byte-range locks are taken past the end of the file, one per stripe
+        # and one for the header, so they never cover data.
+        self._meta_lock = threading.Lock()
+        self._meta_lock_offset = self._size + stripes
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._init_file()
+            self._mm = mmap.mmap(self._fd, self._size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _init_file(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if header:
+                if len(header) != _HEADER.size or not header.startswith(_MAGIC):
+                    raise ValueError(f"`{self.path}` isn't a decision cache")
+                _, version, slots, ways, epochs, _, _ = _HEADER.unpack(header)
+                if (version, slots, ways, epochs) != (
+                    _VERSION,
+                    self.slots,
+                    self.ways,
+                    self._epochs,
+                ):
+                    raise ValueError(
+                        f"`{self.path}` was created with a different cache layout"
+                    )
+                return
+
+            os.ftruncate(self._fd, self._size)
+            os.pwrite(
+                self._fd,
+                _HEADER.pack(
+                    _MAGIC, _VERSION, self.slots, self.ways, self._epochs, 0, 0
+                ),
+                0,
+            )
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+    @property
+    def generation(self) -> int:
+        return struct.unpack_from("<Q", self._mm, _GENERATION_OFFSET)[0]
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[bool], bool]:
+        digest, bucket, actor_index, resource_index = self._locate(key)
+        clear_epoch = _EPOCH.unpack_from(self._mm, _CLEAR_EPOCH_OFFSET)[0]
+        now = time.time()
+
+        for offset in self._bucket_offsets(bucket):
+            slot = self._read_slot(offset)
+            if slot is None or slot[2] != digest:
+                continue
+
+            (
+                _,
+                allowed,
+                _,
+                slot_clear,
+                slot_actor,
+                slot_resource,
+                refresh_at,
+                expires_at,
+            ) = slot
+            if (
+                expires_at > now
+                and slot_clear == clear_epoch
+                and slot_actor == self._epoch(actor_index)
+                and slot_resource == self._epoch(resource_index)
+            ):
+                self.stats.hits += 1
+                if refresh_at <= now:
+                    self.stats.stale_hits += 1
+                    return (bool(allowed), True)
+                return (bool(allowed), False)
+            break
+
+        self.stats.misses += 1
+        return (None, False)
+
+    def set(
+        self,
+        key: CacheKey,
+        allowed: bool,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ):
+        ttl = self._ttl(allowed, ttl)
+        if ttl <= 0:
+            return
+
+        digest, bucket, actor_index, resource_index = self._locate(key)
+        with self._stripe(bucket):
+            # Epochs are read before the generation, which invalidations bump
+            # before them, so a decision fetched before an invalidation is
+            # either dropped here or stored with the epochs it predates.
+            clear_epoch = _EPOCH.unpack_from(self._mm, _CLEAR_EPOCH_OFFSET)[0]
+            actor_epoch = self._epoch(actor_index)
+            resource_epoch = self._epoch(resource_index)
+            if generation is not None and generation != self.generation:
+                return
+
+            now = time.time()
+            # Prefer the slot already holding this key, then a free slot, then
+            # evict the decision closest to expiry.
+            target = free = None
+            oldest: Optional[Tuple[float, int]] = None
+            for offset in self._bucket_offsets(bucket):
+                slot = _SLOT.unpack_from(self._mm, offset)
+                slot_digest, slot_clear, expires_at = slot[2], slot[3], slot[7]
+                if slot_digest == digest:
+                    target = offset
+                    break
+                if expires_at <= now or slot_clear != clear_epoch:
+                    free = free if free is not None else offset
+                elif oldest is None or expires_at < oldest[0]:
+                    oldest = (expires_at, offset)
+
+            if target is None:
+                target = free
+            if target is None:
+                assert oldest is not None
+                target = oldest[1]
+                self.stats.evictions += 1
+
+            seq = _SEQ.unpack_from(self._mm, target)[0]
+            _SEQ.pack_into(self._mm, target, (seq + 1) & _U32)
+            _SLOT.pack_into(
+                self._mm,
+                target,
+                (seq + 1) & _U32,
+                allowed,
+                digest,
+                clear_epoch,
+                actor_epoch,
+                resource_epoch,
+                *self._deadlines(now, ttl),
+            )
+            _SEQ.pack_into(self._mm, target, (seq + 2) & _U32)
+
+    def invalidate(self, entities: Iterable[Entity]) -> int:
+        """Drop every decision whose actor or resource is one of `entities`.
+
+        Decisions are dropped lazily by bumping the entities' epochs, which
+        may also drop decisions of unrelated entities sharing an epoch.
+
+        Returns:
+            int: The number of entities invalidated.
+        """
+        indexes = {self._epoch_index(entity) for entity in entities}
+        with self._meta():
+            self._bump_generation()
+            for index in indexes:
+                offset = self._epochs_offset + index * _EPOCH.size
+                epoch = _EPOCH.unpack_from(self._mm, offset)[0]
+                _EPOCH.pack_into(self._mm, offset, (epoch + 1) & _U32)
+
+        self.stats.invalidations += len(indexes)
+        return len(indexes)
+
+    def clear(self):
+        with self._meta():
+            self._bump_generation()
+            epoch = _EPOCH.unpack_from(self._mm, _CLEAR_EPOCH_OFFSET)[0]
+            _EPOCH.pack_into(self._mm, _CLEAR_EPOCH_OFFSET, (epoch + 1) & _U32)
+
+    def _bump_generation(self):
+        """Bump the generation, before the epochs, see `set`."""
+        generation = self.generation + 1
+        struct.pack_into("<Q", self._mm, _GENERATION_OFFSET, generation)
+
+    def _locate(self, key: CacheKey) -> Tuple[bytes, int, int, int]:
+        digest = _digest(*key, size=16)
+        bucket = int.from_bytes(digest[:8], "little") % self._buckets
+        actor, resource = key_entities(key)
+        return (digest, bucket, self._epoch_index(actor), self._epoch_index(resource))
+
+    def _epoch_index(self, entity: Entity) -> int:
+        return int.from_bytes(_digest(*entity, size=8), "little") % self._epochs
+
+    def _epoch(self, index: int) -> int:
+        offset = self._epochs_offset + index * _EPOCH.size
+        return _EPOCH.unpack_from(self._mm, offset)[0]
+
+    def _bucket_offsets(self, bucket: int) -> Iterator[int]:
+        start = self._slots_offset + bucket * self.ways * _SLOT.size
+        return iter(range(start, start + self.ways * _SLOT.size, _SLOT.size))
+
+    def _read_slot(self, offset: int) -> Optional[tuple]:
+        for _ in range(_READ_RETRIES):
+            slot = _SLOT.unpack_from(self._mm, offset)
+            seq = slot[0]
+            if seq & 1 == 0 and _SEQ.unpack_from(self._mm, offset)[0] == seq:
+                return slot
+
+        # A writer keeps updating the slot, treat it as a miss
+        return None  # pragma: no cover
+
+    @contextmanager
+    def _stripe(self, bucket: int) -> Iterator[None]:
+        stripe = bucket % len(self._stripes)
+        with self._stripes[stripe]:
+            with self._file_lock(self._size + stripe):
+                yield
+
+    @contextmanager
+    def _meta(self) -> Iterator[None]:
+        with self._meta_lock:
+            with self._file_lock(self._meta_lock_offset):
+                yield
+
+    @contextmanager
+    def _file_lock(self, offset: int) -> Iterator[None]:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, offset)
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .deadline import remaining
+from .exceptions import OsoSdkTimeoutError
+
+
+@dataclass
+class SingleFlightStats:
+    # Calls that made the request
+    calls: int = 0
+    # Calls that joined a request already in flight
+    coalesced: int = 0
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls with the same key.
+
+    The first caller runs the function. Callers with the same key that arrive
+    before it returns wait for, and share, its result or exception.
+    Synchronous calls are shared across threads and asynchronous calls across
+    the tasks of an event loop.
+    """
+
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.stats.calls += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            # The leader may have a later deadline, or none
+            if not call.done.wait(remaining()):
+                raise OsoSdkTimeoutError("authorization deadline exceeded")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(func())
+
+            def done(task: asyncio.Future):
+                tasks.pop(key, None)
+                # Callers that were all cancelled never retrieve the exception
+                if not task.cancelled():
+                    task.exception()
+
+            task.add_done_callback(done)
+            self.stats.calls += 1
+        else:
+            self.stats.coalesced += 1
+
+        # Cancelling one caller must not cancel the request shared by the others
+        return await asyncio.shield(task)
@@ -0,0 +1,245 @@
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+from typing import Any, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .cache import Entity, to_typed_id
+
+_MAGIC = b"OSOFACT1"
+# Records are written in the byte order of the host, which readers check
+_BYTE_ORDER_MARK = 0x01020304
+# Magic, byte order mark, the number of strings, grants and relations, and the
+# number of slots of the hash table of strings
+_HEADER = struct.Struct("=8sIIIII")
+# actor type, actor id, resource type, resource id, role or permission
+_GRANT_WIDTH = 5
+# resource type, resource id, relation, related type, related id
+_RELATION_WIDTH = 5
+
+
+def parse_fact(fact: Any) -> Optional[Tuple[str, Tuple[Entity, str, Entity]]]:
+    """A `has_role`, `has_permission` or `has_relation` fact as (subject, value,
+    target), None for other facts or facts with wildcard arguments."""
+    name = fact.get("name")
+    args = [to_typed_id(arg) for arg in fact.get("args", ())]
+    if name not in ("has_role", "has_permission", "has_relation") or len(args) != 3:
+        return None
+
+    subject, value, target = args
+    if subject is None or value is None or target is None:
+        return None
+    return name, (subject, value[1], target)
+
+
+def write_snapshot(path: str, facts: Iterable[Any]) -> int:
+    """Write the `has_role`, `has_permission` and `has_relation` facts of an
+    export to a snapshot file, for `FactSnapshot`.
+
+    The file is replaced atomically, so workers that mapped the previous
+    snapshot keep reading it until they load the new one.
+
+    Args:
+        path (str): The snapshot file.
+        facts (Iterable[Any]): The facts, in the format of `Oso.get`. Other
+            facts are skipped.
+
+    Returns:
+        int: The number of facts written.
+    """
+    grants: Set[Tuple[str, str, str, str, str]] = set()
+    relations: Set[Tuple[str, str, str, str, str]] = set()
+    for fact in facts:
+        parsed = parse_fact(fact)
+        if parsed is None:
+            continue
+        name, (subject, value, target) = parsed
+        if name == "has_relation":
+            relations.add((*subject, value, *target))
+        else:
+            grants.add((*subject, *target, value))
+
+    strings = sorted({s for r in (*grants, *relations) for s in r}, key=str.encode)
+    index = {s: i for i, s in enumerate(strings)}
+    encoded = [s.encode() for s in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    # Open addressing with linear probing, slots hold string indexes + 1
+    slots = array("I", [0]) * _slots(len(strings))
+    for i, data in enumerate(encoded):
+        slot = zlib.crc32(data) % len(slots)
+        while slots[slot]:
+            slot = (slot + 1) % len(slots)
+        slots[slot] = i + 1
+    records = array("I")
+    for table in (grants, relations):
+        for record in sorted(tuple(index[s] for s in r) for r in table):
+            records.extend(record)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as f:
+        try:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _BYTE_ORDER_MARK,
+                    len(strings),
+                    len(grants),
+                    len(relations),
+                    len(slots),
+                )
+            )
+            offsets.tofile(f)
+            slots.tofile(f)
+            records.tofile(f)
+            f.write(b"".join(encoded))
+            # Temporary files are only readable by their owner, snapshots are
+            # read by the workers, which may run as other users. A fixed mode,
+            # as reading the umask changes it for every thread.
+            os.fchmod(f.fileno(), 0o644)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+    return len(grants) + len(relations)
+
+
+class FactSnapshot:
+    """A snapshot file of facts, memory-mapped and queried in place.
+
+    Pass an instance to `LocalEvaluator` instead of a list of facts. Strings
+    are interned in a table with a hash index, and facts are sorted
+    fixed-width records of string indexes, so lookups are a hash probe and a
+    binary search in the mapped file:
+    nothing is parsed when it's opened, and processes mapping the same file
+    share its memory through the page cache.
+
+    Args:
+        path (str): A file written by `write_snapshot`.
+
+    Raises:
+        ValueError: If the file isn't a snapshot, or was written on a host
+            with another byte order.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, mark, strings, grants, relations, slots = _HEADER.unpack_from(
+                self._mmap
+            )
+        except struct.error as e:
+            self._mmap.close()
+            raise ValueError(f"{path} isn't a fact snapshot") from e
+        if magic != _MAGIC or mark != _BYTE_ORDER_MARK:
+            self._mmap.close()
+            raise ValueError(f"{path} isn't a fact snapshot of this host")
+
+        self.path = path
+        self._view = memoryview(self._mmap)
+        end = _HEADER.size + 4 * (strings + 1)
+        self._offsets = self._view[_HEADER.size : end].cast("I")
+        start, end = end, end + 4 * slots
+        self._slots = self._view[start:end].cast("I")
+        start, end = end, end + 4 * _GRANT_WIDTH * grants
+        self._grants = self._view[start:end].cast("I")
+        start, end = end, end + 4 * _RELATION_WIDTH * relations
+        self._relations = self._view[start:end].cast("I")
+        self._strings = self._view[end:]
+
+    def __len__(self) -> int:
+        return (len(self._grants) // _GRANT_WIDTH) + (
+            len(self._relations) // _RELATION_WIDTH
+        )
+
+    def grants(self, actor: Entity, resource: Entity) -> FrozenSet[str]:
+        """The roles and permissions `actor` has on `resource`."""
+        prefix = self._indexes((*actor, *resource))
+        if prefix is None:
+            return frozenset()
+        found = _find(self._grants, _GRANT_WIDTH, prefix)
+        return frozenset(self._string(self._grants[i + 4]) for i in found)
+
+    def related(self, resource: Entity, relation: str) -> List[Entity]:
+        """The resources related to `resource` by `relation`."""
+        prefix = self._indexes((*resource, relation))
+        if prefix is None:
+            return []
+        found = _find(self._relations, _RELATION_WIDTH, prefix)
+        return [
+            (self._string(self._relations[i + 3]), self._string(self._relations[i + 4]))
+            for i in found
+        ]
+
+    def close(self):
+        """Unmap the file. Lookups fail afterwards."""
+        for view in (
+            self._offsets,
+            self._slots,
+            self._grants,
+            self._relations,
+            self._strings,
+        ):
+            view.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "FactSnapshot":
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+    def _bytes(self, index: int) -> bytes:
+        return bytes(self._strings[self._offsets[index] : self._offsets[index + 1]])
+
+    def _string(self, index: int) -> str:
+        return self._bytes(index).decode()
+
+    def _indexes(self, strings: Tuple[str, ...]) -> Optional[List[int]]:
+        """The indexes of interned strings, None if any isn't interned."""
+        slots = self._slots
+        indexes = []
+        for s in strings:
+            data = s.encode()
+            slot = zlib.crc32(data) % len(slots)
+            while True:
+                index = slots[slot] - 1
+                if index < 0:
+                    return None
+                if self._bytes(index) == data:
+                    break
+                slot = (slot + 1) % len(slots)
+            indexes.append(index)
+        return indexes
+
+
+def _slots(strings: int) -> int:
+    """The size of a hash table of strings, at most half full."""
+    return max(8, 1 << (2 * strings - 1).bit_length())
+
+
+def _find(records: memoryview, width: int, prefix: List[int]) -> range:
+    """The offsets of the sorted records starting with `prefix`."""
+    size = len(prefix)
+    count = len(records) // width
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if records[mid * width : mid * width + size].tolist() < prefix:
+            lo = mid + 1
+        else:
+            hi = mid
+    # Few records share a prefix, so they're scanned
+    start = end = lo * width
+    while end < len(records) and records[end : end + size].tolist() == prefix:
+        end += width
+    return range(start, end, width)
@@ -0,0 +1,134 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .deadline import cap_timeout
+
+
+@dataclass
+class PoolStats:
+    requests: int = 0
+    # Connections opened, each costing a TCP and, for HTTPS, a TLS handshake
+    connections: int = 0
+    # Pooled connections closed for being idle longer than `max_idle`
+    idle_closed: int = 0
+
+
+class HttpPool:
+    """Connection pool settings for requests to Oso Cloud.
+
+    Pass an instance to `oso_sdk.init` to control the pool of HTTP connections
+    shared by every thread using the `OsoSdk` instance. Connections are checked
+    out of a per-host queue, so threads don't hold any other lock while a
+    request is in flight.
+
+    Args:
+        size (int, optional): Connections kept open per host. Defaults to 10.
+        hosts (int, optional): Number of hosts to keep pools for, e.g. 2 when
+            using a fallback URL. Defaults to 1.
+        block (bool, optional): When all `size` connections to a host are in
+            use, wait for one to be returned instead of opening a connection
+            that is discarded after the request. Makes `size` a hard per-host
+            limit. Defaults to False.
+        keep_alive (bool, optional): Reuse connections between requests.
+            Defaults to True.
+        max_idle (Optional[float], optional): Seconds a pooled connection may
+            sit idle before it is closed instead of reused, e.g. to stay below
+            a load balancer's idle timeout. Defaults to None.
+
+    Raises:
+        ValueError: If `size` or `hosts` is less than 1.
+    """
+
+    def __init__(
+        self,
+        size: int = 10,
+        hosts: int = 1,
+        block: bool = False,
+        keep_alive: bool = True,
+        max_idle: Optional[float] = None,
+    ):
+        if size < 1 or hosts < 1:
+            raise ValueError("`size` and `hosts` must be at least 1")
+
+        self.size = size
+        self.hosts = hosts
+        self.block = block
+        self.keep_alive = keep_alive
+        self.max_idle = max_idle
+        self.stats = PoolStats()
+
+    def mount(self, session: requests.Session):
+        """Send every request made by `session` through this pool."""
+        adapter = _PoolAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+
+
+def _pool_class(base: Type[HTTPConnectionPool], pool: HttpPool) -> Type[Any]:
+    """Subclass a urllib3 pool to count connections and close idle ones."""
+
+    class Connection(base.ConnectionCls):  # type: ignore
+        def connect(self):
+            pool.stats.connections += 1
+            return super().connect()
+
+    class ConnectionPool(base):  # type: ignore
+        ConnectionCls = Connection
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout)
+            last_used = getattr(conn, "_oso_sdk_last_used", None)
+            if (
+                pool.max_idle is not None
+                and last_used is not None
+                and getattr(conn, "sock", None) is not None
+                and time.monotonic() - last_used > pool.max_idle
+            ):
+                # Reconnects on the next request
+                conn.close()
+                pool.stats.idle_closed += 1
+            return conn
+
+        def _put_conn(self, conn):
+            if conn is not None:
+                conn._oso_sdk_last_used = time.monotonic()
+            super()._put_conn(conn)
+
+    return ConnectionPool
+
+
+class DeadlineAdapter(HTTPAdapter):
+    """Shorten request timeouts to the deadline of the current check.
+
+    Raises:
+        OsoSdkTimeoutError: If the deadline has passed before the request is sent.
+    """
+
+    def send(self, request, stream=False, timeout=None, *args, **kwargs):
+        return super().send(request, stream, cap_timeout(timeout), *args, **kwargs)
+
+
+class _PoolAdapter(DeadlineAdapter):
+    def __init__(self, pool: HttpPool):
+        self._pool = pool
+        super().__init__(
+            pool_connections=pool.hosts, pool_maxsize=pool.size, pool_block=pool.block
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _pool_class(HTTPConnectionPool, self._pool),
+            "https": _pool_class(HTTPSConnectionPool, self._pool),
+        }
+
+    def send(self, request, *args, **kwargs):
+        self._pool.stats.requests += 1
+        return super().send(request, *args, **kwargs)
@@ -1,20 +1,42 @@
 import asyncio
-from typing import Optional, Tuple
-
+import functools
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from unittest.mock import patch
+
+import httpx
+import oso_cloud  # type: ignore
 import oso_sdk
 import pytest
-from fastapi import Depends, FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.testclient import TestClient
-from oso_sdk.integrations import ResourceIdKind
-from oso_sdk.integrations.fastapi import FastApiIntegration, _FastApiIntegration
+from oso_sdk import DecisionCache
+from oso_sdk.aio import AsyncApi
+from oso_sdk.integrations import Resource, ResourceIdKind
+from oso_sdk.integrations.fastapi import (
+    FastApiIntegration,
+    OsoMiddleware,
+    _FastApiIntegration,
+)
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
 
 
 def fastapi_app_factory(
     optin: bool = False,
     exception: Optional[Exception] = None,
+    cache: Optional[DecisionCache] = None,
 ) -> Tuple[FastAPI, oso_sdk.OsoSdk]:
     oso = oso_sdk.init(
-        "API_KEY", FastApiIntegration(), shared=False, optin=optin, exception=exception
+        "API_KEY",
+        FastApiIntegration(),
+        shared=False,
+        optin=optin,
+        exception=exception,
+        cache=cache,
     )
     app = FastAPI(dependencies=[Depends(oso)])  # type: ignore
 
@@ -285,3 +307,488 @@ def test_custom_action_func_async(mock_oso_allowed, jwt_token, test_user):
     mock_oso_allowed.assert_called_once_with(
         actor=test_user, action="bar", resource={"type": "Org", "id": "_"}
     )
+
+
+def test_cache(mock_oso_allowed, jwt_token, test_user):
+    app, oso = fastapi_app_factory(cache=DecisionCache())
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/{id}")
+    @oso.enforce("{id}", cache_ttl=0)
+    async def repo(id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    client.get("/org/1")
+    client.get("/org/1")
+    mock_oso_allowed.assert_called_once_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    assert oso.cache is not None
+    assert oso.cache.stats.hits == 1
+
+    client.get("/repo/1")
+    client.get("/repo/1")
+    assert mock_oso_allowed.call_count == 3
+
+
+def test_request_memo(mock_oso_allowed, jwt_token, test_user):
+    app, oso = fastapi_app_factory()
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        assert oso.authorize(test_user, "view", {"type": "Org", "id": str(id)})
+        return {"status": "ok"}
+
+    @app.get("/repo/{id}")
+    @oso.enforce("{id}")
+    def repo(id: int):
+        assert oso.authorize(test_user, "view", {"type": "Repo", "id": str(id)})
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    assert client.get("/org/1").json()["status"] == "ok"
+    mock_oso_allowed.assert_called_once_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+
+    assert client.get("/repo/1").json()["status"] == "ok"
+    assert client.get("/repo/1").json()["status"] == "ok"
+    assert mock_oso_allowed.call_count == 3
+
+
+def test_stale_while_revalidate(mock_oso_allowed, test_user):
+    app, oso = fastapi_app_factory(cache=DecisionCache(allow_ttl=0.05, max_stale=5))
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    with TestClient(app) as client:
+        client.get("/org/1")
+        time.sleep(0.1)
+        assert client.get("/org/1").json()["status"] == "ok"
+
+        for _ in range(100):
+            if mock_oso_allowed.call_count == 2:
+                break
+            time.sleep(0.01)
+
+    assert mock_oso_allowed.call_count == 2
+    assert oso._background is None
+
+
+def test_async_client(mock_oso_denied, jwt_token):
+    app, oso = fastapi_app_factory(cache=DecisionCache())
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"allowed": request.url.path.endswith("ize")})
+
+    oso._aio = AsyncApi(oso.api, transport=httpx.MockTransport(handler))
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        assert await oso.authorize_async(
+            {"type": "User", "id": "_"}, "view", {"type": "Org", "id": str(id)}
+        )
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    assert client.get("/org/1").json()["status"] == "ok"
+    assert client.get("/org/1").json()["status"] == "ok"
+    assert len(requests) == 1
+    assert requests[0]["resource_id"] == "1"
+    mock_oso_denied.assert_not_called()
+
+
+def test_executor(mock_oso_allowed, jwt_token, test_user, capsys):
+    app, oso = fastapi_app_factory()
+    oso.executor = oso_sdk.BoundedExecutor(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    def org(id: int):
+        # The request memo is visible from the executor
+        assert oso.authorize(test_user, "view", {"type": "Org", "id": str(id)})
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    assert client.get("/org/1").json()["status"] == "ok"
+    mock_oso_allowed.assert_called_once()
+
+    # Fail fast while the executor is full
+    oso.executor.submit(release.wait)
+    assert client.get("/org/1").status_code == 404
+    assert oso.executor.stats.rejected == 1
+    release.set()
+    # Rejections are expected under load, and aren't logged
+    assert "Traceback" not in capsys.readouterr().err
+    oso.executor.shutdown()
+
+
+def test_deadline(mock_oso_allowed):
+    app, oso = fastapi_app_factory()
+    oso.deadline = 0.01
+
+    @app.get("/org/{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/{id}")
+    @oso.enforce("{id}", deadline=5)
+    async def repo(id: int):
+        return {"status": "ok"}
+
+    @oso.identify_user_from_request
+    async def user(_: Request) -> str:
+        await asyncio.sleep(0.05)
+        return "foo"
+
+    client = TestClient(app)
+    assert client.get("/org/1").status_code == 404
+    mock_oso_allowed.assert_not_called()
+    assert oso.timeouts == 1
+
+    assert client.get("/repo/1").json()["status"] == "ok"
+    assert oso.timeouts == 1
+
+
+def test_circuit_breaker(jwt_token):
+    app, oso = fastapi_app_factory()
+    oso.breaker = oso_sdk.CircuitBreaker(threshold=1, min_calls=1)
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/{id}")
+    @oso.enforce("{id}", fallback=True)
+    async def repo(id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    with patch.object(
+        oso_cloud.Oso, "authorize", side_effect=ConnectionError()
+    ) as authorize:
+        assert client.get("/org/1").status_code == 404
+        assert oso.breaker.state == oso_sdk.CircuitState.OPEN
+
+        assert client.get("/org/2").status_code == 404
+        assert client.get("/repo/1").json()["status"] == "ok"
+        authorize.assert_called_once()
+
+
+def test_multiple_resources(jwt_token):
+    app, oso = fastapi_app_factory()
+    allowed = {("view", "Org", "1"), ("read", "Repo", "2"), ("view", "Issue", "5")}
+
+    def authorize_resources(actor, action, resources):
+        return [r for r in resources if (action, r["type"], r["id"]) in allowed]
+
+    @app.get("/org/{org_id}/repo/{repo_id}")
+    @oso.enforce([Resource("{org_id}", "Org"), Resource("{repo_id}", "Repo", "read")])
+    async def repo(org_id: int, repo_id: int):
+        return {"status": "ok"}
+
+    @app.get("/org/{org_id}/issue/{issue_id}")
+    @oso.enforce(
+        [Resource("{org_id}", "Org", "admin"), Resource("{issue_id}", "Issue")],
+        require_all=False,
+    )
+    async def issue(org_id: int, issue_id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", side_effect=authorize_resources
+    ) as mock:
+        assert client.get("/org/1/repo/2").json()["status"] == "ok"
+        assert mock.call_count == 2
+        assert client.get("/org/1/repo/3").status_code == 404
+
+        assert client.get("/org/1/issue/5").json()["status"] == "ok"
+        assert client.get("/org/2/issue/6").status_code == 404
+
+
+def test_plans(mock_oso_allowed, jwt_token, test_user):
+    app, oso = fastapi_app_factory(optin=True)
+
+    def mount(path: str, resource_type: str):
+        @app.get(path)
+        @oso.enforce("{id}", resource_type=resource_type)
+        async def org(id: int):
+            return {"status": "ok"}
+
+    # Endpoints with the same name don't share a plan
+    mount("/org/{id}", "Org")
+    mount("/team/{id}", "Team")
+
+    def logged(f):
+        @functools.wraps(f)
+        async def decorated(*args, **kwargs):
+            return await f(*args, **kwargs)
+
+        return decorated
+
+    @app.get("/repo/{id}")
+    @logged
+    @oso.enforce("{id}")
+    async def repo(id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    client.get("/org/1")
+    mock_oso_allowed.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    client.get("/team/1")
+    mock_oso_allowed.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Team", "id": "1"}
+    )
+    client.get("/repo/1")
+    mock_oso_allowed.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Repo", "id": "1"}
+    )
+
+    plan = next(iter(oso.routes.values()))
+    with pytest.raises(AttributeError):
+        plan.action = "write"
+
+
+def test_decorator_order(mock_oso_denied, jwt_token, test_user):
+    app, oso = fastapi_app_factory(optin=True)
+
+    @app.get("/org/{id}")
+    @oso.enforce("{id}")
+    async def org(id: int):
+        return "secret"
+
+    @oso.enforce("{id}", resource_type="Repo")
+    @app.get("/repo/{id}")
+    async def repo(id: int):
+        return "secret"
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    assert client.get("/org/1").status_code == 404
+    mock_oso_denied.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    assert client.get("/repo/1").status_code == 404
+    mock_oso_denied.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Repo", "id": "1"}
+    )
+
+
+def test_analyze_routes():
+    app, oso = fastapi_app_factory()
+
+    @app.get("/org/{id}")
+    @app.delete("/org/{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/org/{org_id}/repo/{repo_id}")
+    @oso.enforce([Resource("{org_id}", "Org"), Resource("{repo_id}", "Repo", "read")])
+    async def repo(org_id: int, repo_id: int):
+        return {"status": "ok"}
+
+    report = oso.analyze_routes(app)
+    assert [(r.path, r.method, r.default, r.checks) for r in report] == [
+        ("/org/{id}", "DELETE", True, (("delete", "Org"),)),
+        ("/org/{id}", "GET", True, (("view", "Org"),)),
+        (
+            "/org/{org_id}/repo/{repo_id}",
+            "GET",
+            False,
+            (("view", "Org"), ("read", "Repo")),
+        ),
+    ]
+    assert all(r.enforced for r in report)
+    assert org in oso._plans
+
+    @app.get("/team/{id}")
+    @oso.enforce("{team_id}")
+    async def team(id: int):
+        return {"status": "ok"}
+
+    with pytest.raises(ValueError, match="/team/{id} has no `team_id`"):
+        oso.analyze_routes(app)
+
+    # Routes without the SDK's dependency aren't enforced
+    other = FastAPI()
+    other.get("/org/{id}")(org)
+    assert not oso.analyze_routes(other)[0].enforced
+
+
+def test_exempt(mock_oso_denied):
+    async def metrics():
+        return {"status": "ok"}
+
+    oso = oso_sdk.init(
+        "API_KEY",
+        FastApiIntegration(),
+        shared=False,
+        exempt=["/health", "/static/", "version", metrics],
+    )
+    app = FastAPI(dependencies=[Depends(oso)])  # type: ignore
+    identified = []
+
+    @oso.identify_user_from_request
+    def user(request: Request):
+        identified.append(request)
+        return "1"
+
+    @app.get("/health")
+    @app.get("/health/live")
+    @app.get("/healthy")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/static/{path}")
+    async def static(path: str):
+        return {"status": "ok"}
+
+    @app.get("/version")
+    async def version():
+        return {"status": "ok"}
+
+    app.get("/metrics")(metrics)
+
+    client = TestClient(app)
+    for path in ("/health", "/health/live", "/static/app.js", "/version", "/metrics"):
+        assert client.get(path).status_code == 200
+    assert not identified
+    mock_oso_denied.assert_not_called()
+
+    assert client.get("/healthy").status_code == 404
+    assert identified
+
+
+def test_exempt_root(mock_oso_denied):
+    oso = oso_sdk.init("API_KEY", FastApiIntegration(), shared=False, exempt=["/"])
+    app = FastAPI(dependencies=[Depends(oso)])  # type: ignore
+    oso.identify_user_from_request(lambda request: "1")
+
+    @app.get("/")
+    async def index():
+        return {"status": "ok"}
+
+    @app.get("/org/{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    assert client.get("/").status_code == 200
+    mock_oso_denied.assert_not_called()
+    # "/" isn't a prefix of every path
+    assert client.get("/org/1").status_code == 404
+    mock_oso_denied.assert_called_once()
+
+
+def test_middleware(jwt_token, test_user):
+    oso = oso_sdk.init("API_KEY", FastApiIntegration(), shared=False)
+    app = FastAPI()
+    app.add_middleware(OsoMiddleware, oso=oso)
+
+    @app.post("/org/{id}/upload")
+    async def upload(id: int, body: Dict[str, str]):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+
+    # The request is rejected before its malformed body is parsed
+    with patch.object(oso_cloud.Oso, "authorize", return_value=False) as mock:
+        response = client.post("/org/1/upload", content=b"{")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Not Found"}
+        mock.assert_called_once_with(
+            actor=test_user, action="create", resource={"type": "Upload", "id": "_"}
+        )
+
+    with patch.object(oso_cloud.Oso, "authorize", return_value=True):
+        assert client.post("/org/1/upload", content=b"{").status_code == 422
+        assert client.post("/org/1/upload", json={"a": "b"}).status_code == 200
+
+    # No route
+    assert client.get("/repo").status_code == 404
+
+    report = {r.path: r for r in oso.analyze_routes(app)}
+    assert report["/org/{id}/upload"].enforced
+    assert report["/docs"].enforced
+
+
+def test_middleware_starlette(mock_oso_denied):
+    oso = oso_sdk.init(
+        "API_KEY",
+        FastApiIntegration(),
+        shared=False,
+        exception=HTTPException(status_code=403, detail="Forbidden"),
+    )
+
+    async def org(request: Request):
+        return JSONResponse({"status": "ok"})
+
+    app = Starlette(routes=[Mount("/api", routes=[Route("/org/{id}", org)])])
+    app.add_middleware(OsoMiddleware, oso=oso)
+
+    response = TestClient(app).get("/api/org/1")
+    assert response.status_code == 403
+    mock_oso_denied.assert_called_once_with(
+        actor={"type": "User", "id": "_"},
+        action="view",
+        resource={"type": "Org", "id": "_"},
+    )
+
+
+def test_jwt(mock_oso_allowed, jwt_token):
+    oso = oso_sdk.init(
+        "API_KEY",
+        FastApiIntegration(),
+        shared=False,
+        jwt=oso_sdk.JwtVerifier(secret="your-256-bit-secret", algorithms=["HS256"]),
+    )
+    app = FastAPI(dependencies=[Depends(oso)])  # type: ignore
+
+    @app.get("/org/{id}")
+    async def org(id: int):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    client.headers = {"Authorization": f"Bearer {jwt_token}"}
+    assert client.get("/org/1").status_code == 200
+    mock_oso_allowed.assert_called_once_with(
+        actor={"type": "User", "id": "1234567890"},
+        action="view",
+        resource={"type": "Org", "id": "_"},
+    )
+
+    client.headers = {"Authorization": f"Bearer {jwt_token[:-1]}"}
+    assert client.get("/org/1").status_code == 404
@@ -1,9 +1,13 @@
 import asyncio
+import time
+from unittest.mock import patch
 
+import oso_cloud  # type: ignore
 import oso_sdk
 import pytest
-from flask import Flask
-from oso_sdk.integrations import ResourceIdKind
+from flask import Blueprint, Flask
+from oso_sdk import DecisionCache
+from oso_sdk.integrations import Resource, ResourceIdKind
 from oso_sdk.integrations.flask import FlaskIntegration, _FlaskIntegration
 
 
@@ -43,6 +47,18 @@ def app_custom_exception():
     yield (app, oso)
 
 
+@pytest.fixture
+def app_cache():
+    app = Flask(__name__)
+    app.testing = True
+    with app.app_context():
+        oso = oso_sdk.init(
+            "API_KEY", FlaskIntegration(), shared=False, cache=DecisionCache()
+        )
+
+    yield (app, oso)
+
+
 def test_parse_resource_id():
     oso = _FlaskIntegration("API_KEY", False, None)
 
@@ -278,3 +294,290 @@ def test_custom_action_func_async(app_default, mock_oso_allowed, test_user):
     mock_oso_allowed.assert_called_once_with(
         actor=test_user, action="bar", resource={"type": "Org", "id": "_"}
     )
+
+
+def test_cache(app_cache, mock_oso_denied, test_user):
+    app, oso = app_cache
+
+    @app.get("/org/<id>")
+    @oso.enforce("<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/<id>")
+    @oso.enforce("<id>", cache_ttl=0)
+    def repo(id: int):
+        return {"status": "ok"}
+
+    client = app.test_client()
+
+    assert client.get("/org/1").status_code == 404
+    assert client.get("/org/1").status_code == 404
+    mock_oso_denied.assert_called_once_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    assert oso.cache.stats.hits == 1
+
+    client.get("/repo/1")
+    client.get("/repo/1")
+    assert mock_oso_denied.call_count == 3
+
+
+def test_request_memo(app_default, mock_oso_allowed, test_user):
+    app, oso = app_default
+
+    @app.get("/org/<id>")
+    @oso.enforce("<id>")
+    def org(id: int):
+        assert oso.authorize(test_user, "view", {"type": "Org", "id": id})
+        return {"status": "ok"}
+
+    client = app.test_client()
+
+    assert client.get("/org/1").json["status"] == "ok"
+    mock_oso_allowed.assert_called_once_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+
+    with app.app_context():
+        assert client.get("/org/1").json["status"] == "ok"
+        assert client.get("/org/1").json["status"] == "ok"
+    assert mock_oso_allowed.call_count == 3
+
+
+def test_request_memo_exempt(mock_oso_allowed, test_user):
+    app = Flask(__name__)
+    app.testing = True
+    with app.app_context():
+        oso = oso_sdk.init(
+            "API_KEY", FlaskIntegration(), shared=False, exempt=["/health"]
+        )
+
+    @app.get("/health")
+    def health():
+        assert oso.authorize(test_user, "view", {"type": "Org", "id": "1"})
+        assert oso.authorize(test_user, "view", {"type": "Org", "id": "1"})
+        return {"status": "ok"}
+
+    client = app.test_client()
+    # Handlers of exempt routes are memoized too, but not across requests
+    with app.app_context():
+        assert client.get("/health").json["status"] == "ok"
+        assert client.get("/health").json["status"] == "ok"
+    assert mock_oso_allowed.call_count == 2
+
+
+def test_deadline(app_default, mock_oso_allowed):
+    app, oso = app_default
+    oso.deadline = 0.01
+
+    @app.get("/org/<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/<id>")
+    @oso.enforce("<id>", deadline=5)
+    def repo(id: int):
+        return {"status": "ok"}
+
+    @oso.identify_user_from_request
+    def user() -> str:
+        time.sleep(0.05)
+        return "foo"
+
+    client = app.test_client()
+    assert client.get("/org/1").status_code == 404
+    mock_oso_allowed.assert_not_called()
+    assert oso.timeouts == 1
+
+    assert client.get("/repo/1").json["status"] == "ok"
+    assert oso.timeouts == 1
+
+
+def test_deadline_after_check(app_default):
+    app, oso = app_default
+    oso.deadline = 0.05
+
+    @app.get("/org/<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    def slow_authorize(*args, **kwargs):
+        time.sleep(0.1)
+        return True
+
+    # Decisions arriving past the deadline, e.g. shared with a slower
+    # request, are discarded
+    with patch.object(oso_cloud.Oso, "authorize", side_effect=slow_authorize):
+        assert app.test_client().get("/org/1").status_code == 404
+    assert oso.timeouts == 1
+
+
+def test_circuit_breaker(app_default):
+    app, oso = app_default
+    oso.breaker = oso_sdk.CircuitBreaker(threshold=1, min_calls=1)
+
+    @app.get("/org/<id>")
+    @oso.enforce("<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/repo/<id>")
+    @oso.enforce("<id>", fallback=True)
+    def repo(id: int):
+        return {"status": "ok"}
+
+    client = app.test_client()
+
+    with patch.object(
+        oso_cloud.Oso, "authorize", side_effect=ConnectionError()
+    ) as authorize:
+        assert client.get("/org/1").status_code == 404
+        assert oso.breaker.state == oso_sdk.CircuitState.OPEN
+
+        assert client.get("/org/2").status_code == 404
+        assert client.get("/repo/1").json["status"] == "ok"
+        authorize.assert_called_once()
+
+
+def test_multiple_resources(app_default):
+    app, oso = app_default
+    allowed = {("view", "Org", "1"), ("view", "Repo", "2")}
+
+    def authorize_resources(actor, action, resources):
+        return [r for r in resources if (action, r["type"], r["id"]) in allowed]
+
+    @app.get("/org/<org_id>/repo/<repo_id>")
+    @oso.enforce([Resource("<org_id>", "Org"), Resource("<repo_id>", "Repo")])
+    def repo(org_id: int, repo_id: int):
+        return {"status": "ok"}
+
+    @app.get("/org/<org_id>/issue/<issue_id>")
+    @oso.enforce(
+        [Resource("<org_id>", "Org"), Resource("<issue_id>", "Issue")],
+        require_all=False,
+    )
+    def issue(org_id: int, issue_id: int):
+        return {"status": "ok"}
+
+    client = app.test_client()
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", side_effect=authorize_resources
+    ) as mock:
+        # Checks with the same action share a request
+        assert client.get("/org/1/repo/2").json["status"] == "ok"
+        mock.assert_called_once()
+        assert client.get("/org/1/repo/3").status_code == 404
+
+        assert client.get("/org/1/issue/5").json["status"] == "ok"
+        assert client.get("/org/2/issue/6").status_code == 404
+
+
+def test_plans(app_optin, mock_oso_allowed, test_user):
+    app, oso = app_optin
+
+    # Blueprint endpoints are named after the blueprint, and may share the
+    # name of an app endpoint
+    bp = Blueprint("teams", __name__)
+
+    @bp.get("/team/<id>")
+    @oso.enforce("<id>", resource_type="Team")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/org/<id>")
+    @oso.enforce("<id>")
+    def org(id: int):  # noqa: F811
+        return {"status": "ok"}
+
+    app.register_blueprint(bp)
+    client = app.test_client()
+
+    client.get("/org/1")
+    mock_oso_allowed.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    client.get("/team/1")
+    mock_oso_allowed.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Team", "id": "1"}
+    )
+
+
+def test_decorator_order(app_optin, mock_oso_denied, test_user):
+    app, oso = app_optin
+
+    @app.get("/org/<id>")
+    @oso.enforce("<id>")
+    def org(id: int):
+        return "secret"
+
+    @oso.enforce("<id>", resource_type="Repo")
+    @app.get("/repo/<id>")
+    def repo(id: int):
+        return "secret"
+
+    client = app.test_client()
+    assert client.get("/org/1").status_code == 404
+    mock_oso_denied.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Org", "id": "1"}
+    )
+    assert client.get("/repo/1").status_code == 404
+    mock_oso_denied.assert_called_with(
+        actor=test_user, action="view", resource={"type": "Repo", "id": "1"}
+    )
+
+
+def test_analyze_routes(app_optin):
+    app, oso = app_optin
+
+    @app.get("/org/<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.post("/repo/<id>")
+    @oso.enforce("<id>", "write")
+    def repo(id: int):
+        return {"status": "ok"}
+
+    report = {(r.path, r.method): r for r in oso.analyze_routes(app)}
+    assert not report["/org/<id>", "GET"].enforced
+    assert report["/repo/<id>", "POST"].checks == (("write", "Repo"),)
+
+    @app.get("/team/<id>")
+    @oso.enforce("<team_id>")
+    def team(id: int):
+        return {"status": "ok"}
+
+    with pytest.raises(ValueError):
+        oso.analyze_routes(app)
+
+
+def test_exempt(mock_oso_denied):
+    app = Flask(__name__)
+    app.testing = True
+    with app.app_context():
+        oso = oso_sdk.init(
+            "API_KEY", FlaskIntegration(), shared=False, exempt=["/health", "static"]
+        )
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/org/<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    client = app.test_client()
+    assert client.get("/health").status_code == 200
+    # Flask's static files endpoint, the file doesn't exist
+    assert client.get("/static/app.js").status_code == 404
+    mock_oso_denied.assert_not_called()
+
+    assert client.get("/org/1").status_code == 404
+    mock_oso_denied.assert_called_once()
+    report = {r.endpoint: r for r in oso.analyze_routes(app)}
+    assert not report["static"].enforced
+    assert not report["health"].enforced
+    assert report["org"].enforced
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+import oso_cloud  # type: ignore
+import oso_sdk
+import pytest
+from flask import Flask
+from oso_sdk.integrations import ResourceIdKind
+from oso_sdk.integrations.wsgi import OsoMiddleware, WsgiIntegration, _WsgiIntegration
+from werkzeug.exceptions import Forbidden
+from werkzeug.routing import Map, Rule
+from werkzeug.test import Client
+from werkzeug.wrappers import Request, Response
+
+
+def werkzeug_app_factory(exception=None):
+    oso = oso_sdk.init("API_KEY", WsgiIntegration(), shared=False, exception=exception)
+
+    @oso.enforce("<id>", "read")
+    def org(request, id):
+        return Response("ok")
+
+    def health(request):
+        return Response("ok")
+
+    url_map = Map(
+        [Rule("/org/<int:id>", endpoint="org"), Rule("/health", endpoint=health)]
+    )
+    views = {"org": org}
+
+    @Request.application
+    def app(request):
+        endpoint, params = url_map.bind_to_environ(request.environ).match()
+        return views.get(endpoint, endpoint)(request, **params)
+
+    return OsoMiddleware(app, oso, url_map, views), oso
+
+
+def test_parse_resource_id():
+    oso = _WsgiIntegration("API_KEY", False, None)
+
+    assert oso._parse_resource_id("<id>") == (ResourceIdKind.PARAM, "id")
+    assert oso._parse_resource_id("<int:id>") == (ResourceIdKind.PARAM, "id")
+    assert oso._parse_resource_id("foo") == (ResourceIdKind.LITERAL, "foo")
+    with pytest.raises(ValueError):
+        oso._parse_resource_id("/org/<id>/repo/<repo_id>")
+
+
+def test_middleware(test_user):
+    app, oso = werkzeug_app_factory()
+    client = Client(app)
+
+    with patch.object(oso_cloud.Oso, "authorize", return_value=True) as mock:
+        response = client.get("/org/1")
+        assert response.status_code == 200
+        mock.assert_called_once_with(
+            actor=test_user, action="read", resource={"type": "Org", "id": "1"}
+        )
+
+        assert client.get("/health").status_code == 200
+        mock.assert_called_with(
+            actor=test_user, action="view", resource={"type": "Health", "id": "_"}
+        )
+
+    with patch.object(oso_cloud.Oso, "authorize", return_value=False) as mock:
+        response = client.get("/org/1")
+        assert response.status_code == 404
+        assert response.data == b"Not Found"
+
+        # Requests without a route are left to the app
+        assert client.get("/repo").status_code == 404
+        assert mock.call_count == 1
+
+    report = oso.analyze_routes(app)
+    assert [(r.method, r.checks) for r in report] == [
+        ("*", (("read", "Org"),)),
+        ("*", ((None, "Health"),)),
+    ]
+
+
+def test_custom_exception(mock_oso_denied):
+    app, _ = werkzeug_app_factory(exception=Forbidden())
+    assert Client(app).get("/org/1").status_code == 403
+
+
+def test_flask(mock_oso_denied):
+    oso = oso_sdk.init("API_KEY", WsgiIntegration(), shared=False, exempt=["/health"])
+    app = Flask(__name__)
+    identified = []
+
+    @oso.identify_user_from_request
+    def user(environ):
+        identified.append(environ["PATH_INFO"])
+        return "1"
+
+    @app.get("/org/<id>")
+    def org(id: int):
+        return {"status": "ok"}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    app.wsgi_app = OsoMiddleware(  # type: ignore
+        app.wsgi_app, oso, app.url_map, app.view_functions
+    )
+    client = app.test_client()
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/org/1").status_code == 404
+    assert identified == ["/org/1"]
+    mock_oso_denied.assert_called_once_with(
+        actor={"type": "User", "id": "1"},
+        action="view",
+        resource={"type": "Org", "id": "_"},
+    )
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import oso_cloud  # type: ignore
+import pytest
+from oso_sdk.aio import AsyncApi
+
+
+@pytest.fixture
+def api():
+    return oso_cloud.Oso("https://api.osohq.com", "TEST_API_KEY").api
+
+
+def test_authorize(api):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"allowed": True})
+
+    async def authorize():
+        aio = AsyncApi(api, transport=httpx.MockTransport(handler))
+        allowed = await aio.authorize(
+            {"type": "User", "id": "1"},
+            "view",
+            {"type": "Org", "id": 2},
+            [{"name": "is_public", "args": [{"type": "Org", "id": "2"}]}],
+        )
+        await aio.aclose()
+        return allowed
+
+    assert asyncio.run(authorize())
+
+    (request,) = requests
+    assert str(request.url) == "https://api.osohq.com/api/authorize"
+    assert request.headers["Authorization"] == "Bearer TEST_API_KEY"
+    assert json.loads(request.content) == {
+        "actor_type": "User",
+        "actor_id": "1",
+        "action": "view",
+        "resource_type": "Org",
+        "resource_id": "2",
+        "context_facts": [
+            {"predicate": "is_public", "args": [{"type": "Org", "id": "2"}]}
+        ],
+    }
+
+
+def test_authorize_resources(api):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["resources"] == [
+            {"type": "Org", "id": "1"},
+            {"type": "Org", "id": "2"},
+            {"type": "Org", "id": "1"},
+        ]
+        return httpx.Response(200, json={"results": [{"type": "Org", "id": "1"}]})
+
+    aio = AsyncApi(api, transport=httpx.MockTransport(handler))
+    org_1 = {"type": "Org", "id": 1}
+    org_2 = {"type": "Org", "id": 2}
+
+    assert asyncio.run(
+        aio.authorize_resources(
+            {"type": "User", "id": "1"}, "view", [org_1, org_2, org_1]
+        )
+    ) == [org_1, org_1]
+    assert asyncio.run(aio.authorize_resources({"type": "User"}, "view", [])) == []
+
+
+def test_actions(api):
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == "https://api.osohq.com/api/actions"
+        assert json.loads(request.content) == {
+            "actor_type": "User",
+            "actor_id": "1",
+            "resource_type": "Org",
+            "resource_id": "2",
+            "context_facts": [],
+        }
+        return httpx.Response(200, json={"results": ["view", "edit"]})
+
+    aio = AsyncApi(api, transport=httpx.MockTransport(handler))
+    assert asyncio.run(
+        aio.actions({"type": "User", "id": "1"}, {"type": "Org", "id": 2})
+    ) == ["view", "edit"]
+
+
+def test_error(api):
+    aio = AsyncApi(
+        api, transport=httpx.MockTransport(lambda _: httpx.Response(500, text="oops"))
+    )
+
+    with pytest.raises(Exception, match="500"):
+        asyncio.run(aio.authorize({"type": "User", "id": "1"}, "view", "foo"))
+
+    with pytest.raises(TypeError):
+        asyncio.run(aio.authorize({"type": "User"}, "view", "foo"))
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import pytest
+from oso_sdk.batching import Batcher
+from oso_sdk.deadline import deadline_scope
+from oso_sdk.exceptions import OsoSdkTimeoutError
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Batcher(window=-1)
+    with pytest.raises(ValueError):
+        Batcher(max_size=0)
+
+
+def test_threads_share_a_batch():
+    batcher = Batcher(window=5, max_size=3)
+    batches = []
+
+    def fetch(items: List[Any]) -> List[bool]:
+        batches.append(list(items))
+        return [item % 2 == 0 for item in items]
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # A full batch is sent without waiting for the window to end
+        results = list(executor.map(lambda i: batcher.check("g", i, fetch), range(3)))
+
+    assert results == [True, False, True]
+    assert batches == [[0, 1, 2]]
+    assert batcher.stats.batches == 1
+    assert batcher.stats.checks == 3
+    assert batcher.stats.full == 1
+
+
+def test_follower_deadline():
+    batcher = Batcher(window=5, max_size=2)
+    release = threading.Event()
+
+    def fetch(items: List[Any]) -> List[bool]:
+        release.wait(5)
+        return [True] * len(items)
+
+    def follow():
+        with deadline_scope(0.05):
+            return batcher.check("g", 1, fetch)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(batcher.check, "g", 0, fetch)
+        while not batcher._pending:
+            pass
+        # The follower fills the batch, and stops waiting for a leader
+        # without a deadline at its own
+        with pytest.raises(OsoSdkTimeoutError):
+            executor.submit(follow).result()
+        release.set()
+        assert leader.result()
+
+
+def test_window():
+    batcher = Batcher(window=0, max_size=64)
+    batches = []
+
+    def fetch(items: List[Any]) -> List[bool]:
+        batches.append(items)
+        return [True] * len(items)
+
+    assert batcher.check("a", 1, fetch)
+    assert batcher.check("b", 2, fetch)
+    assert batches == [[1], [2]]
+    assert batcher.stats.full == 0
+
+
+def test_threads_share_an_error():
+    batcher = Batcher(window=5, max_size=2)
+
+    def fetch(items: List[Any]) -> List[bool]:
+        raise ValueError()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(batcher.check, "g", i, fetch) for i in range(2)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_tasks_share_a_batch():
+    batcher = Batcher(window=0.01, max_size=64)
+    batches = []
+
+    async def fetch(items: List[Any]) -> List[bool]:
+        batches.append(list(items))
+        return [item != "b" for item in items]
+
+    async def main():
+        cancelled = asyncio.ensure_future(batcher.check_async("g", "c", fetch))
+        checks = [batcher.check_async("g", item, fetch) for item in ("a", "b")]
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await asyncio.gather(*checks)
+
+    assert asyncio.run(main()) == [True, False]
+    assert batches == [["c", "a", "b"]]
+    assert batcher.stats.batches == 1
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+import pytest
+from oso_sdk.breaker import CircuitBreaker, CircuitState
+from oso_sdk.exceptions import OsoSdkCircuitOpenError, OsoSdkOverloadedError
+
+
+def _fail():
+    raise ConnectionError()
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        CircuitBreaker(threshold=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker(probes=0)
+
+
+@patch("oso_sdk.breaker.time.monotonic")
+def test_open_and_recover(monotonic):
+    monotonic.return_value = 0
+    transitions = []
+    breaker = CircuitBreaker(
+        threshold=0.5,
+        min_calls=4,
+        open_for=30,
+        on_state_change=lambda *t: transitions.append(t),
+    )
+
+    assert breaker.call(lambda: True)
+    assert breaker.call(lambda: True)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CircuitState.CLOSED
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CircuitState.OPEN
+
+    # Rejected without calling
+    with pytest.raises(OsoSdkCircuitOpenError):
+        breaker.call(_fail)
+    assert breaker.stats.rejected == 1
+
+    # A failed probe opens the circuit again
+    monotonic.return_value = 30
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.stats.opened == 2
+
+    monotonic.return_value = 60
+    assert breaker.call(lambda: True)
+    assert breaker.state == CircuitState.CLOSED
+    assert transitions == [
+        (CircuitState.CLOSED, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.OPEN),
+        (CircuitState.OPEN, CircuitState.HALF_OPEN),
+        (CircuitState.HALF_OPEN, CircuitState.CLOSED),
+    ]
+
+
+@patch("oso_sdk.breaker.time.monotonic")
+def test_window(monotonic):
+    monotonic.return_value = 0
+    breaker = CircuitBreaker(threshold=0.5, min_calls=2, window=10)
+
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    monotonic.return_value = 10
+    breaker.call(lambda: True)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_sdk_errors_are_not_failures():
+    breaker = CircuitBreaker(threshold=1, min_calls=1)
+
+    def overloaded():
+        raise OsoSdkOverloadedError()
+
+    with pytest.raises(OsoSdkOverloadedError):
+        breaker.call(overloaded)
+    assert breaker.state == CircuitState.CLOSED
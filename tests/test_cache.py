@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+import pytest
+from oso_sdk.cache import ActionSetCache, DecisionCache, fact_entities, to_cache_key
+
+KEY = ("User", "1", "view", "Org", "1")
+
+
+def test_to_cache_key():
+    assert (
+        to_cache_key({"type": "User", "id": 1}, "view", {"type": "Org", "id": "1"})
+        == KEY
+    )
+    assert to_cache_key("alice", "view", {"type": "Org", "id": "1"}) == (
+        "String",
+        "alice",
+        "view",
+        "Org",
+        "1",
+    )
+    assert to_cache_key({"type": "User"}, "view", {"type": "Org", "id": "1"}) is None
+
+
+def test_invalid_maxsize():
+    with pytest.raises(ValueError):
+        DecisionCache(maxsize=0)
+
+
+def test_hit_and_miss():
+    cache = DecisionCache()
+
+    assert cache.get(KEY) is None
+    cache.set(KEY, True)
+    assert cache.get(KEY) is True
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_lru_eviction():
+    cache = DecisionCache(maxsize=2)
+    other = ("User", "2", "view", "Org", "1")
+    last = ("User", "3", "view", "Org", "1")
+
+    cache.set(KEY, True)
+    cache.set(other, True)
+    cache.get(KEY)
+    cache.set(last, False)
+
+    assert len(cache) == 2
+    assert cache.get(other) is None
+    assert cache.get(KEY) is True
+    assert cache.get(last) is False
+    assert cache.stats.evictions == 1
+
+
+@patch("oso_sdk.cache.time.monotonic")
+def test_ttl(monotonic):
+    cache = DecisionCache(allow_ttl=10, deny_ttl=1)
+    other = ("User", "2", "view", "Org", "1")
+
+    monotonic.return_value = 0
+    cache.set(KEY, True)
+    cache.set(other, False)
+    cache.set(("User", "3", "view", "Org", "1"), True, ttl=0)
+    assert len(cache) == 2
+
+    monotonic.return_value = 5
+    assert cache.get(KEY) is True
+    assert cache.get(other) is None
+
+    monotonic.return_value = 10
+    assert cache.get(KEY) is None
+
+
+def test_fact_entities():
+    user = {"type": "User", "id": "1"}
+    org = {"type": "Org", "id": "1"}
+
+    assert fact_entities({"name": "has_role", "args": [user, "admin", org]}) == {
+        ("User", "1"),
+        ("String", "admin"),
+        ("Org", "1"),
+    }
+    assert fact_entities({"name": "has_role", "args": [user, None, org]}) is None
+    assert fact_entities({"name": "has_role", "args": [{"type": "User"}]}) is None
+
+
+def test_invalidate():
+    cache = DecisionCache()
+    other_actor = ("User", "2", "view", "Org", "1")
+    other_resource = ("User", "1", "view", "Org", "2")
+    unrelated = ("User", "2", "view", "Org", "2")
+    for key in (KEY, other_actor, other_resource, unrelated):
+        cache.set(key, True)
+
+    assert cache.invalidate([("User", "1")]) == 2
+    assert cache.get(KEY) is None
+    assert cache.get(other_resource) is None
+    assert cache.get(other_actor) is True
+
+    assert cache.invalidate([("Org", "1"), ("Org", "3")]) == 1
+    assert cache.get(unrelated) is True
+    assert cache.stats.invalidations == 3
+
+
+def test_invalidate_self_reference():
+    cache = DecisionCache()
+    key = ("User", "1", "view", "User", "1")
+    cache.set(key, True)
+
+    assert cache.invalidate([("User", "1")]) == 1
+    assert len(cache) == 0
+
+
+def test_stale_generation():
+    cache = DecisionCache()
+    generation = cache.generation
+    cache.invalidate([("User", "1")])
+
+    cache.set(KEY, True, generation=generation)
+    assert cache.get(KEY) is None
+
+
+def test_invalid_refresh_options():
+    with pytest.raises(ValueError):
+        DecisionCache(refresh_ahead=1)
+
+    with pytest.raises(ValueError):
+        DecisionCache(max_stale=-1)
+
+
+@patch("oso_sdk.cache.time.monotonic")
+def test_lookup_refresh(monotonic):
+    cache = DecisionCache(allow_ttl=10, refresh_ahead=0.2, max_stale=5)
+
+    monotonic.return_value = 0
+    cache.set(KEY, True)
+    monotonic.return_value = 7
+    assert cache.lookup(KEY) == (True, False)
+    monotonic.return_value = 8
+    assert cache.lookup(KEY) == (True, True)
+    monotonic.return_value = 14
+    assert cache.lookup(KEY) == (True, True)
+    monotonic.return_value = 15
+    assert cache.lookup(KEY) == (None, False)
+    assert cache.stats.stale_hits == 2
+
+
+@patch("oso_sdk.cache.time.monotonic")
+def test_action_sets(monotonic):
+    cache = ActionSetCache(maxsize=2, ttl=10)
+    user = ("User", "1")
+    monotonic.return_value = 0
+    cache.set((user, ("Org", "1")), frozenset({"view", "edit"}))
+    cache.set((user, ("Org", "2")), frozenset())
+    assert cache.get((user, ("Org", "1"))) == {"view", "edit"}
+    assert cache.get((user, ("Org", "2"))) == frozenset()
+
+    cache.set((("User", "2"), ("Org", "1")), frozenset({"view"}))
+    assert cache.get((user, ("Org", "1"))) is None
+    assert cache.stats.evictions == 1
+
+    assert cache.invalidate([("Org", "1")]) == 1
+    generation = cache.generation
+    cache.invalidate([("Org", "3")])
+    cache.set((user, ("Org", "1")), frozenset({"view"}), generation=generation)
+    assert cache.get((user, ("Org", "1"))) is None
+
+    monotonic.return_value = 10
+    assert cache.get((user, ("Org", "2"))) is None
+    assert len(cache) == 0
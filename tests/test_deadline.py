@@ -0,0 +1,42 @@
+import time
+
+import pytest
+import requests
+from oso_sdk.deadline import cap_timeout, deadline_scope, expired, remaining
+from oso_sdk.exceptions import OsoSdkTimeoutError
+from oso_sdk.transport import DeadlineAdapter
+
+
+def test_cap_timeout():
+    assert cap_timeout((1, 5)) == (1, 5)
+
+    with deadline_scope(2):
+        connect, read = cap_timeout((1, None))
+        assert connect == 1
+        assert 1 < read <= 2
+        assert cap_timeout(0.5) == 0.5
+
+        # Lifted for background work
+        with deadline_scope(None):
+            assert cap_timeout(None) is None
+
+
+def test_expired():
+    assert not expired()
+    assert remaining() is None
+
+    with deadline_scope(0.01):
+        assert not expired()
+        time.sleep(0.02)
+        assert expired()
+        with pytest.raises(OsoSdkTimeoutError):
+            remaining()
+
+
+def test_adapter_fails_before_sending():
+    with requests.Session() as session:
+        session.mount("http://", DeadlineAdapter())
+        with deadline_scope(0):
+            with pytest.raises(OsoSdkTimeoutError):
+                # Nothing listens here, the request must not be attempted
+                session.get("http://127.0.0.1:9/")
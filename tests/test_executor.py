@@ -0,0 +1,60 @@
+import contextvars
+import threading
+
+import pytest
+from oso_sdk.exceptions import OsoSdkOverloadedError
+from oso_sdk.executor import BoundedExecutor
+
+_var: contextvars.ContextVar[str] = contextvars.ContextVar("var", default="unset")
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        BoundedExecutor(max_workers=0)
+    with pytest.raises(ValueError):
+        BoundedExecutor(max_queue=-1)
+
+
+def test_rejects_when_full():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: True)
+    with pytest.raises(OsoSdkOverloadedError):
+        executor.submit(lambda: True)
+
+    release.set()
+    assert running.result()
+    assert queued.result()
+    assert executor.submit(lambda: True).result()
+    assert executor.stats.submitted == 3
+    assert executor.stats.rejected == 1
+    executor.shutdown()
+
+
+def test_cancelled_calls_release_slots():
+    executor = BoundedExecutor(max_workers=1, max_queue=2)
+    release = threading.Event()
+
+    running = executor.submit(release.wait)
+    try:
+        for _ in range(2):
+            assert executor.submit(lambda: True).cancel()
+        # The slots of the cancelled calls are free again
+        queued = [executor.submit(lambda: True) for _ in range(2)]
+        with pytest.raises(OsoSdkOverloadedError):
+            executor.submit(lambda: True)
+    finally:
+        release.set()
+    assert running.result()
+    assert all(f.result() for f in queued)
+    executor.shutdown()
+
+
+def test_copies_context():
+    executor = BoundedExecutor()
+
+    _var.set("set")
+    assert executor.submit(_var.get).result() == "set"
+    executor.shutdown()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from oso_sdk.hedging import Hedger
+
+
+def _slow_then_fast():
+    """The first call is stuck until released, later calls answer right away."""
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 2:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    return func, release
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Hedger(percentile=100)
+    with pytest.raises(ValueError):
+        Hedger(budget=2)
+
+
+def test_no_hedge_before_min_samples():
+    hedger = Hedger(min_samples=2)
+
+    assert hedger.call(lambda: True)
+    assert hedger.delay is None
+    assert hedger.call(lambda: True)
+    assert hedger.delay == hedger.min_delay
+
+
+def test_hedge():
+    hedger = Hedger(budget=1, min_samples=1, min_delay=0.01)
+    func, release = _slow_then_fast()
+
+    assert hedger.call(func) == "fast"
+    assert hedger.call(func) == "fast"
+    release.set()
+    assert hedger.stats.hedged == 1
+    assert hedger.stats.hedge_wins == 1
+
+
+def test_hedge_error():
+    hedger = Hedger(budget=1, min_samples=1, min_delay=0.01)
+    hedger.call(lambda: True)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise ConnectionError()
+        time.sleep(0.1)
+        return "ok"
+
+    # The first request fails after the hedge was sent, wait for the hedge
+    assert hedger.call(func) == "ok"
+    assert hedger.stats.hedge_wins == 1
+
+
+def test_budget():
+    hedger = Hedger(budget=0, min_samples=1, min_delay=0.01)
+    func, release = _slow_then_fast()
+
+    assert hedger.call(func) == "fast"
+    threading.Timer(0.05, release.set).start()
+    assert hedger.call(func) == "slow"
+    assert hedger.stats.hedged == 0
+    assert hedger.stats.over_budget == 1
+
+
+def test_hedge_async():
+    hedger = Hedger(budget=1, min_samples=1, min_delay=0.01)
+    started = []
+    cancelled = []
+
+    async def func():
+        started.append(1)
+        if len(started) == 2:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "slow"
+        return "fast"
+
+    async def main():
+        assert await hedger.call_async(func) == "fast"
+        assert await hedger.call_async(func) == "fast"
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert hedger.stats.hedge_wins == 1
+    # The losing request was cancelled
+    assert cancelled == [1]
+
+
+def test_saturated():
+    hedger = Hedger(budget=1, min_samples=1, min_delay=0.01, max_workers=1)
+    hedger.call(lambda: True)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    results = []
+    thread = threading.Thread(target=lambda: results.append(hedger.call(slow)))
+    thread.start()
+    started.wait(5)
+    # The only thread is busy: no hedge, and calls run on the caller's thread
+    assert hedger.call(threading.current_thread) is threading.current_thread()
+    time.sleep(0.05)
+    release.set()
+    thread.join()
+
+    assert results == ["slow"]
+    assert hedger.stats.hedged == 0
+    assert hedger.stats.saturated == 2
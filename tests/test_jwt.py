@@ -0,0 +1,236 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import pytest
+from oso_sdk.exceptions import OsoSdkInternalError
+from oso_sdk.jwt import JwtVerifier, b64decode
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def sign(claims, secret=b"secret", alg="HS256", kid=None) -> str:
+    header = {"alg": alg, "typ": "JWT", **({"kid": kid} if kid else {})}
+    message = ".".join(
+        b64encode(json.dumps(part).encode()) for part in (header, claims)
+    )
+    signature = hmac.new(secret, message.encode(), hashlib.sha256).digest()
+    return f"{message}.{b64encode(signature)}"
+
+
+def test_b64decode():
+    for data in (b"a", b"ab", b"abc", b"abcd"):
+        assert b64decode(b64encode(data)) == data
+
+
+def test_subject(jwt_token):
+    verifier = JwtVerifier(secret="your-256-bit-secret", algorithms=["HS256"])
+    assert verifier.subject(f"Bearer {jwt_token}") == "1234567890"
+
+    for authorization in (None, jwt_token, "Bearer "):
+        with pytest.raises(OsoSdkInternalError):
+            verifier.subject(authorization)
+
+
+def test_algorithms(jwt_token, tmp_path):
+    # Secrets accept the HMAC algorithms by default
+    verifier = JwtVerifier(secret="your-256-bit-secret")
+    assert verifier.subject(f"Bearer {jwt_token}") == "1234567890"
+
+    with pytest.raises(ValueError):
+        JwtVerifier(secret="your-256-bit-secret", algorithms=["RS256"])
+    with pytest.raises(ValueError):
+        JwtVerifier(pem=str(tmp_path / "key.pem"), algorithms=["HS256"])
+
+
+def test_claims_are_cached():
+    verifier = JwtVerifier(secret=b"secret", algorithms=["HS256"])
+    token = sign({"sub": "1", "exp": time.time() + 60})
+
+    assert verifier.claims(token)["sub"] == "1"
+    assert verifier.claims(token)["sub"] == "1"
+    assert verifier.stats.verified == 1
+    assert verifier.stats.hits == 1
+
+    # Tokens without an expiry are verified every time
+    token = sign({"sub": "1"})
+    verifier.claims(token)
+    verifier.claims(token)
+    assert verifier.stats.verified == 3
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        sign({"sub": "1"}, secret=b"other"),
+        sign({"sub": "1"}, alg="HS512"),
+        sign({"sub": "1", "exp": time.time() - 1}),
+        sign({"sub": "1", "nbf": time.time() + 60}),
+        sign({"sub": "1", "iss": "other"}),
+        sign({"sub": "1", "iss": "issuer", "aud": ["other"]}),
+        "a.b",
+        "e30.e30.!",
+    ],
+)
+def test_invalid_token(token):
+    verifier = JwtVerifier(
+        secret=b"secret", algorithms=["HS256"], audience="oso", issuer="issuer"
+    )
+    with pytest.raises(OsoSdkInternalError):
+        verifier.claims(token)
+    assert verifier.stats.rejected == 1
+
+
+def test_jwks(tmp_path):
+    path = tmp_path / "jwks.json"
+
+    def write_keys(kid, secret, mtime):
+        key = {"kty": "oct", "kid": kid, "k": b64encode(secret)}
+        path.write_text(json.dumps({"keys": [key]}))
+        os.utime(path, (mtime, mtime))
+
+    write_keys("1", b"one", 1)
+    verifier = JwtVerifier(jwks=str(path), algorithms=["HS256"])
+    assert verifier.claims(sign({"sub": "1"}, b"one", kid="1"))
+
+    # Keys are loaded again when a token names an unknown one
+    write_keys("2", b"two", 2)
+    assert verifier.claims(sign({"sub": "1"}, b"two", kid="2"))
+    assert verifier.stats.key_loads == 2
+
+    with pytest.raises(OsoSdkInternalError):
+        verifier.claims(sign({"sub": "1"}, b"one", kid="1"))
+    assert verifier.stats.key_loads == 2
+
+
+def _sign_with(private_key, claims, alg, kid=None) -> str:
+    """Sign a token with an RSA or EC private key."""
+    from cryptography.hazmat.primitives import hashes  # type: ignore
+    from cryptography.hazmat.primitives.asymmetric import (  # type: ignore
+        ec,
+        padding,
+        utils,
+    )
+
+    header = {"alg": alg, **({"kid": kid} if kid else {})}
+    message = ".".join(
+        b64encode(json.dumps(part).encode()) for part in (header, claims)
+    ).encode()
+    if alg == "RS256":
+        signature = private_key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+    elif alg == "PS256":
+        pss = padding.PSS(padding.MGF1(hashes.SHA256()), hashes.SHA256.digest_size)
+        signature = private_key.sign(message, pss, hashes.SHA256())
+    else:
+        # JWS signatures are the raw r and s values
+        r, s = utils.decode_dss_signature(
+            private_key.sign(message, ec.ECDSA(hashes.SHA256()))
+        )
+        signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+    return f"{message.decode()}.{b64encode(signature)}"
+
+
+def _write_pem(path, private_key):
+    from cryptography.hazmat.primitives import serialization  # type: ignore
+
+    path.write_bytes(
+        private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+
+
+def test_rsa(tmp_path):
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives.asymmetric import rsa  # type: ignore
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path / "key.pem"
+    _write_pem(path, private_key)
+
+    verifier = JwtVerifier(pem=str(path), algorithms=["RS256", "PS256"])
+    assert verifier.claims(_sign_with(private_key, {"sub": "1"}, "RS256"))["sub"] == "1"
+    assert verifier.claims(_sign_with(private_key, {"sub": "2"}, "PS256"))["sub"] == "2"
+
+    # A PKCS#1 v1.5 signature isn't a PSS one
+    token = _sign_with(private_key, {"sub": "3"}, "RS256")
+    _, payload, signature = token.split(".")
+    pss_header = b64encode(json.dumps({"alg": "PS256"}).encode())
+    for token in (
+        f"{pss_header}.{payload}.{signature}",
+        sign({"sub": "1"}, alg="RS256"),
+    ):
+        with pytest.raises(OsoSdkInternalError):
+            verifier.claims(token)
+
+
+def test_ec(tmp_path):
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives.asymmetric import ec  # type: ignore
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    path = tmp_path / "key.pem"
+    _write_pem(path, private_key)
+
+    verifier = JwtVerifier(pem=str(path))
+    token = _sign_with(private_key, {"sub": "1"}, "ES256")
+    assert verifier.claims(token)["sub"] == "1"
+
+    # Signed by another key
+    other = ec.generate_private_key(ec.SECP256R1())
+    with pytest.raises(OsoSdkInternalError):
+        verifier.claims(_sign_with(other, {"sub": "2"}, "ES256"))
+
+
+def test_jwks_rsa_and_ec(tmp_path):
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa  # type: ignore
+
+    def b64int(value: int) -> str:
+        return b64encode(value.to_bytes((value.bit_length() + 7) // 8, "big"))
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    rsa_numbers = rsa_key.public_key().public_numbers()
+    ec_numbers = ec_key.public_key().public_numbers()
+    path = tmp_path / "jwks.json"
+    path.write_text(
+        json.dumps(
+            {
+                "keys": [
+                    {
+                        "kty": "RSA",
+                        "kid": "rsa",
+                        "n": b64int(rsa_numbers.n),
+                        "e": b64int(rsa_numbers.e),
+                    },
+                    {
+                        "kty": "EC",
+                        "kid": "ec",
+                        "crv": "P-256",
+                        "x": b64int(ec_numbers.x),
+                        "y": b64int(ec_numbers.y),
+                    },
+                    # Unsupported keys are skipped
+                    {"kty": "OKP", "kid": "okp", "crv": "Ed25519", "x": ""},
+                ]
+            }
+        )
+    )
+
+    verifier = JwtVerifier(jwks=str(path))
+    assert verifier.claims(_sign_with(rsa_key, {"sub": "1"}, "RS256", kid="rsa"))
+    assert verifier.claims(_sign_with(ec_key, {"sub": "2"}, "ES256", kid="ec"))
+    # Keys are picked by `kid`
+    for token in (
+        _sign_with(rsa_key, {"sub": "3"}, "RS256", kid="ec"),
+        _sign_with(ec_key, {"sub": "4"}, "ES256", kid="okp"),
+    ):
+        with pytest.raises(OsoSdkInternalError):
+            verifier.claims(token)
@@ -0,0 +1,165 @@
+from typing import Optional, Tuple
+from unittest.mock import patch
+
+import oso_cloud  # type: ignore
+import oso_sdk
+from oso_sdk import IntegrationConfig, LocalEvaluator, OsoSdk
+from oso_sdk.integrations import ResourceIdKind
+
+POLICY = """
+actor User {}
+
+resource Organization {
+  roles = ["viewer", "owner"];
+  permissions = ["view", "edit"];
+
+  "view" if "viewer";
+  "view" if "owner";
+  "edit" if "owner";
+}
+
+resource Repository {
+  roles = ["viewer", "owner"];
+  permissions = ["view", "edit"];
+  relations = { repository_tenant: Organization };
+
+  "view" if "viewer";
+  "view" if "owner";
+  "edit" if "owner";
+  "view" if "viewer" on "repository_tenant";
+  "view" if "owner" on "repository_tenant";
+  "edit" if "owner" on "repository_tenant";
+}
+
+resource Issue {
+  permissions = ["view"];
+  "view" if is_public(resource);
+}
+"""
+
+alice = {"type": "User", "id": "alice"}
+bob = {"type": "User", "id": "bob"}
+org = {"type": "Organization", "id": "acme"}
+repo = {"type": "Repository", "id": "anvil"}
+FACTS = [
+    {"name": "has_role", "args": [alice, "owner", org]},
+    {"name": "has_role", "args": [bob, "viewer", repo]},
+    {"name": "has_relation", "args": [repo, "repository_tenant", org]},
+    {"name": "is_public", "args": [{"type": "Issue", "id": "1"}]},
+]
+
+
+class _TestIntegration(OsoSdk):
+    def _parse_resource_id(self, resource_id: str) -> Tuple[ResourceIdKind, str]:
+        return (ResourceIdKind.LITERAL, "TEST")
+
+
+class TestIntegration(IntegrationConfig):
+    @staticmethod
+    def init(api_key: str, optin: bool, exception: Optional[Exception]) -> OsoSdk:
+        return _TestIntegration(api_key=api_key, optin=optin, exception=exception)
+
+
+def test_authorize():
+    local = LocalEvaluator(POLICY, FACTS)
+    assert local.supported == {"Organization", "Repository"}
+
+    assert local.authorize(alice, "edit", org)
+    # Through the tenant of the repository
+    assert local.authorize(alice, "edit", repo)
+    assert local.authorize(bob, "view", repo)
+    assert local.authorize(bob, "edit", repo) is False
+    assert local.authorize(bob, "view", org) is False
+    assert local.authorize(alice, "delete", repo) is False
+
+    # Unsupported resource blocks and types are left to Oso Cloud
+    assert local.authorize(alice, "view", {"type": "Issue", "id": "1"}) is None
+    assert local.authorize(alice, "view", {"type": "Team", "id": "1"}) is None
+    assert local.stats.hits == 6
+    assert local.stats.fallbacks == 2
+
+
+def test_unsupported_policy():
+    local = LocalEvaluator(POLICY + "has_role(_: User, _: String, _: Issue);", FACTS)
+    assert local.supported == set()
+    assert local.authorize(alice, "edit", org) is None
+
+    allow = "allow(actor, action, resource) if has_permission(actor, action, resource);"
+    assert LocalEvaluator(POLICY + allow).supported == {"Organization", "Repository"}
+
+
+def test_apply():
+    local = LocalEvaluator(POLICY, FACTS)
+    local.apply(
+        delete=[{"name": "has_role", "args": [alice, "owner", org]}],
+        tell=[{"name": "has_role", "args": [bob, "owner", org]}],
+    )
+    assert local.authorize(alice, "edit", repo) is False
+    assert local.authorize(bob, "edit", repo)
+
+    # Wildcards can't be applied
+    local.apply(delete=[{"name": "has_role", "args": [bob, None, None]}])
+    assert local.authorize(bob, "edit", repo) is None
+
+    local.load(FACTS)
+    assert local.authorize(alice, "edit", repo)
+
+
+def test_local_decisions(mock_oso_allowed):
+    local = LocalEvaluator(POLICY, FACTS)
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False, local=local)
+
+    assert oso.authorize(alice, "edit", repo)
+    assert not oso.authorize(bob, "edit", repo)
+    assert mock_oso_allowed.call_count == 0
+    assert oso.authorize(alice, "view", {"type": "Issue", "id": "1"})
+    assert mock_oso_allowed.call_count == 1
+
+    with patch.object(oso_cloud.Oso, "tell"):
+        oso.tell({"name": "has_role", "args": [bob, "owner", repo]})
+    assert oso.authorize(bob, "edit", repo)
+    assert mock_oso_allowed.call_count == 1
+
+
+def test_local_batch():
+    local = LocalEvaluator(POLICY, FACTS)
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False, local=local)
+    issues = [{"type": "Issue", "id": "1"}, {"type": "Issue", "id": "2"}]
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", return_value=issues[:1]
+    ) as mock:
+        assert oso._fetch_decisions(bob, "view", [repo, *issues, org]) == [
+            True,
+            True,
+            False,
+            False,
+        ]
+        mock.assert_called_once_with(actor=bob, action="view", resources=issues)
+
+
+def test_relation_to_actor():
+    # Relations to the actor aren't roles, and are left to Oso Cloud
+    policy = """
+    actor User {}
+
+    resource Document {
+      permissions = ["delete"];
+      relations = { creator: User };
+
+      "delete" if "creator";
+    }
+
+    resource Folder {
+      permissions = ["view"];
+      relations = { owner: User };
+
+      "view" if "admin" on "owner";
+    }
+    """
+    document = {"type": "Document", "id": "1"}
+    facts = [{"name": "has_relation", "args": [document, "creator", alice]}]
+    local = LocalEvaluator(policy, facts)
+    assert local.supported == set()
+    assert local.authorize(alice, "delete", document) is None
+    assert local.authorize(alice, "view", {"type": "Folder", "id": "1"}) is None
@@ -1,8 +1,15 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Tuple
+from unittest.mock import patch
 
+import oso_cloud  # type: ignore
 import oso_sdk
 import pytest
-from oso_sdk import IntegrationConfig, OsoSdk
+from oso_sdk import DecisionCache, IntegrationConfig, OsoSdk
+from oso_sdk.deadline import deadline_scope, remaining
 from oso_sdk.integrations import ResourceIdKind
 
 
@@ -34,3 +41,290 @@ def test_global_oso_sdk():
     local = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
     assert oso != local
     assert type(local).__name__ == "_TestIntegration"
+
+
+def test_write_invalidates_cache(mock_oso_allowed):
+    oso = oso_sdk.init(
+        "TEST_API_KEY", TestIntegration(), shared=False, cache=DecisionCache()
+    )
+    alice = {"type": "User", "id": "alice"}
+    bob = {"type": "User", "id": "bob"}
+    org = {"type": "Org", "id": "1"}
+
+    with patch.object(oso_cloud.Oso, "tell"), patch.object(oso_cloud.Oso, "bulk"):
+        assert oso.authorize(alice, "view", org)
+        assert oso.authorize(bob, "view", org)
+        assert oso.authorize(bob, "view", {"type": "Org", "id": "2"})
+        assert mock_oso_allowed.call_count == 3
+
+        oso.tell({"name": "has_role", "args": [alice, "member", org]})
+        assert oso.authorize(alice, "view", org)
+        assert oso.authorize(bob, "view", {"type": "Org", "id": "2"})
+        assert mock_oso_allowed.call_count == 4
+
+        oso.bulk(delete=[{"name": "has_role", "args": [{"type": "User"}, None, org]}])
+        assert oso.authorize(bob, "view", {"type": "Org", "id": "2"})
+        assert mock_oso_allowed.call_count == 5
+
+
+@patch("oso_sdk.cache.time.monotonic")
+def test_stale_while_revalidate(monotonic):
+    cache = DecisionCache(allow_ttl=10, deny_ttl=10, max_stale=5)
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False, cache=cache)
+    alice = {"type": "User", "id": "alice"}
+    org = {"type": "Org", "id": "1"}
+
+    with patch.object(
+        oso_cloud.Oso, "authorize", side_effect=[True, False, True]
+    ) as authorize:
+        monotonic.return_value = 0
+        assert oso.authorize(alice, "view", org)
+
+        # Served stale while a single refresh runs in the background
+        monotonic.return_value = 12
+        assert oso.authorize(alice, "view", org)
+        assert oso._background is not None
+        oso._background.shutdown(wait=True)
+        assert authorize.call_count == 2
+        assert not oso.authorize(alice, "view", org)
+
+        # Too stale, wait for Oso Cloud
+        monotonic.return_value = 40
+        assert oso.authorize(alice, "view", org)
+        assert authorize.call_count == 3
+
+
+def test_async_client():
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
+    assert oso._aio is None
+
+    oso = oso_sdk.init(
+        "TEST_API_KEY", TestIntegration(), shared=False, async_client=True
+    )
+    assert oso._aio is not None
+
+
+def test_authorize_async_without_client(mock_oso_allowed):
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
+    user = {"type": "User", "id": "1"}
+    org = {"type": "Org", "id": "1"}
+
+    assert asyncio.run(oso.authorize_async(user, "view", org))
+    mock_oso_allowed.assert_called_once_with(actor=user, action="view", resource=org)
+
+
+def test_concurrent_checks_are_coalesced():
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
+    user = {"type": "User", "id": "1"}
+    org = {"type": "Org", "id": "1"}
+    release = threading.Event()
+
+    def authorize(**_):
+        release.wait()
+        return True
+
+    with patch.object(oso_cloud.Oso, "authorize", side_effect=authorize) as mock:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(oso.authorize, user, "view", org) for _ in range(4)
+            ]
+            while oso.single_flight.stats.coalesced < 3:
+                pass
+            release.set()
+            assert all(f.result() for f in futures)
+
+    assert mock.call_count == 1
+
+
+def test_batcher():
+    oso = oso_sdk.init(
+        "TEST_API_KEY",
+        TestIntegration(),
+        shared=False,
+        batcher=oso_sdk.Batcher(window=5, max_size=2),
+    )
+    user = {"type": "User", "id": "1"}
+    org_1 = {"type": "Org", "id": "1"}
+    org_2 = {"type": "Org", "id": "2"}
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", return_value=[org_2]
+    ) as mock:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = executor.map(
+                lambda org: oso.authorize(user, "view", org), [org_1, org_2]
+            )
+            assert list(results) == [False, True]
+
+    mock.assert_called_once()
+    assert oso.batcher is not None
+    assert oso.batcher.stats.checks == 2
+
+
+def test_authorize_checks_async():
+    oso = oso_sdk.init(
+        "TEST_API_KEY", TestIntegration(), shared=False, cache=DecisionCache()
+    )
+    user = {"type": "User", "id": "1"}
+    org = {"type": "Org", "id": "1"}
+    repo = {"type": "Repo", "id": "1"}
+    checks = [("view", org), ("edit", repo)]
+
+    # Each action's request is sent concurrently, in any order
+    def authorize_resources(actor, action, resources):
+        return resources if action == "view" else []
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", side_effect=authorize_resources
+    ) as mock:
+        assert not asyncio.run(oso._authorize_checks_async(user, checks))
+        assert asyncio.run(oso._authorize_checks_async(user, checks, False))
+        # The view request is dropped if the edit deny settled the first check
+        calls = mock.call_count
+        assert calls in (2, 3)
+
+        # A cached deny settles the outcome without a request
+        assert not asyncio.run(oso._authorize_checks_async(user, checks))
+        assert mock.call_count == calls
+
+
+def test_action_sets():
+    oso = oso_sdk.init(
+        "TEST_API_KEY",
+        TestIntegration(),
+        shared=False,
+        action_sets=oso_sdk.ActionSetCache(),
+    )
+    user = {"type": "User", "id": "1"}
+    org = {"type": "Org", "id": "1"}
+
+    with patch.object(oso_cloud.Oso, "actions", return_value=["view"]) as mock, patch(
+        "oso_cloud.Oso.tell"
+    ):
+        assert oso.authorize(user, "view", org)
+        assert not oso.authorize(user, "edit", org)
+        assert not asyncio.run(oso.authorize_async(user, "delete", org))
+        mock.assert_called_once_with(actor=user, resource=org)
+
+        # Writes drop the action sets they can affect
+        oso.tell({"name": "has_role", "args": [user, "owner", org]})
+        mock.return_value = ["view", "edit"]
+        assert oso.authorize(user, "edit", org)
+        assert mock.call_count == 2
+
+        # Routes that opt out of caching always fetch
+        assert oso._authorize(user, "edit", org, cache_ttl=0)
+        assert mock.call_count == 3
+
+
+def test_prefetch():
+    oso = oso_sdk.init(
+        "TEST_API_KEY",
+        TestIntegration(),
+        shared=False,
+        cache=DecisionCache(),
+        prefetcher=oso_sdk.Prefetcher(chunk_size=2),
+    )
+    user = {"type": "User", "id": "1"}
+    orgs = [{"type": "Org", "id": str(i)} for i in range(3)]
+
+    # Routes that opt out of caching have nothing to prefetch
+    assert oso.prefetch(user, orgs, ["view"], cache_ttl=0).done()
+
+    with patch.object(
+        oso_cloud.Oso,
+        "authorize_resources",
+        side_effect=[orgs[2:], [], orgs[:1], []],
+    ) as mock:
+        assert oso.prefetch(user, orgs[1:], ["view"]).wait(1)
+        # Decisions already cached aren't fetched again
+        assert oso.prefetch(user, orgs, ["view", "edit"]).wait(1)
+        assert mock.call_count == 4
+
+    with patch.object(oso_cloud.Oso, "authorize") as mock:
+        assert [oso.authorize(user, "view", org) for org in orgs] == [
+            False,
+            False,
+            True,
+        ]
+        assert oso.authorize(user, "edit", orgs[0])
+        mock.assert_not_called()
+
+
+def test_filter_authorized():
+    oso = oso_sdk.init(
+        "TEST_API_KEY", TestIntegration(), shared=False, cache=DecisionCache()
+    )
+    user = {"type": "User", "id": "1"}
+    ids = [3, 1, 2, 1, 4]
+
+    def key(i):
+        return {"type": "Org", "id": str(i)}
+
+    def authorize_resources(actor, action, resources):
+        return [r for r in resources if int(r["id"]) % 2]
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", side_effect=authorize_resources
+    ) as mock:
+        assert oso.filter_authorized(user, "view", ids, key=key, chunk_size=2) == [
+            3,
+            1,
+            1,
+        ]
+        # Duplicates are checked once, in chunks
+        assert [len(c.kwargs["resources"]) for c in mock.call_args_list] == [2, 2]
+
+        orgs = [key(i) for i in range(6)]
+        assert asyncio.run(oso.filter_authorized_async(user, "view", orgs)) == [
+            orgs[1],
+            orgs[3],
+            orgs[5],
+        ]
+        # Only the decisions that weren't cached are fetched
+        assert mock.call_args.kwargs["resources"] == [orgs[0], orgs[5]]
+
+    with pytest.raises(ValueError):
+        oso.filter_authorized(user, "view", ids, chunk_size=0)
+
+
+def test_filter_authorized_async_concurrency():
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
+    user = {"type": "User", "id": "1"}
+    orgs = [{"type": "Org", "id": str(i)} for i in range(8)]
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def authorize_resources(actor, action, resources):
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return resources
+
+    with patch.object(
+        oso_cloud.Oso, "authorize_resources", side_effect=authorize_resources
+    ) as mock:
+        filtered = oso.filter_authorized_async(
+            user, "view", orgs, chunk_size=1, max_concurrency=2
+        )
+        assert asyncio.run(filtered) == orgs
+    assert mock.call_count == 8
+    assert most[0] == 2
+
+    with pytest.raises(ValueError):
+        asyncio.run(oso.filter_authorized_async(user, "view", orgs, max_concurrency=0))
+
+
+def test_run_blocking_keeps_deadline():
+    oso = oso_sdk.init("TEST_API_KEY", TestIntegration(), shared=False)
+
+    async def main():
+        with deadline_scope(5):
+            return await oso._run_blocking(remaining)
+
+    left = asyncio.run(main())
+    assert left is not None and 0 < left <= 5
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+from oso_sdk import Prefetcher
+from oso_sdk.exceptions import OsoSdkCircuitOpenError
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        Prefetcher(rate=0)
+    with pytest.raises(ValueError):
+        Prefetcher(chunk_size=0)
+
+
+def test_submit():
+    prefetcher = Prefetcher()
+    calls = []
+    prefetch = prefetcher.submit(lambda i=i: calls.append(i) for i in range(3))
+
+    assert prefetch.wait(1)
+    assert not prefetch.cancelled
+    assert calls == [0, 1, 2]
+    assert prefetcher.stats.requests == 3
+
+
+def test_rate_limit_and_cancel():
+    prefetcher = Prefetcher(rate=0.01, burst=2)
+    calls = []
+    prefetch = prefetcher.submit(lambda: calls.append(1) for _ in range(10))
+
+    # The third request waits for a token until it's cancelled
+    assert not prefetch.wait(0.1)
+    prefetch.cancel()
+    assert prefetch.wait(1)
+    assert len(calls) == 2
+    assert prefetcher.stats.cancelled == 1
+
+
+def test_max_pending():
+    prefetcher = Prefetcher(max_pending=1, max_workers=1)
+    release = threading.Event()
+    first = prefetcher.submit([release.wait])
+    second = prefetcher.submit([release.wait])
+
+    assert second.done() and second.cancelled
+    assert prefetcher.stats.dropped == 1
+    release.set()
+    assert first.wait(1)
+
+
+def test_circuit_open():
+    def request():
+        raise OsoSdkCircuitOpenError("circuit breaker is open")
+
+    calls = []
+    prefetch = Prefetcher().submit([request, lambda: calls.append(1)])
+    assert prefetch.wait(1)
+    assert calls == []
@@ -0,0 +1,134 @@
+import multiprocessing
+from unittest.mock import patch
+
+import pytest
+from oso_sdk.shared_cache import SharedDecisionCache
+
+KEY = ("User", "1", "view", "Org", "1")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "decisions")
+
+
+def _set_decision(path):
+    SharedDecisionCache(path, slots=64).set(KEY, True)
+
+
+def test_hit_and_miss(path):
+    cache = SharedDecisionCache(path, slots=64)
+
+    assert cache.get(KEY) is None
+    cache.set(KEY, False)
+    assert cache.get(KEY) is False
+    cache.set(KEY, True)
+    assert cache.get(KEY) is True
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+
+
+def test_shared_between_processes(path):
+    cache = SharedDecisionCache(path, slots=64)
+    process = multiprocessing.get_context("fork").Process(
+        target=_set_decision, args=(path,)
+    )
+    process.start()
+    process.join()
+
+    assert process.exitcode == 0
+    assert cache.get(KEY) is True
+
+
+def test_layout_mismatch(path):
+    SharedDecisionCache(path, slots=64)
+    with pytest.raises(ValueError):
+        SharedDecisionCache(path, slots=128)
+
+
+def test_other_file(path):
+    with open(path, "w") as f:
+        f.write("data")
+    with pytest.raises(ValueError):
+        SharedDecisionCache(path, slots=64)
+    with open(path) as f:
+        assert f.read() == "data"
+
+    # Empty files are initialized
+    open(path, "w").close()
+    SharedDecisionCache(path, slots=64).set(KEY, True)
+    assert SharedDecisionCache(path, slots=64).get(KEY) is True
+
+
+@patch("oso_sdk.shared_cache.time.time")
+def test_ttl(time, path):
+    cache = SharedDecisionCache(path, slots=64, allow_ttl=10, deny_ttl=1)
+    other = ("User", "2", "view", "Org", "1")
+
+    time.return_value = 1000
+    cache.set(KEY, True)
+    cache.set(other, False)
+    time.return_value = 1005
+    assert cache.get(KEY) is True
+    assert cache.get(other) is None
+    time.return_value = 1010
+    assert cache.get(KEY) is None
+
+
+def test_eviction(path):
+    cache = SharedDecisionCache(path, slots=1, ways=1)
+
+    cache.set(KEY, True, ttl=10)
+    cache.set(("User", "2", "view", "Org", "1"), True, ttl=20)
+    assert cache.get(KEY) is None
+    assert cache.stats.evictions == 1
+
+
+def test_invalidate(path):
+    cache = SharedDecisionCache(path, slots=64)
+    other = SharedDecisionCache(path, slots=64)
+    unrelated = ("User", "2", "view", "Org", "2")
+    cache.set(KEY, True)
+    cache.set(unrelated, True)
+
+    generation = cache.generation
+    other.invalidate([("Org", "1")])
+    assert cache.get(KEY) is None
+    assert cache.get(unrelated) is True
+
+    cache.set(KEY, True, generation=generation)
+    assert cache.get(KEY) is None
+
+    other.clear()
+    assert cache.get(unrelated) is None
+
+
+def test_invalidate_during_set(path):
+    cache = SharedDecisionCache(path, slots=64)
+    other = SharedDecisionCache(path, slots=64)
+    generation = cache.generation
+    bump = other._bump_generation
+
+    def racing_bump():
+        # Decisions fetched before the invalidation are stored by another
+        # worker while it's in progress
+        cache.set(KEY, True, generation=generation)
+        bump()
+        cache.set(KEY, True, generation=generation)
+
+    with patch.object(other, "_bump_generation", racing_bump):
+        other.invalidate([("Org", "1")])
+    assert cache.get(KEY) is None
+
+
+@patch("oso_sdk.shared_cache.time.time")
+def test_lookup_refresh(time, path):
+    cache = SharedDecisionCache(path, slots=64, allow_ttl=10, max_stale=5)
+
+    time.return_value = 1000
+    cache.set(KEY, True)
+    assert cache.lookup(KEY) == (True, False)
+    time.return_value = 1012
+    assert cache.lookup(KEY) == (True, True)
+    time.return_value = 1015
+    assert cache.lookup(KEY) == (None, False)
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from oso_sdk.deadline import deadline_scope
+from oso_sdk.exceptions import OsoSdkTimeoutError
+from oso_sdk.single_flight import SingleFlight
+
+
+def test_threads_share_a_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        release.wait()
+        return True
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, "key", func) for _ in range(4)]
+        while flight.stats.coalesced < 3:
+            pass
+        release.set()
+        assert all(f.result() for f in futures)
+
+    assert len(calls) == 1
+    assert flight.stats.calls == 1
+    assert flight.stats.coalesced == 3
+
+    # The next call after the flight lands makes its own request
+    assert flight.do("key", func)
+    assert len(calls) == 2
+
+
+def test_threads_share_an_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def func():
+        release.wait()
+        raise ValueError()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(flight.do, "key", func) for _ in range(2)]
+        while flight.stats.coalesced < 1:
+            pass
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_follower_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def follow():
+        with deadline_scope(0.05):
+            return flight.do("key", lambda: True)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", lambda: release.wait(5))
+        while flight.stats.calls < 1:
+            pass
+        # A follower stops waiting for a leader without a deadline at its own
+        start = time.monotonic()
+        with pytest.raises(OsoSdkTimeoutError):
+            executor.submit(follow).result()
+        assert time.monotonic() - start < 1
+        release.set()
+        assert leader.result()
+
+
+def test_tasks_share_a_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return True
+
+    async def main():
+        first = asyncio.ensure_future(flight.do_async("key", func))
+        await asyncio.sleep(0)
+        rest = [flight.do_async("key", func) for _ in range(3)]
+
+        # The shared call survives its first caller being cancelled
+        first.cancel()
+        return await asyncio.gather(*rest)
+
+    assert asyncio.run(main()) == [True, True, True]
+    assert len(calls) == 1
+    assert flight.stats.coalesced == 3
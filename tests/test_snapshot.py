@@ -0,0 +1,68 @@
+import os
+import stat
+
+import pytest
+from oso_sdk import FactSnapshot, LocalEvaluator, write_snapshot
+
+from .test_local import FACTS, POLICY, alice, bob, org, repo
+
+
+def test_snapshot(tmp_path):
+    path = str(tmp_path / "facts.snapshot")
+    facts = [
+        *FACTS,
+        {"name": "has_role", "args": [{"type": "User", "id": "é"}, "viewer", org]},
+    ]
+    assert write_snapshot(path, facts) == 4
+
+    with FactSnapshot(path) as snapshot:
+        assert len(snapshot) == 4
+        assert snapshot.grants(("User", "alice"), ("Organization", "acme")) == {"owner"}
+        assert snapshot.grants(("User", "é"), ("Organization", "acme")) == {"viewer"}
+        assert snapshot.grants(("User", "alice"), ("Repository", "anvil")) == set()
+        assert snapshot.grants(("User", "carol"), ("Organization", "acme")) == set()
+        assert snapshot.related(("Repository", "anvil"), "repository_tenant") == [
+            ("Organization", "acme")
+        ]
+        assert snapshot.related(("Repository", "anvil"), "owner") == []
+
+
+def test_snapshot_file(tmp_path):
+    path = tmp_path / "facts.snapshot"
+    write_snapshot(str(path), FACTS)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+    # A directory can't be replaced, and the temporary file is removed
+    (tmp_path / "facts").mkdir()
+    with pytest.raises(OSError):
+        write_snapshot(str(tmp_path / "facts"), FACTS)
+    assert sorted(os.listdir(tmp_path)) == ["facts", "facts.snapshot"]
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "facts.json"
+    path.write_bytes(b"[]")
+    with pytest.raises(ValueError):
+        FactSnapshot(str(path))
+
+
+def test_local_evaluator(tmp_path):
+    path = str(tmp_path / "facts.snapshot")
+    write_snapshot(path, FACTS)
+    local = LocalEvaluator(POLICY, FactSnapshot(path))
+
+    assert local.authorize(alice, "edit", repo)
+    assert local.authorize(bob, "view", repo)
+    assert local.authorize(bob, "edit", repo) is False
+
+    # Writes are applied over the snapshot
+    local.apply(
+        delete=[{"name": "has_relation", "args": [repo, "repository_tenant", org]}],
+        tell=[{"name": "has_role", "args": [bob, "owner", repo]}],
+    )
+    assert local.authorize(alice, "edit", repo) is False
+    assert local.authorize(bob, "edit", repo)
+
+    local.load(FactSnapshot(path))
+    assert local.authorize(alice, "edit", repo)
+    assert local.authorize(bob, "edit", repo) is False
@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+from oso_sdk.aio import to_limits
+from oso_sdk.transport import HttpPool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _get(pool: HttpPool, url: str, n: int):
+    with requests.Session() as session:
+        pool.mount(session)
+        for _ in range(n):
+            assert session.get(url).ok
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        HttpPool(size=0)
+
+
+def test_connection_reuse(url):
+    pool = HttpPool()
+    _get(pool, url, 3)
+
+    assert pool.stats.requests == 3
+    assert pool.stats.connections == 1
+
+
+def test_no_keep_alive(url):
+    pool = HttpPool(keep_alive=False)
+    _get(pool, url, 3)
+
+    assert pool.stats.connections == 3
+
+
+def test_max_idle(url):
+    pool = HttpPool(max_idle=0)
+    _get(pool, url, 3)
+
+    assert pool.stats.connections == 3
+    assert pool.stats.idle_closed == 2
+
+
+def test_to_limits():
+    limits = to_limits(HttpPool(size=5, hosts=2, block=True, max_idle=30))
+
+    assert limits == httpx.Limits(
+        max_connections=10, max_keepalive_connections=10, keepalive_expiry=30
+    )
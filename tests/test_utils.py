@@ -1,6 +1,10 @@
 import pytest
 from oso_sdk.exceptions import OsoSdkInternalError
-from oso_sdk.integrations.utils import default_get_action_from_method, get_sub_from_jwt
+from oso_sdk.integrations.utils import (
+    default_get_action_from_method,
+    get_sub_from_jwt,
+    werkzeug_path_param,
+)
 
 
 def test_invalid_authorize_header():
@@ -41,3 +45,13 @@ def test_unsupported_method():
 
     with pytest.raises(OsoSdkInternalError):
         default_get_action_from_method("head")
+
+
+def test_werkzeug_path_param():
+    assert werkzeug_path_param("<id>") == "id"
+    assert werkzeug_path_param("<int:id>") == "id"
+    assert werkzeug_path_param("<string(length=2):code>") == "code"
+    assert werkzeug_path_param("acme") is None
+
+    with pytest.raises(ValueError):
+        werkzeug_path_param("<org>/<id>")